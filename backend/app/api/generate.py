@@ -3,23 +3,71 @@ Icon generation endpoints
 """
 
 import asyncio
-from fastapi import APIRouter, HTTPException, Path, status, BackgroundTasks
+import json
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Path, status, BackgroundTasks, Header, Request
+from fastapi.responses import StreamingResponse
 from app.models.generation import (
     GenerateConceptRequest,
     GenerateYouTubeRequest,
+    GenerateYouTubeBatchRequest,
     GenerateResponse,
+    GenerateBatchResponse,
     GenerationStatus,
-    GenerationStatusEnum
+    GenerationStatusEnum,
+    TERMINAL_STATUSES
 )
+from app.core.config import settings
 from app.core.logging import logger
 from app.core.task_store import task_store
-from app.workers.youtube_worker import process_youtube_generation
+from app.services.container import get_services
+from app.workers.cancellation import cancel_running
+from app.workers.dispatcher import dispatch_job, resume_task
+from app.workers.leases import is_task_running
 import uuid
 from datetime import datetime
 
 router = APIRouter()
 
 
+def _to_status(task_data: dict) -> GenerationStatus:
+    """Build the API status model from a stored task"""
+    return GenerationStatus(
+        task_id=task_data["task_id"],
+        status=task_data["status"],
+        progress=task_data["progress"],
+        message=task_data.get("message"),
+        created_at=task_data["created_at"],
+        updated_at=task_data["updated_at"],
+        completed_at=task_data.get("completed_at"),
+        error=task_data.get("error"),
+        transcript=task_data.get("transcript"),
+        extracted_concepts=task_data.get("extracted_concepts"),
+        generated_icons=task_data.get("generated_icons"),
+        parent_task_id=task_data["source_data"].get("parent_task_id"),
+        child_task_ids=task_data["source_data"].get("child_task_ids"),
+        metadata=task_data.get("metadata") or {}
+    )
+
+
+def _sse(event_id: str, event_type: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _snapshot(task_data: dict) -> dict:
+    """Light task state for SSE clients (no transcript)"""
+    return {
+        "task_id": task_data["task_id"],
+        "status": task_data["status"].value,
+        "progress": task_data["progress"],
+        "message": task_data.get("message"),
+        "error": task_data.get("error"),
+        "extracted_concepts": task_data.get("extracted_concepts"),
+        "generated_icons": task_data.get("generated_icons"),
+    }
+
+
 @router.post(
     "/generate/concept",
     response_model=GenerateResponse,
@@ -46,7 +94,7 @@ async def generate_from_concept(
         logger.info(f"Creating generation task {task_id} for concept: {request.concept}")
 
         # Create task in store
-        task_store.create_task(
+        await task_store.acreate_task(
             task_id=task_id,
             source_type="concept",
             source_data={"concept": request.concept}
@@ -88,6 +136,7 @@ async def generate_from_youtube(
     - **max_concepts**: Maximum number of concepts to extract
     - **min_priority**: Minimum priority level for concepts
     - **auto_generate**: Automatically generate icons after extraction
+    - **force_regenerate**: Render every icon again (no image cache, no existing icon reuse)
     """
     try:
         # Generate unique task ID
@@ -96,24 +145,27 @@ async def generate_from_youtube(
         logger.info(f"Creating YouTube generation task {task_id} for URL: {request.youtube_url}")
 
         # Create task in store
-        task_store.create_task(
+        await task_store.acreate_task(
             task_id=task_id,
             source_type="youtube",
             source_data={
-                "youtube_url": request.youtube_url,
+                "youtube_url": str(request.youtube_url),
                 "max_concepts": request.max_concepts,
-                "auto_generate": request.auto_generate
+                "auto_generate": request.auto_generate,
+                "max_parallel_concepts": request.max_parallel_concepts,
+                "force_regenerate": request.force_regenerate
             }
         )
 
-        # Launch background task
-        background_tasks.add_task(
-            process_youtube_generation,
-            task_id=task_id,
-            youtube_url=request.youtube_url,
-            max_concepts=request.max_concepts,
-            auto_generate=request.auto_generate
-        )
+        # Launch background job (in-process or durable queue)
+        await dispatch_job(background_tasks, "youtube", {
+            "task_id": task_id,
+            "youtube_url": str(request.youtube_url),
+            "max_concepts": request.max_concepts,
+            "auto_generate": request.auto_generate,
+            "max_parallel_concepts": request.max_parallel_concepts,
+            "force_regenerate": request.force_regenerate
+        })
 
         estimated_time = request.max_concepts * 3 if request.auto_generate else 30
 
@@ -132,6 +184,126 @@ async def generate_from_youtube(
         )
 
 
+@router.post(
+    "/generate/youtube/batch",
+    response_model=GenerateBatchResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Generate from YouTube videos or playlist",
+    description="Extract concepts from several YouTube videos, deduplicate them across the batch and generate icons"
+)
+async def generate_from_youtube_batch(
+    request: GenerateYouTubeBatchRequest,
+    background_tasks: BackgroundTasks
+) -> GenerateBatchResponse:
+    """
+    Generate icons from a playlist or a list of YouTube videos
+
+    One parent task reports the aggregate progress; each video also gets its
+    own task (child_task_ids) with its transcript, concepts and icons.
+
+    - **youtube_urls**: YouTube video URLs
+    - **playlist_id**: YouTube playlist ID or URL (requires YOUTUBE_API_KEY)
+    - **max_concepts_per_video**: Maximum concepts extracted per video
+    - **max_total_concepts**: Maximum distinct concepts generated for the batch
+    - **auto_generate**: Automatically generate icons after extraction
+    """
+    try:
+        youtube_service = get_services().youtube
+        urls = [str(url) for url in request.youtube_urls or []]
+
+        playlist_id = None
+        if request.playlist_id:
+            playlist_id = youtube_service.extract_playlist_id(request.playlist_id)
+            if not playlist_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid playlist: {request.playlist_id}"
+                )
+            try:
+                urls += await youtube_service.get_playlist_video_urls(playlist_id, settings.BATCH_MAX_VIDEOS)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Failed to read playlist {playlist_id}: {str(e)}"
+                )
+
+        # One task per distinct video
+        video_urls = []
+        seen_ids = set()
+        for url in urls:
+            video_id = youtube_service.extract_video_id(url)
+            if not video_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid YouTube URL: {url}"
+                )
+            if video_id not in seen_ids:
+                seen_ids.add(video_id)
+                video_urls.append(url)
+
+        if not video_urls:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No videos to process"
+            )
+        if len(video_urls) > settings.BATCH_MAX_VIDEOS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Too many videos ({len(video_urls)}), the limit is {settings.BATCH_MAX_VIDEOS}"
+            )
+
+        task_id = f"gen_batch_{uuid.uuid4().hex[:12]}"
+        child_task_ids = [f"gen_yt_{uuid.uuid4().hex[:12]}" for _ in video_urls]
+
+        logger.info(f"Creating YouTube batch task {task_id} for {len(video_urls)} videos")
+
+        for child_id, url in zip(child_task_ids, video_urls):
+            await task_store.acreate_task(
+                task_id=child_id,
+                source_type="youtube_batch_item",
+                source_data={
+                    "youtube_url": url,
+                    "max_concepts": request.max_concepts_per_video,
+                    "parent_task_id": task_id
+                }
+            )
+
+        payload = {
+            "youtube_urls": video_urls,
+            "child_task_ids": child_task_ids,
+            "max_concepts_per_video": request.max_concepts_per_video,
+            "max_total_concepts": request.max_total_concepts,
+            "auto_generate": request.auto_generate,
+            "playlist_id": playlist_id
+        }
+        await task_store.acreate_task(task_id=task_id, source_type="youtube_batch", source_data=payload)
+
+        # Launch background job (in-process or durable queue)
+        await dispatch_job(background_tasks, "youtube_batch", {"task_id": task_id, **payload})
+
+        max_icons = len(video_urls) * request.max_concepts_per_video
+        if request.max_total_concepts:
+            max_icons = min(max_icons, request.max_total_concepts)
+        estimated_time = max_icons * 3 if request.auto_generate else len(video_urls) * 10
+
+        return GenerateBatchResponse(
+            task_id=task_id,
+            status=GenerationStatusEnum.PENDING,
+            message=f"YouTube batch task created for {len(video_urls)} videos.",
+            estimated_time_seconds=estimated_time,
+            child_task_ids=child_task_ids
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating YouTube batch task: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create YouTube batch task: {str(e)}"
+        )
+
+
 @router.get(
     "/generate/status/{task_id}",
     response_model=GenerationStatus,
@@ -151,7 +323,7 @@ async def get_generation_status(
         logger.info(f"Checking status for task: {task_id}")
 
         # Get task from store
-        task_data = task_store.get_task(task_id)
+        task_data = await task_store.aget_task(task_id)
 
         if not task_data:
             raise HTTPException(
@@ -160,19 +332,7 @@ async def get_generation_status(
             )
 
         # Return task status
-        return GenerationStatus(
-            task_id=task_data["task_id"],
-            status=task_data["status"],
-            progress=task_data["progress"],
-            message=task_data.get("message"),
-            created_at=task_data["created_at"],
-            updated_at=task_data["updated_at"],
-            completed_at=task_data.get("completed_at"),
-            error=task_data.get("error"),
-            transcript=task_data.get("transcript"),
-            extracted_concepts=task_data.get("extracted_concepts"),
-            generated_icons=task_data.get("generated_icons")
-        )
+        return _to_status(task_data)
 
     except HTTPException:
         raise
@@ -182,3 +342,187 @@ async def get_generation_status(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get task status: {str(e)}"
         )
+
+
+@router.get(
+    "/generate/stream/{task_id}",
+    status_code=status.HTTP_200_OK,
+    summary="Stream generation progress",
+    description="Server-Sent Events stream of status, progress, concept and icon changes",
+    response_class=StreamingResponse
+)
+async def stream_generation_status(
+    request: Request,
+    task_id: str = Path(..., description="Task ID"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+) -> StreamingResponse:
+    """
+    Stream task changes as Server-Sent Events
+
+    Events: `snapshot` (initial state), `status`, `progress`, `transcript`,
+    `concepts` and `icon`. Events are only sent when something changes; the
+    stream closes once the task is completed, failed or cancelled.
+    Reconnecting with `Last-Event-ID` replays the missed events.
+
+    - **task_id**: Task identifier returned from generation request
+    """
+    task_data = await task_store.aget_task(task_id)
+
+    if not task_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task {task_id} not found"
+        )
+
+    events = task_store.events
+
+    async def event_stream() -> AsyncIterator[str]:
+        yield "retry: 3000\n\n"
+
+        cursor = last_event_id
+        # Cursor read before the snapshot: an event published in between is replayed, not lost
+        latest = await events.alast_event_id(task_id)
+        current = await task_store.aget_task(task_id) or task_data
+        is_over = current["status"] in TERMINAL_STATUSES
+
+        if not cursor or (is_over and not await events.ahistory(task_id, cursor)):
+            cursor = latest
+            yield _sse(cursor, "snapshot", _snapshot(current))
+            if is_over:
+                return
+
+        async for event in events.subscribe(task_id, cursor):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+
+            yield _sse(event["id"], event["type"], event["data"])
+            if event["type"] == "status" and event["data"].get("status") in ("completed", "failed", "cancelled"):
+                break
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post(
+    "/generate/resume/{task_id}",
+    response_model=GenerateResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Resume generation",
+    description="Resume an interrupted or failed task from its last checkpoint"
+)
+async def resume_generation(
+    background_tasks: BackgroundTasks,
+    task_id: str = Path(..., description="Task ID")
+) -> GenerateResponse:
+    """
+    Resume a generation task
+
+    Transcript, extracted concepts and already generated icons are reused,
+    only the remaining work is done again.
+
+    - **task_id**: Task identifier returned from generation request
+    """
+    try:
+        task_data = await task_store.aget_task(task_id)
+
+        if not task_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Task {task_id} not found"
+            )
+
+        if task_data["status"] == GenerationStatusEnum.COMPLETED:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Task {task_id} is already completed"
+            )
+
+        if await is_task_running(task_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Task {task_id} is still running"
+            )
+
+        logger.info(f"Resuming task {task_id}")
+        await resume_task(task_id, background_tasks)
+
+        done = len((task_data.get("checkpoint") or {}).get("icons") or {})
+
+        return GenerateResponse(
+            task_id=task_id,
+            status=GenerationStatusEnum.PENDING,
+            message=f"Task resumed from checkpoint ({done} icons already done)"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming task {task_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume task: {str(e)}"
+        )
+
+
+@router.delete(
+    "/generate/{task_id}",
+    response_model=GenerationStatus,
+    status_code=status.HTTP_200_OK,
+    summary="Cancel generation",
+    description="Cancel a running generation task and stop its in-flight work"
+)
+@router.post(
+    "/generate/{task_id}/cancel",
+    response_model=GenerationStatus,
+    status_code=status.HTTP_200_OK,
+    summary="Cancel generation",
+    description="Cancel a running generation task and stop its in-flight work"
+)
+async def cancel_generation(
+    task_id: str = Path(..., description="Task ID")
+) -> GenerationStatus:
+    """
+    Cancel a generation task
+
+    Workers stop between and during stages; icons already produced are kept
+    and listed in `generated_icons`.
+
+    - **task_id**: Task identifier returned from generation request
+    """
+    try:
+        task_data = await task_store.aget_task(task_id)
+
+        if not task_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Task {task_id} not found"
+            )
+
+        if task_data["status"] in TERMINAL_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Task {task_id} is already {task_data['status'].value}"
+            )
+
+        logger.info(f"Cancelling task {task_id}")
+        await task_store.acancel_task(task_id)
+
+        # Immediate if it runs in this process, otherwise its worker polls the flag
+        cancel_running(task_id)
+
+        return _to_status(await task_store.aget_task(task_id))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling task {task_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to cancel task: {str(e)}"
+        )
@@ -5,7 +5,14 @@ Health check endpoint
 from fastapi import APIRouter, status
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Any, Dict
 from app.core.config import settings
+from app.core.adaptive_limiter import adaptive_limiters
+from app.core.blocking import blocking_executor, loop_watchdog
+from app.core.cache import caches
+from app.core.image_cache import image_cache
+from app.core.rate_limiter import rate_limiter
+from app.core.task_store import task_store
 
 router = APIRouter()
 
@@ -37,3 +44,29 @@ async def health_check() -> HealthResponse:
         version=settings.VERSION,
         timestamp=datetime.utcnow()
     )
+
+
+@router.get(
+    "/metrics/providers",
+    status_code=status.HTTP_200_OK,
+    tags=["health"],
+    summary="Provider metrics",
+    description="Rate limiter, adaptive concurrency and thread pool state per external provider"
+)
+async def provider_metrics() -> Dict[str, Any]:
+    """
+    Provider metrics
+    Wait times for each token bucket, current adaptive concurrency limits
+    and their recent increase/decrease decisions, the blocking call pools and
+    result and image cache hit rates
+    """
+    return {
+        "rate_limits": rate_limiter.metrics(),
+        "concurrency": {name: limiter.metrics() for name, limiter in adaptive_limiters.items()},
+        "blocking_pool": blocking_executor.metrics(),
+        "task_store_pool": task_store.executor.metrics(),
+        "loop_blocked_count": loop_watchdog.blocked_count,
+        "caches": {name: cache.metrics() for name, cache in caches.items()},
+        "image_cache": image_cache.metrics(),
+        "timestamp": datetime.utcnow()
+    }
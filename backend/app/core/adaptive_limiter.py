@@ -0,0 +1,182 @@
+"""
+Adaptive (AIMD) concurrency limiting for provider calls
+Grows concurrency additively while calls are fast and healthy,
+cuts it multiplicatively on 429 / 5xx / timeouts
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """True for errors meaning the provider is overloaded: 429, 5xx or timeouts"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+
+    for attr in ("status_code", "status", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int) and (value == 429 or 500 <= value < 600):
+            return True
+
+    message = str(error).lower()
+    return any(marker in message for marker in (
+        "429", "resource_exhausted", "rate limit", "too many requests",
+        "timeout", "timed out", "503", "unavailable", "overloaded"
+    ))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter
+
+    - success with latency under target: after `limit` healthy calls, limit += 1
+    - overload error: limit *= decrease_factor (at most once per cooldown,
+      so calls that were already in flight do not cut it repeatedly)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        latency_target: float = 30.0,
+        decrease_factor: float = 0.5,
+        max_error_rate: float = 0.1,
+        cooldown_seconds: float = 10.0
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = initial_limit or max(self.min_limit, self.max_limit // 2)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.max_error_rate = max_error_rate
+        self.cooldown_seconds = cooldown_seconds
+
+        self.inflight = 0
+        self.latency_ewma: Optional[float] = None
+        self._healthy_streak = 0
+        self._last_decrease = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=20)  # True = overload error
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def _cond(self) -> asyncio.Condition:
+        # Created lazily so the limiter can be built outside a running loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def _decide(self, action: str, new_limit: int, reason: str) -> None:
+        old_limit = self.limit
+        self.limit = new_limit
+        self._healthy_streak = 0
+        self.decisions.append({
+            "time": time.time(),
+            "action": action,
+            "from": old_limit,
+            "to": new_limit,
+            "reason": reason
+        })
+        logger.info(f"Adaptive limiter '{self.name}': {action} {old_limit} -> {new_limit} ({reason})")
+
+    def _on_success(self, latency: float) -> None:
+        self._outcomes.append(False)
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+        if latency > self.latency_target or self._error_rate() > self.max_error_rate:
+            self._healthy_streak = 0
+            return
+
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.limit and self.limit < self.max_limit:
+            self._decide(
+                "increase",
+                self.limit + 1,
+                f"latency {self.latency_ewma:.1f}s, error rate {self._error_rate():.0%}"
+            )
+
+    def _on_overload(self, error: BaseException) -> None:
+        self._outcomes.append(True)
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_seconds:
+            return
+
+        self._last_decrease = now
+        new_limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        self._decide("decrease", new_limit, f"{type(error).__name__}: {str(error)[:80]}")
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of a provider call"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < self.limit)
+            self.inflight += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if is_overload_error(e):
+                self._on_overload(e)
+            else:
+                self._outcomes.append(False)
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+        finally:
+            async with self._cond:
+                self.inflight -= 1
+                self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "inflight": self.inflight,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "latency_target_seconds": self.latency_target,
+            "error_rate": round(self._error_rate(), 3),
+            "recent_decisions": list(self.decisions)[-10:],
+        }
+
+
+# Process-wide limiters per provider
+adaptive_limiters: Dict[str, AdaptiveLimiter] = {
+    "gemini": AdaptiveLimiter(
+        "gemini",
+        max_limit=settings.GEMINI_MAX_CONCURRENCY,
+        latency_target=settings.GEMINI_LATENCY_TARGET_SECONDS
+    ),
+    "replicate": AdaptiveLimiter(
+        "replicate",
+        max_limit=settings.REPLICATE_MAX_CONCURRENCY,
+        latency_target=settings.REPLICATE_LATENCY_TARGET_SECONDS
+    ),
+}
+
+
+@asynccontextmanager
+async def provider_slot(name: str) -> AsyncIterator[None]:
+    """Adaptive concurrency slot for a provider (no-op when disabled)"""
+    if not settings.ADAPTIVE_CONCURRENCY_ENABLED:
+        yield
+        return
+
+    async with adaptive_limiters[name].slot():
+        yield
@@ -0,0 +1,206 @@
+"""
+Running synchronous SDK calls off the event loop
+Bounded, instrumented thread pool for libraries without an async client,
+and a debug watchdog that reports calls still blocking the loop
+"""
+
+import asyncio
+import functools
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+from app.core.config import settings
+from app.core.logging import logger
+
+T = TypeVar("T")
+
+
+@dataclass
+class CallStats:
+    """Timing of the blocking calls made under one label"""
+    calls: int = 0
+    errors: int = 0
+    inflight: int = 0
+    queue_wait_total: float = 0.0
+    max_queue_wait: float = 0.0
+    run_total: float = 0.0
+    max_run: float = 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "inflight": self.inflight,
+            "avg_queue_wait_seconds": round(self.queue_wait_total / self.calls, 4) if self.calls else 0.0,
+            "max_queue_wait_seconds": round(self.max_queue_wait, 4),
+            "avg_run_seconds": round(self.run_total / self.calls, 4) if self.calls else 0.0,
+            "max_run_seconds": round(self.max_run, 4),
+        }
+
+
+class BlockingExecutor:
+    """
+    Thread pool for synchronous provider calls
+
+    The pool is bounded so a burst of slow calls queues up instead of spawning
+    threads; queue wait and run time are tracked per label.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "blocking"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats: Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.thread_name_prefix
+            )
+        return self._executor
+
+    def _stats_for(self, label: str) -> CallStats:
+        with self._lock:
+            return self._stats.setdefault(label, CallStats())
+
+    async def run(self, label: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run fn(*args, **kwargs) in the pool and await its result"""
+        stats = self._stats_for(label)
+        submitted = time.monotonic()
+        timing: Dict[str, float] = {}
+
+        def call() -> T:
+            timing["started"] = time.monotonic()
+            with self._lock:
+                stats.inflight += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    stats.inflight -= 1
+
+        loop = asyncio.get_event_loop()
+        failed = False
+        try:
+            return await loop.run_in_executor(self.executor, call)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            finished = time.monotonic()
+            started = timing.get("started", finished)
+            with self._lock:
+                stats.calls += 1
+                stats.errors += failed
+                stats.queue_wait_total += started - submitted
+                stats.max_queue_wait = max(stats.max_queue_wait, started - submitted)
+                stats.run_total += finished - started
+                stats.max_run = max(stats.max_run, finished - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = {label: stats.metrics() for label, stats in self._stats.items()}
+        return {"max_workers": self.max_workers, "calls": calls}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Process-wide pool
+blocking_executor = BlockingExecutor(settings.BLOCKING_POOL_SIZE)
+
+
+async def run_blocking(label: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a synchronous call in the shared pool without blocking the event loop"""
+    return await blocking_executor.run(label, fn, *args, **kwargs)
+
+
+def blocking(label: str) -> Callable[[Callable[..., T]], Callable[..., Any]]:
+    """Decorator turning a synchronous function into an awaitable running in the pool"""
+    def decorator(fn: Callable[..., T]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            return await run_blocking(label, fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LoopBlockingWatchdog:
+    """
+    Debug helper reporting calls that block the event loop
+
+    A loop callback records a heartbeat every `interval`; a watchdog thread
+    logs the loop thread's stack when the heartbeat is late by more than
+    `threshold`, which points at the offending synchronous call. asyncio's own
+    debug mode is enabled too, so slow callbacks are also logged by asyncio.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.blocked_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._reported = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._beat_task: Optional[asyncio.Task] = None
+
+    async def _beat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            lag = time.monotonic() - self._last_beat - self.interval
+            if lag < self.threshold:
+                self._reported = False
+                continue
+            if self._reported:
+                continue
+
+            # Report each blocking episode once
+            self._reported = True
+            self.blocked_count += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            logger.warning(f"Event loop blocked for {lag:.3f}s+ by a synchronous call:\n{stack}")
+
+    def start(self) -> None:
+        """Start watching the running loop"""
+        if self._thread is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.threshold
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._beat_task = asyncio.ensure_future(self._beat())
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Loop blocking watchdog enabled (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._beat_task is not None:
+            self._beat_task.cancel()
+            self._beat_task = None
+        self._thread = None
+
+
+# Enabled by LOOP_BLOCKING_DEBUG
+loop_watchdog = LoopBlockingWatchdog(settings.LOOP_BLOCKING_THRESHOLD_SECONDS)
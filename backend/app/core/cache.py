@@ -0,0 +1,306 @@
+"""
+Result caches with TTL and bounded size
+In-memory (LRU), local disk or Redis backends behind one async interface,
+for results worth keeping across tasks (transcripts, extracted concepts)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+from app.core.blocking import run_blocking
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters of a cache"""
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "sets": self.sets,
+            "evictions": self.evictions,
+        }
+
+
+class Cache(ABC):
+    """
+    Async cache interface
+
+    Values must be JSON serializable. `ttl` is in seconds (None = default TTL).
+    """
+
+    backend = "none"
+
+    def __init__(self, namespace: str, default_ttl: int, max_entries: int):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Cached value, or None if missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a value for `ttl` seconds"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove a value (no-op if missing)"""
+
+    def _record(self, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "max_entries": self.max_entries, **self.stats.metrics()}
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache with per-entry expiry"""
+
+    backend = "memory"
+
+    def __init__(self, namespace: str, default_ttl: int, max_entries: int):
+        super().__init__(namespace, default_ttl, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return self._record(entry[1] if entry else None)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        expires = time.time() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+            self.stats.sets += 1
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DiskCache(Cache):
+    """
+    Local disk cache: one JSON file per key under CACHE_DIR/<namespace>
+
+    Files are written atomically (temp file + rename). Reads refresh the file
+    mtime, and the least recently used files are evicted past max_entries.
+    """
+
+    backend = "disk"
+
+    def __init__(self, namespace: str, default_ttl: int, max_entries: int, directory: str):
+        super().__init__(namespace, default_ttl, max_entries)
+        self.directory = os.path.join(directory, namespace)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _read(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("expires", 0) < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def _write(self, key: str, value: Any, ttl: int) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires": time.time() + ttl, "value": value}, f, default=str)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+                self.stats.evictions += 1
+            except OSError:
+                pass
+
+    def _remove(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._record(await run_blocking("cache.disk", self._read, key))
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await run_blocking("cache.disk", self._write, key, value, ttl or self.default_ttl)
+        self.stats.sets += 1
+
+    async def delete(self, key: str) -> None:
+        await run_blocking("cache.disk", self._remove, key)
+
+
+class RedisCache(Cache):
+    """
+    Redis cache shared by every process
+
+    Entries expire with their TTL; overall size is bounded by the TTLs and
+    the server's maxmemory policy. Falls back to an in-memory LRU if Redis errors.
+    """
+
+    backend = "redis"
+
+    def __init__(self, namespace: str, default_ttl: int, max_entries: int, redis_client: Any = None):
+        super().__init__(namespace, default_ttl, max_entries)
+        self._redis = redis_client
+        self._fallback: Optional[MemoryCache] = None
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def _get_redis(self) -> Any:
+        if self._redis is None:
+            self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+        return self._redis
+
+    def _use_fallback(self, error: Exception) -> MemoryCache:
+        if self._fallback is None:
+            logger.warning(f"Cache '{self.namespace}' Redis error, using in-memory cache: {str(error)}")
+            self._fallback = MemoryCache(self.namespace, self.default_ttl, self.max_entries)
+            self._fallback.stats = self.stats
+            self.backend = "memory"
+        return self._fallback
+
+    async def get(self, key: str) -> Optional[Any]:
+        if self._fallback is not None:
+            return await self._fallback.get(key)
+        try:
+            raw = await self._get_redis().get(self._key(key))
+        except Exception as e:
+            return await self._use_fallback(e).get(key)
+        return self._record(json.loads(raw) if raw is not None else None)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        if self._fallback is not None:
+            return await self._fallback.set(key, value, ttl)
+        try:
+            await self._get_redis().set(self._key(key), json.dumps(value, default=str), ex=ttl or self.default_ttl)
+            self.stats.sets += 1
+        except Exception as e:
+            await self._use_fallback(e).set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        if self._fallback is not None:
+            return await self._fallback.delete(key)
+        try:
+            await self._get_redis().delete(self._key(key))
+        except Exception as e:
+            await self._use_fallback(e).delete(key)
+
+
+@lru_cache(maxsize=None)
+def _redis_reachable() -> bool:
+    """Whether REDIS_URL answers a ping, checked once per process"""
+    if not (REDIS_AVAILABLE and settings.REDIS_URL):
+        return False
+    client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=5, socket_timeout=5)
+    try:
+        client.ping()
+        return True
+    except Exception as e:
+        logger.warning(f"Redis unreachable, caches use memory: {str(e)}")
+        return False
+    finally:
+        client.close()
+
+
+# Caches created by build_cache, by namespace (exposed on /metrics/providers)
+caches: Dict[str, Cache] = {}
+
+
+def build_cache(namespace: str, default_ttl: int, max_entries: int, backend: Optional[str] = None) -> Cache:
+    """
+    Create the cache of a namespace with the configured backend
+
+    CACHE_BACKEND: "memory", "disk" (CACHE_DIR), "redis", or "auto"
+    (Redis when REDIS_URL answers a ping at startup, memory otherwise).
+    """
+    backend = backend or settings.CACHE_BACKEND
+    if backend == "auto":
+        backend = "redis" if _redis_reachable() else "memory"
+
+    if backend == "redis" and REDIS_AVAILABLE:
+        cache: Cache = RedisCache(namespace, default_ttl, max_entries)
+    elif backend == "disk":
+        cache = DiskCache(namespace, default_ttl, max_entries, settings.CACHE_DIR)
+    else:
+        cache = MemoryCache(namespace, default_ttl, max_entries)
+
+    caches[namespace] = cache
+    return cache
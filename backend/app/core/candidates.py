@@ -0,0 +1,274 @@
+"""
+Local concept candidates
+Finds candidate terms in a transcript and scores them without any LLM call:
+TF-IDF against a background corpus of previous transcripts, mention counts
+and how the mentions are spread over the video
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+import numpy as np
+from app.core.config import settings
+from app.core.logging import logger
+from app.models.generation import ConceptPriority
+
+# Longest candidate phrase, in words
+MAX_NGRAM = 3
+
+# Phrases are not taken across punctuation
+_CLAUSE_BREAK = re.compile(r"[.,;:!?…()\[\]\"«»\n]+")
+# Words, including hyphenated ones; apostrophes split ("l'épargne" -> "l", "épargne")
+_WORD = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*", re.UNICODE)
+
+STOPWORDS = set("""
+a à ai aie ait alors as au aucun aussi autre aux avec avoir avait avez avons bah beaucoup bien bon c ça car ce ceci cela celle celles celui cependant ces cet cette chaque chez ci comme comment d dans de des deux dire dit dois doit donc dont du elle elles en encore est et été être eu eux fait faire faut fois font hein ici il ils j je juste l la là le les leur leurs lui m ma mais me même mes moi moins mon n ne ni non nos notre nous on ont ou où oui par parce pas pendant peu peut peux plus pour pourquoi puis qu quand que quel quelle quelque quelques qui quoi s sa sans se ses si sien son sont sous sur t ta te tes toi ton tous tout toute toutes très tu un une va vais vas voilà vont vos votre vous vraiment y
+aujourd hui parle parler parlé permet permettre faut veut voir mettre prendre passer regarder reste rester devient
+about after again all also am an and any are as at be because been before being but by can could did do does doing don down each even few for from get got had has have having he her here hers him his how i if in into is it its just know let like me more most my no nor not now of off on once only or other our out over own really right same she should so some such than that the their them then there these they this those through to too under until up very was we well were what when where which while who whom why will with would yeah yes you your
+""".split())
+
+
+def _content_runs(text: str) -> List[List[str]]:
+    """Runs of consecutive content words, per clause"""
+    runs: List[List[str]] = []
+    for clause in _CLAUSE_BREAK.split(text):
+        run: List[str] = []
+        for match in _WORD.finditer(clause):
+            word = match.group()
+            if len(word) < 2 or word.casefold() in STOPWORDS:
+                if run:
+                    runs.append(run)
+                    run = []
+                continue
+            run.append(word)
+        if run:
+            runs.append(run)
+    return runs
+
+
+@dataclass
+class Candidate:
+    """A candidate concept found locally"""
+    term: str
+    mentions: int
+    score: float
+    spread: float
+    first_seen: float
+    last_seen: float
+
+    @property
+    def priority(self) -> ConceptPriority:
+        """Same rule as the extraction prompt: 3+ mentions high, 2 medium"""
+        if self.mentions >= 3:
+            return ConceptPriority.HIGH
+        if self.mentions == 2:
+            return ConceptPriority.MEDIUM
+        return ConceptPriority.LOW
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "term": self.term,
+            "mentions": self.mentions,
+            "score": round(self.score, 3),
+            "spread": round(self.spread, 2),
+            "first_seen": round(self.first_seen, 1),
+            "last_seen": round(self.last_seen, 1),
+        }
+
+
+class BackgroundCorpus:
+    """
+    Document frequencies of terms over previously processed transcripts
+
+    Persisted as JSON under CACHE_DIR. While it is empty every term has the
+    same IDF, so scores fall back to mention counts and spread.
+    Each document (video) is counted once, however many times it is
+    processed, and the file is rewritten at most every `save_interval`
+    seconds (flush() saves pending changes at shutdown).
+    """
+
+    def __init__(self, path: str, max_terms: int = 100000, save_interval: float = 60.0):
+        self.path = path
+        self.max_terms = max_terms
+        self.save_interval = save_interval
+        self.documents = 0
+        self.df: Dict[str, int] = {}
+        # IDs of the documents already counted
+        self.seen: Set[str] = set()
+        self._loaded = False
+        self._dirty = False
+        self._saved_at = 0.0
+        self._lock = Lock()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.documents = int(data.get("documents", 0))
+            self.df = {k: int(v) for k, v in data.get("df", {}).items()}
+            self.seen = set(data.get("seen", []))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load background corpus: {str(e)}")
+
+    def idf(self, keys: Sequence[str]) -> np.ndarray:
+        """Smoothed IDF of each key"""
+        with self._lock:
+            self._load()
+            df = np.fromiter((self.df.get(k, 0) for k in keys), dtype=np.float64, count=len(keys))
+            documents = self.documents
+        return np.log((1.0 + documents) / (1.0 + df)) + 1.0
+
+    def add(self, keys: Iterable[str], document_id: Optional[str] = None) -> bool:
+        """
+        Count one more document containing `keys`
+
+        Returns False, without counting it, if `document_id` was already counted.
+        """
+        with self._lock:
+            self._load()
+            if document_id is not None:
+                if document_id in self.seen:
+                    return False
+                self.seen.add(document_id)
+
+            self.documents += 1
+            for key in set(keys):
+                self.df[key] = self.df.get(key, 0) + 1
+            if len(self.df) > self.max_terms:
+                # Forget the rarest terms first
+                keep = sorted(self.df.items(), key=lambda kv: kv[1], reverse=True)[:self.max_terms]
+                self.df = dict(keep)
+            self._dirty = True
+
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+            return True
+
+    def flush(self) -> None:
+        """Save pending changes"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"documents": self.documents, "df": self.df, "seen": sorted(self.seen)}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            logger.warning(f"Could not save background corpus: {str(e)}")
+
+
+background_corpus = BackgroundCorpus(os.path.join(settings.CACHE_DIR, "background_corpus.json"))
+
+
+def extract_candidates(
+    segments: Sequence[Dict[str, Any]],
+    corpus: Optional[BackgroundCorpus] = None,
+    limit: int = 40,
+    windows: int = 10,
+    learn: bool = False,
+    document_id: Optional[str] = None
+) -> List[Candidate]:
+    """
+    Candidate concepts of a transcript, best first
+
+    Candidates are phrases of up to MAX_NGRAM consecutive non-stopwords.
+    Each is scored as (1 + log mentions) * IDF * (0.5 + spread), where
+    spread is the share of the video's time windows mentioning it; longer
+    phrases get a small boost. A word mostly used inside a longer kept
+    phrase is dropped in favour of the phrase.
+
+    With `learn`, the transcript is first added to the background corpus
+    (once per `document_id`, e.g. the video ID, when given), so the first
+    run of a video is scored like its re-runs.
+    """
+    corpus = corpus or background_corpus
+    index: Dict[str, int] = {}
+    surfaces: List[Counter] = []
+    occ_term: List[int] = []
+    occ_time: List[float] = []
+
+    for seg in segments:
+        start = float(seg.get("start") or 0.0)
+        for run in _content_runs(seg["text"]):
+            folded = [w.casefold() for w in run]
+            for size in range(1, MAX_NGRAM + 1):
+                for i in range(len(run) - size + 1):
+                    key = " ".join(folded[i:i + size])
+                    idx = index.get(key)
+                    if idx is None:
+                        idx = index[key] = len(surfaces)
+                        surfaces.append(Counter())
+                    surfaces[idx][" ".join(run[i:i + size])] += 1
+                    occ_term.append(idx)
+                    occ_time.append(start)
+
+    if not index:
+        return []
+
+    keys = list(index)
+    if learn:
+        corpus.add(keys, document_id)
+
+    terms = np.asarray(occ_term, dtype=np.int64)
+    times = np.asarray(occ_time, dtype=np.float64)
+
+    # Occurrence counts per time window, in one vectorized pass
+    t0, t1 = float(times.min()), float(times.max())
+    n_windows = max(1, min(windows, len(segments)))
+    width = (t1 - t0) / n_windows or 1.0
+    window = np.minimum(((times - t0) / width).astype(np.int64), n_windows - 1)
+    counts = np.zeros((n_windows, len(keys)), dtype=np.int64)
+    np.add.at(counts, (window, terms), 1)
+
+    mentions = counts.sum(axis=0)
+    spread = (counts > 0).sum(axis=0) / n_windows
+    first_seen = np.full(len(keys), np.inf)
+    last_seen = np.full(len(keys), -np.inf)
+    np.minimum.at(first_seen, terms, times)
+    np.maximum.at(last_seen, terms, times)
+    sizes = np.fromiter((k.count(" ") + 1 for k in keys), dtype=np.float64, count=len(keys))
+
+    scores = (1.0 + np.log(mentions)) * corpus.idf(keys) * (0.5 + spread) * (1.0 + 0.25 * (sizes - 1))
+    # Phrases seen once are usually accidental word sequences
+    keep = (sizes == 1) | (mentions >= 2)
+
+    # A sub-phrase mostly used inside a longer kept phrase is redundant
+    for idx in np.flatnonzero(keep & (sizes > 1)):
+        words = keys[idx].split()
+        for size in range(1, len(words)):
+            for i in range(len(words) - size + 1):
+                sub = index[" ".join(words[i:i + size])]
+                if mentions[sub] <= mentions[idx] * 1.25:
+                    keep[sub] = False
+
+    order = [i for i in np.argsort(-scores, kind="stable") if keep[i]][:limit]
+    candidates = [
+        Candidate(
+            term=surfaces[i].most_common(1)[0][0],
+            mentions=int(mentions[i]),
+            score=float(scores[i]),
+            spread=float(spread[i]),
+            first_seen=float(first_seen[i]),
+            last_seen=float(last_seen[i])
+        )
+        for i in order
+    ]
+    return candidates
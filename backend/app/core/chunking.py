@@ -0,0 +1,65 @@
+"""
+Text chunking by token budget
+Splits long transcripts into overlapping chunks that fit a prompt budget
+"""
+
+import re
+from typing import List
+
+# Rough average for OpenAI tokenizers on French/English prose
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text (~4 characters per token)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    Split text into chunks of at most ~max_tokens, repeating ~overlap_tokens
+    of the previous chunk at the start of the next one
+
+    Cuts on sentence boundaries when possible, otherwise on whitespace, so a
+    concept mentioned at a boundary is seen whole by at least one chunk.
+    """
+    text = text.strip()
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap_chars = max(0, min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 2))
+
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    chunks: List[str] = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + max_chars)
+        if end < len(text):
+            window = text[start:end]
+            # Prefer the last sentence end in the second half of the window
+            cut = None
+            for match in _SENTENCE_END.finditer(window, len(window) // 2):
+                cut = match.start()
+            if cut is None:
+                cut = window.rfind(" ", len(window) // 2)
+            if cut is not None and cut > 0:
+                end = start + cut
+
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        # Step back for the overlap, starting on a sentence or word boundary
+        next_start = max(start + 1, end - overlap_chars)
+        if overlap_chars:
+            sentence = _SENTENCE_END.search(text, next_start, end)
+            space = text.find(" ", next_start, end)
+            if sentence:
+                next_start = sentence.end()
+            elif space != -1:
+                next_start = space + 1
+        start = next_start
+
+    return [chunk for chunk in chunks if chunk]
@@ -0,0 +1,136 @@
+"""
+Transcript compaction
+Shrinks auto-generated captions before they are sent to the LLM: rolling
+caption overlap, repeated lines, non-speech markers and filler words
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+from app.core.chunking import estimate_tokens
+
+# Longest caption overlap looked for between consecutive segments, in words
+MAX_OVERLAP_WORDS = 30
+
+# [Musique], [Applause], (rires), ♪, and ">>" speaker change markers
+_NON_SPEECH = re.compile(
+    r"\[[^\]\n]{1,40}\]"
+    r"|\((?:musique|music|rires?|laughter|laughs|applaudissements|applause|inaudible|silence)\)"
+    r"|[♪♫]+"
+    r"|>>",
+    re.IGNORECASE
+)
+
+# Hesitations only: words that never carry meaning on their own
+FILLERS = {
+    "euh", "euhh", "heu", "hum", "hmm", "mmh", "mh", "bah", "beh",
+    "uh", "uhh", "um", "umm", "uhm", "erm",
+}
+
+_PUNCTUATION = ".,;:!?…\"'«»()-"
+
+
+def _norm(word: str) -> str:
+    return word.strip(_PUNCTUATION).casefold()
+
+
+@dataclass
+class CompactionStats:
+    """Size of a transcript before and after compaction"""
+    segments: int = 0
+    chars_before: int = 0
+    chars_after: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    overlap_words_removed: int = 0
+    markers_removed: int = 0
+    fillers_removed: int = 0
+
+    @property
+    def token_reduction(self) -> float:
+        if not self.tokens_before:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "segments": self.segments,
+            "chars_before": self.chars_before,
+            "chars_after": self.chars_after,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "token_reduction": round(self.token_reduction, 3),
+            "overlap_words_removed": self.overlap_words_removed,
+            "markers_removed": self.markers_removed,
+            "fillers_removed": self.fillers_removed,
+        }
+
+
+@dataclass
+class CompactedTranscript:
+    text: str
+    stats: CompactionStats
+    # Kept text of each segment with its start time and duration, for time-based analysis
+    segments: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _overlap(tail: List[str], words: List[str]) -> int:
+    """Length of the longest suffix of `tail` that is a prefix of `words`"""
+    if not tail or not words:
+        return 0
+    first = words[0]
+    longest = min(len(tail), len(words))
+    # Only positions where the segment's first word appears can start an overlap.
+    # A single shared word is kept unless it is the whole segment (e.g. "de ... de")
+    for size in range(longest, 0, -1):
+        if tail[-size] == first and tail[-size:] == words[:size]:
+            return size if size > 1 or len(words) == 1 else 0
+    return 0
+
+
+def compact_transcript(segments: Sequence[Dict[str, Any]], drop_fillers: bool = True) -> CompactedTranscript:
+    """
+    Join transcript segments into compact text
+
+    Strips non-speech markers, removes the words a segment repeats from the
+    end of the previous ones (rolling auto-captions, duplicated lines),
+    optionally drops hesitation fillers and collapses whitespace.
+    """
+    stats = CompactionStats(segments=len(segments))
+    raw = " ".join(seg["text"] for seg in segments)
+    stats.chars_before = len(raw)
+    stats.tokens_before = estimate_tokens(raw)
+
+    words: List[str] = []
+    normalized: List[str] = []
+    kept_segments: List[Dict[str, Any]] = []
+
+    for seg in segments:
+        text, markers = _NON_SPEECH.subn(" ", seg["text"])
+        stats.markers_removed += markers
+
+        seg_words = text.split()
+        if drop_fillers:
+            kept = [w for w in seg_words if _norm(w) not in FILLERS]
+            stats.fillers_removed += len(seg_words) - len(kept)
+            seg_words = kept
+        if not seg_words:
+            continue
+
+        seg_norm = [_norm(w) for w in seg_words]
+        skip = _overlap(normalized[-MAX_OVERLAP_WORDS:], seg_norm[:MAX_OVERLAP_WORDS])
+        stats.overlap_words_removed += skip
+
+        if skip < len(seg_words):
+            kept_segments.append({
+                "text": " ".join(seg_words[skip:]),
+                "start": seg.get("start", 0.0),
+                "duration": seg.get("duration", 0.0)
+            })
+        words.extend(seg_words[skip:])
+        normalized.extend(seg_norm[skip:])
+
+    compacted = " ".join(words)
+    stats.chars_after = len(compacted)
+    stats.tokens_after = estimate_tokens(compacted)
+    return CompactedTranscript(text=compacted, stats=stats, segments=kept_segments)
@@ -0,0 +1,226 @@
+"""
+Concept normalization and merging
+Canonical keys for concept names (accents, plurals, aliases) and merging of
+near-duplicate concepts by character-trigram similarity
+"""
+
+import hashlib
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.text import normalize_name
+from app.models.generation import ConceptExtraction, ConceptPriority
+
+# Lower rank = more important
+_RANK = {ConceptPriority.HIGH: 0, ConceptPriority.MEDIUM: 1, ConceptPriority.LOW: 2}
+
+# Articles and prepositions that do not change the concept ("Compte d'épargne")
+_KEY_STOPWORDS = {"de", "d", "du", "des", "la", "le", "les", "l", "un", "une", "the", "of"}
+
+# Written as they are normalized: alias -> canonical name
+DEFAULT_ALIASES = {
+    "btc": "bitcoin",
+    "eth": "ethereum",
+    "ether": "ethereum",
+    "cryptomonnaie": "crypto",
+    "crypto monnaie": "crypto",
+    "cryptocurrency": "crypto",
+    "immo": "immobilier",
+    "etats unis": "usa",
+    "united states": "usa",
+    "exchange traded fund": "etf",
+}
+
+
+def stem(word: str) -> str:
+    """Singular form of a normalized French or English word ("chevaux" -> "cheval", "actions" -> "action")"""
+    if len(word) <= 3 or any(c.isdigit() for c in word):
+        return word
+    if word.endswith("eaux"):
+        return word[:-1]
+    if word.endswith("aux") and len(word) >= 6:
+        return word[:-3] + "al"
+    if word.endswith(("eux", "oux")):
+        return word[:-1]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is", "ys")):
+        return word[:-1]
+    return word
+
+
+def stem_phrase(name: str) -> str:
+    """Normalized text without articles, each word singular ("Les comptes d'épargne" -> "compte epargne")"""
+    words = normalize_name(name).split()
+    kept = [w for w in words if w not in _KEY_STOPWORDS] or words
+    return " ".join(stem(w) for w in kept)
+
+
+def _load_aliases(path: str) -> Dict[str, str]:
+    """Alias table: defaults, then CONCEPT_ALIASES_FILE ({"alias": "canonical name"})"""
+    aliases = dict(DEFAULT_ALIASES)
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                aliases.update(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load concept aliases from {path}: {str(e)}")
+    return {stem_phrase(alias): stem_phrase(canonical) for alias, canonical in aliases.items()}
+
+
+_aliases = _load_aliases(settings.CONCEPT_ALIASES_FILE)
+
+# Bump when the stem() rules change
+_STEM_RULES = 1
+
+# Changes whenever canonical keys can change, so stored keys can be invalidated
+KEY_VERSION = hashlib.sha256(
+    json.dumps([sorted(_aliases.items()), sorted(_KEY_STOPWORDS), _STEM_RULES]).encode("utf-8")
+).hexdigest()[:12]
+
+
+def canonical_key(name: str) -> str:
+    """
+    Key under which concept names are the same concept
+
+    Case, accents, punctuation, articles and plurals are ignored, then the
+    alias table is applied ("Crypto-monnaies" and "cryptomonnaie" -> "crypto").
+    """
+    key = stem_phrase(name)
+    return _aliases.get(key, key)
+
+
+def key_forms(name: str) -> Set[str]:
+    """Forms a concept can take in stemmed text: its own, its canonical key and every alias of that key"""
+    phrase = stem_phrase(name)
+    key = _aliases.get(phrase, phrase)
+    forms = {phrase, key} | {alias for alias, canonical in _aliases.items() if canonical == key}
+    return {form for form in forms if form}
+
+
+def trigrams(key: str) -> FrozenSet[str]:
+    """Character trigrams of a key, padded so word starts and ends count"""
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def number_tokens(key: str) -> FrozenSet[str]:
+    """Tokens with digits: "CAC 40" and "CAC 60" are close in trigrams but never the same concept"""
+    return frozenset(w for w in key.split() if any(c.isdigit() for c in w))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def similar_key(key: str, keys: Iterable[str], threshold: float) -> Optional[str]:
+    """First of `keys` equal or similar enough to `key`, for small incremental checks"""
+    grams, numbers = trigrams(key), number_tokens(key)
+    for other in keys:
+        if other == key:
+            return other
+        if threshold < 1 and number_tokens(other) == numbers and jaccard(grams, trigrams(other)) >= threshold:
+            return other
+    return None
+
+
+def cluster_names(names: Sequence[str], threshold: Optional[float] = None) -> List[int]:
+    """
+    Cluster label of each name; same label = same concept
+
+    Names with the same canonical key share a cluster, and keys whose
+    trigram sets have a Jaccard similarity >= threshold are joined
+    (union-find, so similarity is transitive).
+
+    Candidate pairs come from a prefix-filtered inverted index (all-pairs
+    similarity join): keys are processed by increasing size and each only
+    indexes and probes its rarest trigrams, enough to find every pair above
+    the threshold without comparing all pairs.
+    """
+    threshold = settings.CONCEPT_MERGE_SIMILARITY if threshold is None else threshold
+    key_ids: Dict[str, int] = {}
+    labels = [key_ids.setdefault(canonical_key(name), len(key_ids)) for name in names]
+    if threshold >= 1 or len(key_ids) < 2:
+        return labels
+
+    keys = list(key_ids)
+    grams = [trigrams(k) for k in keys]
+    numbers = [number_tokens(k) for k in keys]
+    df = Counter(g for gs in grams for g in gs)
+    parent = list(range(len(keys)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index: Dict[str, List[int]] = defaultdict(list)
+    for i in sorted(range(len(keys)), key=lambda i: len(grams[i])):
+        size = len(grams[i])
+        ordered = sorted(grams[i], key=lambda g: (df[g], g))
+        prefix = ordered[:size - math.ceil(threshold * size) + 1]
+        min_size = threshold * size
+
+        probed = set()
+        for g in prefix:
+            for j in index[g]:
+                if j in probed or len(grams[j]) < min_size:
+                    continue
+                probed.add(j)
+                if numbers[i] == numbers[j] and jaccard(grams[i], grams[j]) >= threshold:
+                    parent[find(i)] = find(j)
+            index[g].append(i)
+
+    return [find(label) for label in labels]
+
+
+def time_span(concepts: Iterable[ConceptExtraction]) -> Dict[str, Optional[float]]:
+    """Earliest start and latest end of some occurrences of a concept"""
+    concepts = list(concepts)
+    starts = [c.start for c in concepts if c.start is not None]
+    ends = [c.end for c in concepts if c.end is not None]
+    return {"start": min(starts) if starts else None, "end": max(ends) if ends else None}
+
+
+def merge_similar_concepts(
+    concepts: List[ConceptExtraction],
+    threshold: Optional[float] = None,
+    max_contexts: int = 3
+) -> List[ConceptExtraction]:
+    """
+    Merge near-duplicate concepts ("Épargne", "epargnes", "Épargne ")
+
+    Each cluster becomes its most important member (first one on ties),
+    with the highest priority of the cluster, up to `max_contexts`
+    distinct context snippets of its members and the time span of all of
+    them. Order of first appearance is kept.
+    """
+    if len(concepts) < 2:
+        return list(concepts)
+
+    groups: Dict[int, List[ConceptExtraction]] = {}
+    for label, concept in zip(cluster_names([c.name for c in concepts], threshold), concepts):
+        groups.setdefault(label, []).append(concept)
+
+    merged = []
+    for members in groups.values():
+        if len(members) == 1:
+            merged.append(members[0])
+            continue
+
+        best = min(members, key=lambda c: _RANK[c.priority])
+        snippets: List[str] = []
+        for member in members:
+            for snippet in (member.context or "").split(" | "):
+                if snippet and snippet not in snippets and len(snippets) < max_contexts:
+                    snippets.append(snippet)
+        merged.append(best.model_copy(update={"context": " | ".join(snippets) or None, **time_span(members)}))
+
+    if len(merged) < len(concepts):
+        logger.info(f"Merged {len(concepts)} concepts into {len(merged)} distinct ones")
+    return merged
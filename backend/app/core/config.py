@@ -28,9 +28,27 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = ""
     SUPABASE_SERVICE_KEY: str = ""
 
-    # Redis (for Celery)
+    # Redis (task store, job queue)
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Job queue: "inline" runs jobs in the web process (BackgroundTasks),
+    # "redis" pushes them to a Redis stream consumed by `python -m app.workers`
+    JOB_QUEUE_BACKEND: str = "inline"
+    JOB_QUEUE_STREAM: str = "jobs:generation"
+    JOB_LEASE_SECONDS: int = 60
+    JOB_MAX_ATTEMPTS: int = 3
+    WORKER_CONCURRENCY: int = 2
+
+    # Open provider connections at startup instead of on the first task
+    WARM_CLIENTS_ON_STARTUP: bool = True
+
+    # Checkpoint / resume: run lease TTL and automatic resume of interrupted tasks at startup
+    TASK_LEASE_SECONDS: int = 60
+    RESUME_INTERRUPTED_TASKS: bool = True
+
+    # How often running tasks check whether they were cancelled from another process
+    CANCEL_POLL_SECONDS: float = 2.0
+
     # CORS
     ALLOWED_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -49,6 +67,94 @@ class Settings(BaseSettings):
     # Generation Settings
     MAX_CONCEPTS_PER_VIDEO: int = 50
     DEFAULT_ICON_STYLE: str = "finary-glass-3d"
+    # Max concepts generated concurrently per task (default and upper bound)
+    MAX_PARALLEL_CONCEPTS: int = 4
+    # Icon pipeline: per-stage worker pools and bounded queue depth between stages
+    BG_REMOVAL_CONCURRENCY: int = 4
+    UPLOAD_CONCURRENCY: int = 4
+    PIPELINE_QUEUE_DEPTH: int = 2
+    # Reuse existing icons whose name or alias matches a concept (index loaded at startup)
+    REUSE_EXISTING_ICONS: bool = True
+    ICON_INDEX_REFRESH_SECONDS: int = 600
+    # Near-duplicate matching (MinHash estimated Jaccard, 1 = off): name trigrams, and prompts in the same category
+    ICON_MATCH_SIMILARITY: float = 0.8
+    ICON_PROMPT_SIMILARITY: float = 0.7
+
+    # Result caches: "memory", "disk" (under CACHE_DIR), "redis", or "auto" (Redis if it answers at startup)
+    CACHE_BACKEND: str = "auto"
+    CACHE_DIR: str = "cache"
+    TRANSCRIPT_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    TRANSCRIPT_CACHE_NEGATIVE_TTL_SECONDS: int = 6 * 60 * 60
+    TRANSCRIPT_CACHE_MAX_ENTRIES: int = 1000
+    CONCEPT_CACHE_ENABLED: bool = True
+    CONCEPT_CACHE_TTL_SECONDS: int = 30 * 24 * 60 * 60
+    CONCEPT_CACHE_MAX_ENTRIES: int = 1000
+    # Generated images, by hash of prompt + model + size + style: disk LRU bounded in bytes
+    # (IMAGE_CACHE_DIR, default CACHE_DIR/images) and an optional Supabase Storage bucket shared by instances
+    IMAGE_CACHE_ENABLED: bool = True
+    IMAGE_CACHE_DIR: str = ""
+    IMAGE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    IMAGE_CACHE_BUCKET: str = ""
+
+    # Transcript compaction before concept extraction (caption overlap, markers, fillers)
+    TRANSCRIPT_COMPACTION: bool = True
+    TRANSCRIPT_DROP_FILLERS: bool = True
+    # Candidate terms and mention counts found locally (TF-IDF), given to GPT-4o as hints
+    CONCEPT_CANDIDATES: bool = True
+    CONCEPT_CANDIDATES_MAX: int = 40
+    # Extract-only requests (auto_generate=false) use the local candidates instead of GPT-4o
+    LOCAL_EXTRACT_ONLY: bool = False
+
+    # Near-duplicate concepts (accents, plurals, aliases, trigram Jaccard >= threshold; 1 = exact keys only)
+    CONCEPT_MERGE_SIMILARITY: float = 0.8
+    # JSON alias table {"alias": "canonical name"}, added to the built-in aliases
+    CONCEPT_ALIASES_FILE: str = ""
+
+    # Long transcripts: chunked (map-reduce) concept extraction
+    CONCEPT_CHUNK_TOKENS: int = 6000
+    CONCEPT_CHUNK_OVERLAP_TOKENS: int = 200
+    CONCEPT_CHUNK_CONCURRENCY: int = 4
+    # Extraction per fixed time window of the transcript, each window cached on its own (0 = token chunks)
+    CONCEPT_WINDOW_SECONDS: int = 600
+    CONCEPT_WINDOW_MAX_CONCEPTS: int = 15
+    # Capture of LLM responses that needed JSON repair: "" (off), "memory" or a directory
+    JSON_DEBUG_SINK: str = ""
+    # Stream concepts into icon generation while GPT-4o is still writing them
+    CONCEPT_STREAMING: bool = True
+
+    # Batch (playlist / multi-video) generation
+    BATCH_MAX_VIDEOS: int = 200
+    BATCH_TRANSCRIPT_CONCURRENCY: int = 8
+    BATCH_EXTRACTION_CONCURRENCY: int = 4
+
+    # Coalesce identical concurrent Gemini generations (across workers via Redis)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_REDIS: bool = True
+    SINGLE_FLIGHT_LOCK_SECONDS: int = 300
+
+    # Provider rate limits (per minute, 0 disables). "auto" shares them through
+    # Redis when reachable, "local" keeps them per process
+    RATE_LIMIT_BACKEND: str = "auto"
+    RATE_LIMIT_BURST_SECONDS: float = 10.0
+    GEMINI_RPM: int = 20
+    OPENAI_RPM: int = 500
+    OPENAI_TPM: int = 30000
+    REPLICATE_RPM: int = 600
+
+    # Adaptive (AIMD) concurrency of provider calls, per process
+    ADAPTIVE_CONCURRENCY_ENABLED: bool = True
+    GEMINI_MAX_CONCURRENCY: int = 8
+    GEMINI_LATENCY_TARGET_SECONDS: float = 30.0
+    REPLICATE_MAX_CONCURRENCY: int = 8
+    REPLICATE_LATENCY_TARGET_SECONDS: float = 20.0
+
+    # Thread pool for synchronous SDK calls (Supabase, background removal, caches)
+    BLOCKING_POOL_SIZE: int = 16
+    # Separate pool for Redis task store calls, so status and cancel checks never queue behind slow SDK calls
+    TASK_STORE_POOL_SIZE: int = 4
+    # Debug: log the stack of any call blocking the event loop longer than the threshold
+    LOOP_BLOCKING_DEBUG: bool = False
+    LOOP_BLOCKING_THRESHOLD_SECONDS: float = 0.1
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,289 @@
+"""
+Generated image cache
+Content-addressed store of rendered images, keyed by a hash of everything
+that shapes a render (prompt, model, size, style), on local disk with an
+optional shared object storage tier behind it
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Optional
+from app.core.blocking import run_blocking
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    from supabase import create_client
+    SUPABASE_AVAILABLE = True
+except ImportError:
+    SUPABASE_AVAILABLE = False
+
+
+def image_key(prompt: str, model: str, size: str, style: str) -> str:
+    """Content address of a render (whitespace in the prompt does not count)"""
+    normalized = re.sub(r"\s+", " ", prompt).strip()
+    material = json.dumps([model, size, style, normalized])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ImageCacheStats:
+    """Hit/miss and byte counters of the image cache"""
+    hits: int = 0
+    remote_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    sets: int = 0
+    evictions: int = 0
+    errors: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.remote_hits + self.misses
+        return {
+            "hits": self.hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.remote_hits) / lookups, 3) if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class DiskImageStore:
+    """
+    Images as files under `directory`, named by their key
+
+    Files are written atomically (temp file + rename), so readers never see
+    a partial image. The process keeps an LRU index of the file sizes, built
+    from a directory scan on first use; once the total passes `max_bytes` the
+    least recently used files are removed. Files written by other processes
+    are found on read and indexed then.
+    """
+
+    backend = "disk"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # key -> size in bytes, least recently used first
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._bytes = 0
+        self._lock = Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".img")
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        if self._index is None:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith(".img"):
+                        stat = os.stat(os.path.join(root, name))
+                        files.append((stat.st_mtime, name[:-4], stat.st_size))
+            files.sort()
+            self._index = OrderedDict((key, size) for _, key, size in files)
+            self._bytes = sum(self._index.values())
+        return self._index
+
+    def _touch(self, key: str, size: int) -> int:
+        """Mark `key` as most recently used with `size` bytes; returns the number of evicted files"""
+        with self._lock:
+            index = self._load_index()
+            self._bytes += size - index.pop(key, 0)
+            index[key] = size
+
+            evicted = 0
+            while self._bytes > self.max_bytes and len(index) > 1:
+                old_key, old_size = index.popitem(last=False)
+                self._bytes -= old_size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+                evicted += 1
+            return evicted
+
+    def read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                if self._index is not None and key in self._index:
+                    self._bytes -= self._index.pop(key)
+            return None
+
+        self._touch(key, len(data))
+        return data
+
+    def write(self, key: str, data: bytes) -> int:
+        """Store an image; returns the number of files evicted to make room"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return self._touch(key, len(data))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._index) if self._index is not None else None
+            return {"backend": self.backend, "entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class SupabaseImageStore:
+    """Images in a Supabase Storage bucket, shared by every instance"""
+
+    backend = "supabase"
+
+    def __init__(self, bucket: str, prefix: str = "image-cache", client: Any = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = client
+
+    def _storage(self) -> Any:
+        if self._client is None:
+            self._client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        return self._client.storage.from_(self.bucket)
+
+    def _path(self, key: str) -> str:
+        return f"{self.prefix}/{key[:2]}/{key}"
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            return self._storage().download(self._path(key))
+        except Exception as e:
+            if "not found" in str(e).lower() or "404" in str(e):
+                return None
+            raise
+
+    def write(self, key: str, data: bytes) -> int:
+        self._storage().upload(
+            path=self._path(key),
+            file=data,
+            file_options={"content-type": "application/octet-stream", "upsert": "true"}
+        )
+        return 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "bucket": self.bucket, "prefix": self.prefix}
+
+
+class ImageCache:
+    """
+    Two-tier image cache: local disk in front, object storage (optional) behind
+
+    Local misses are looked up in the object store and copied to disk.
+    Cache errors are logged and counted but never raised: a broken cache
+    only means generating the image again.
+    """
+
+    def __init__(self, local: Optional[DiskImageStore] = None, remote: Optional[SupabaseImageStore] = None):
+        self.local = local
+        self.remote = remote
+        self.stats = ImageCacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.local is not None or self.remote is not None
+
+    async def _call(self, store: Any, method: str, *args: Any) -> Any:
+        try:
+            return await run_blocking(f"image_cache.{store.backend}", getattr(store, method), *args)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Image cache {store.backend} {method} failed: {str(e)}")
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Cached image of `key`, or None"""
+        if not self.enabled:
+            return None
+
+        if self.local is not None:
+            data = await self._call(self.local, "read", key)
+            if data is not None:
+                self.stats.hits += 1
+                self.stats.bytes_read += len(data)
+                return data
+
+        if self.remote is not None:
+            data = await self._call(self.remote, "read", key)
+            if data is not None:
+                self.stats.remote_hits += 1
+                self.stats.bytes_read += len(data)
+                if self.local is not None:
+                    self.stats.evictions += await self._call(self.local, "write", key, data) or 0
+                return data
+
+        self.stats.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Store the image of `key` in every tier"""
+        if not self.enabled:
+            return
+        for store in (self.local, self.remote):
+            if store is not None:
+                self.stats.evictions += await self._call(store, "write", key, data) or 0
+        self.stats.sets += 1
+        self.stats.bytes_written += len(data)
+
+    def bypass(self) -> None:
+        """Count a lookup skipped on purpose (forced regeneration)"""
+        self.stats.bypassed += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            **self.stats.metrics(),
+            "local": self.local.metrics() if self.local is not None else None,
+            "remote": self.remote.metrics() if self.remote is not None else None,
+        }
+
+
+def build_image_cache() -> ImageCache:
+    """Image cache with the configured tiers (IMAGE_CACHE_*)"""
+    if not settings.IMAGE_CACHE_ENABLED:
+        return ImageCache()
+
+    local = None
+    if settings.IMAGE_CACHE_MAX_BYTES > 0:
+        directory = settings.IMAGE_CACHE_DIR or os.path.join(settings.CACHE_DIR, "images")
+        local = DiskImageStore(directory, settings.IMAGE_CACHE_MAX_BYTES)
+
+    remote = None
+    if settings.IMAGE_CACHE_BUCKET:
+        if SUPABASE_AVAILABLE and settings.SUPABASE_URL and settings.SUPABASE_SERVICE_KEY:
+            remote = SupabaseImageStore(settings.IMAGE_CACHE_BUCKET)
+        else:
+            logger.warning("IMAGE_CACHE_BUCKET is set but Supabase is not configured, object storage tier disabled")
+
+    return ImageCache(local, remote)
+
+
+# Singleton instance
+image_cache = build_image_cache()
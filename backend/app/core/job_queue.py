@@ -0,0 +1,190 @@
+"""
+Durable job queue backed by a Redis stream
+Jobs survive web redeploys and are leased to worker processes with heartbeats,
+so a job held by a dead worker is reclaimed by another one
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+@dataclass
+class Job:
+    """A job leased from the queue"""
+    id: str
+    type: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 1
+
+
+class JobQueue:
+    """
+    Redis stream job queue with consumer-group leases
+
+    - enqueue: XADD to the stream
+    - claim: reclaim entries whose lease expired (XAUTOCLAIM), else read new ones (XREADGROUP)
+    - heartbeat: XCLAIM the entry to ourselves again, which resets its idle time
+    - ack: XACK + XDEL once the job is finished
+
+    Any redis.asyncio compatible client works, including fakeredis.aioredis for tests.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        stream: str = "jobs:generation",
+        group: str = "generation-workers",
+        lease_ms: int = 60000,
+        max_attempts: int = 3
+    ):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.lease_ms = lease_ms
+        self.max_attempts = max_attempts
+        self.dead_letter_stream = f"{stream}:dead"
+        self._group_ready = False
+
+    @classmethod
+    def from_settings(cls) -> "JobQueue":
+        """Build a queue connected to REDIS_URL"""
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package not available, cannot use the Redis job queue")
+
+        client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        return cls(
+            client,
+            stream=settings.JOB_QUEUE_STREAM,
+            lease_ms=settings.JOB_LEASE_SECONDS * 1000,
+            max_attempts=settings.JOB_MAX_ATTEMPTS
+        )
+
+    async def ensure_group(self) -> None:
+        """Create the stream and consumer group if needed"""
+        if self._group_ready:
+            return
+
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"Created consumer group {self.group} on {self.stream}")
+        except Exception as e:
+            # BUSYGROUP: group already exists
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        """Add a job to the stream and return its ID"""
+        await self.ensure_group()
+        job_id = await self.redis.xadd(self.stream, {
+            "type": job_type,
+            "payload": json.dumps(payload)
+        })
+        job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+        logger.info(f"Enqueued {job_type} job {job_id}")
+        return job_id
+
+    def _to_job(self, entry_id: Any, fields: Dict[Any, Any], attempts: int) -> Job:
+        decoded = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in fields.items()
+        }
+        return Job(
+            id=entry_id.decode() if isinstance(entry_id, bytes) else entry_id,
+            type=decoded.get("type", ""),
+            payload=json.loads(decoded.get("payload") or "{}"),
+            attempts=attempts
+        )
+
+    async def _delivery_count(self, job_id: str) -> int:
+        pending = await self.redis.xpending_range(self.stream, self.group, job_id, job_id, 1)
+        return pending[0]["times_delivered"] if pending else 1
+
+    async def claim(self, consumer: str, block_ms: int = 5000) -> Optional[Job]:
+        """
+        Lease the next job for this consumer
+
+        Expired leases are reclaimed first so jobs of dead workers are not starved
+        """
+        await self.ensure_group()
+
+        # 1. Reclaim jobs whose holder stopped heartbeating
+        result = await self.redis.xautoclaim(
+            self.stream, self.group, consumer,
+            min_idle_time=self.lease_ms,
+            start_id="0-0",
+            count=1
+        )
+        claimed = result[1] if result else []
+        for entry_id, fields in claimed:
+            if not fields:
+                # Entry was deleted while pending
+                await self.redis.xack(self.stream, self.group, entry_id)
+                continue
+
+            job = self._to_job(entry_id, fields, await self._delivery_count(entry_id))
+            if job.attempts > self.max_attempts:
+                await self.dead_letter(job, "Lease expired too many times")
+                continue
+
+            logger.warning(f"Reclaimed {job.type} job {job.id} (attempt {job.attempts})")
+            return job
+
+        # 2. Read a new job
+        response = await self.redis.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=1, block=block_ms
+        )
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                return self._to_job(entry_id, fields, 1)
+
+        return None
+
+    async def heartbeat(self, job: Job, consumer: str) -> None:
+        """Renew the lease on a running job"""
+        await self.redis.xclaim(
+            self.stream, self.group, consumer,
+            min_idle_time=0,
+            message_ids=[job.id],
+            justid=True
+        )
+
+    async def ack(self, job: Job) -> None:
+        """Mark a job as done and drop it from the stream"""
+        await self.redis.xack(self.stream, self.group, job.id)
+        await self.redis.xdel(self.stream, job.id)
+
+    async def dead_letter(self, job: Job, reason: str) -> None:
+        """Move a job that keeps failing out of the main stream"""
+        logger.error(f"Moving {job.type} job {job.id} to dead letter stream: {reason}")
+        await self.redis.xadd(self.dead_letter_stream, {
+            "type": job.type,
+            "payload": json.dumps(job.payload),
+            "reason": reason
+        })
+        await self.ack(job)
+
+    async def close(self) -> None:
+        close = getattr(self.redis, "aclose", None) or getattr(self.redis, "close", None)
+        if close:
+            await close()
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Lazily created process-wide queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue.from_settings()
+    return _job_queue
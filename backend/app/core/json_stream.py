@@ -0,0 +1,76 @@
+"""
+Incremental JSON parsing
+Extracts the objects of a JSON array while the document is still being
+written, e.g. from a streamed LLM response
+"""
+
+from typing import Any, Dict, List, Optional
+from app.core import tolerant_json
+from app.core.logging import logger
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for the items of the first array of a JSON document
+
+    Works for both `[{...}, {...}]` and `{"concepts": [{...}, {...}]}`: text
+    is fed as it arrives and every object of the array is returned as soon as
+    its closing brace is read. A single pass tracks strings, escapes and
+    nesting depth, so each character is scanned once.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add text and return the array objects completed by it"""
+        self.text += chunk
+        items: List[Dict[str, Any]] = []
+        text = self.text
+
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = self._depth + 1
+                elif char == "{" and self._depth == self._array_depth:
+                    self._item_start = pos
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if char == "}" and self._depth == self._array_depth and self._item_start is not None:
+                    item = self._decode(text[self._item_start:pos + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = None
+
+        self._pos = len(text)
+        return items
+
+    def _decode(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = tolerant_json.decode(raw, label="stream").value
+        except tolerant_json.TolerantDecodeError as e:
+            logger.warning(f"Skipping malformed streamed object: {str(e)}")
+            return None
+        if not isinstance(item, dict):
+            return None
+        return item
@@ -0,0 +1,196 @@
+"""
+MinHash signatures and LSH
+Near-duplicate lookup of shingle sets (e.g. name trigrams) among tens of
+thousands of entries in well under a millisecond, with numpy arrays that
+are cheap to persist
+"""
+
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX32 = np.uint64(0xFFFFFFFF)
+# Signatures keep the low 16 bits of each minimum (b-bit minwise hashing):
+# half the memory, and a 1/65536 chance collision barely moves the estimate
+SIGNATURE_DTYPE = np.uint16
+_EMPTY = 0xFFFF
+# Combines the rows of a band into one hash (multiply-add with the 64-bit FNV prime, wrapping)
+_BAND_PRIME = np.uint64(0x100000001B3)
+
+
+def pack_strings(strings: Sequence[str]) -> np.ndarray:
+    """Strings as one UTF-8 byte array (much smaller than a fixed-width unicode array)"""
+    return np.frombuffer("\x00".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def unpack_strings(packed: np.ndarray) -> List[str]:
+    text = packed.tobytes().decode("utf-8")
+    return text.split("\x00") if text else []
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the sets behind two signatures"""
+    return float(np.mean(a == b))
+
+
+class MinHasher:
+    """
+    MinHash signatures with `num_perm` universal hash permutations
+
+    Shingles are hashed with CRC32 and permutations come from a fixed seed,
+    so signatures are stable across processes and can be stored. Many sets
+    are hashed in one vectorized pass (minimum per set with reduceat).
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # a < 2**31 and hashes < 2**32: a * x + b never overflows 64 bits
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signatures(self, shingle_sets: Sequence[Iterable[str]]) -> np.ndarray:
+        """(sets, num_perm) signatures; empty sets get a sentinel signature"""
+        sets = [set(s) for s in shingle_sets]
+        sizes = np.fromiter((len(s) for s in sets), dtype=np.int64, count=len(sets))
+        signatures = np.full((len(sets), self.num_perm), _EMPTY, dtype=SIGNATURE_DTYPE)
+        total = int(sizes.sum())
+        if not total:
+            return signatures
+
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for s in sets for shingle in s),
+            dtype=np.uint64,
+            count=total
+        )
+        values = ((np.outer(hashes, self._a) + self._b) % _MERSENNE) & _MAX32
+        filled = sizes > 0
+        starts = (np.cumsum(sizes) - sizes)[filled]
+        signatures[filled] = np.minimum.reduceat(values, starts, axis=0) & np.uint64(0xFFFF)
+        return signatures
+
+    def signature(self, shingles: Iterable[str]) -> np.ndarray:
+        return self.signatures([shingles])[0]
+
+
+class MinHashLSH:
+    """
+    Banded LSH over MinHash signatures
+
+    Signatures are split into `bands` bands; entries sharing any band hash
+    with the query are candidates, then scored in one vectorized comparison and ranked by estimated similarity (at
+    most `max_candidates` of them, those sharing the most bands, so a query
+    stays cheap when many entries fall in one bucket).
+    Each band keeps a sorted array of band hashes, so a lookup is one binary
+    search per band. Added entries go to a pending block scanned linearly,
+    merged into the sorted arrays once it is as large as the index
+    (amortized O(log n) per insert); bulk loads call compact() when done.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_candidates: int = 512):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_candidates = max_candidates
+        self.ids: List[str] = []
+        self._sigs = np.empty((0, num_perm), dtype=SIGNATURE_DTYPE)
+        self._sorted = np.empty((bands, 0), dtype=np.uint64)
+        self._order = np.empty((bands, 0), dtype=np.int64)
+        self._pending_sigs: List[np.ndarray] = []
+        self._pending_block: Optional[np.ndarray] = None
+        self._pending_hashes: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _band_hashes(self, sigs: np.ndarray) -> np.ndarray:
+        """(entries, bands) hashes of (entries, num_perm) signatures"""
+        blocks = sigs.astype(np.uint64).reshape(len(sigs), self.bands, self.rows)
+        hashes = np.zeros((len(sigs), self.bands), dtype=np.uint64)
+        for row in range(self.rows):
+            hashes = hashes * _BAND_PRIME + blocks[:, :, row]
+        return hashes
+
+    def add(self, entry_id: str, signature: np.ndarray) -> int:
+        """Index a signature under `entry_id`; returns its row"""
+        self.ids.append(entry_id)
+        self._pending_sigs.append(signature)
+        self._pending_block = self._pending_hashes = None
+        if len(self._pending_sigs) >= max(256, len(self._sigs)):
+            self.compact()
+        return len(self.ids) - 1
+
+    def compact(self) -> None:
+        """Merge pending entries into the sorted band arrays"""
+        if not self._pending_sigs:
+            return
+        self._sigs = np.vstack([self._sigs, np.stack(self._pending_sigs)])
+        self._pending_sigs = []
+        self._pending_block = self._pending_hashes = None
+        self._sort_bands()
+
+    def _sort_bands(self) -> None:
+        hashes = self._band_hashes(self._sigs).T
+        self._order = np.argsort(hashes, axis=1, kind="stable")
+        self._sorted = np.take_along_axis(hashes, self._order, axis=1)
+
+    def signature_of(self, row: int) -> np.ndarray:
+        indexed = len(self._sigs)
+        return self._sigs[row] if row < indexed else self._pending_sigs[row - indexed]
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Rows sharing at least one band hash with `query`, capped to those sharing the most"""
+        indexed = len(self._sigs)
+        found = []
+        if self._sorted.shape[1]:
+            lo = [np.searchsorted(self._sorted[band], query[band], side="left") for band in range(self.bands)]
+            hi = [np.searchsorted(self._sorted[band], query[band], side="right") for band in range(self.bands)]
+            found.extend(self._order[band, lo[band]:hi[band]] for band in range(self.bands) if hi[band] > lo[band])
+        if self._pending_sigs:
+            found.append(np.nonzero(self._pending_hashes == query)[0] + indexed)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+
+        rows, shared = np.unique(np.concatenate(found), return_counts=True)
+        if len(rows) > self.max_candidates:
+            rows = np.sort(rows[np.argpartition(-shared, self.max_candidates - 1)[:self.max_candidates]])
+        return rows
+
+    def query(self, signature: np.ndarray, threshold: float) -> List[Tuple[int, float]]:
+        """(row, estimated similarity) of entries >= threshold, most similar first"""
+        if self._pending_sigs and self._pending_hashes is None:
+            self._pending_block = np.stack(self._pending_sigs)
+            self._pending_hashes = self._band_hashes(self._pending_block)
+        rows = self._candidates(self._band_hashes(signature[None, :])[0])
+        if not len(rows):
+            return []
+
+        # Rows are sorted: indexed entries first, then pending ones
+        indexed = len(self._sigs)
+        sigs = self._sigs[rows[rows < indexed]]
+        if self._pending_sigs:
+            sigs = np.vstack([sigs, self._pending_block[rows[rows >= indexed] - indexed]])
+        similarities = (sigs == signature).mean(axis=1)
+
+        keep = np.flatnonzero(similarities >= threshold)
+        keep = keep[np.argsort(-similarities[keep], kind="stable")]
+        return [(int(rows[i]), float(similarities[i])) for i in keep]
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """Arrays to persist (ids and signatures; band arrays are rebuilt on load)"""
+        self.compact()
+        return {
+            f"{prefix}_ids": pack_strings(self.ids),
+            f"{prefix}_sigs": self._sigs,
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray], prefix: str) -> None:
+        self.ids = unpack_strings(arrays[f"{prefix}_ids"])
+        self._sigs = arrays[f"{prefix}_sigs"].astype(SIGNATURE_DTYPE)
+        self._pending_sigs = []
+        self._pending_block = self._pending_hashes = None
+        self._sort_bands()
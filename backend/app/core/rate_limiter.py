@@ -0,0 +1,196 @@
+"""
+Provider rate limiting with token buckets
+Keeps Gemini, OpenAI and Replicate calls under their RPM/TPM quotas,
+per process or cluster-wide through Redis
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+# Atomic refill + reservation. Tokens may go negative: the caller then waits
+# for the debt to be refilled, which keeps callers in FIFO-ish order with a
+# single round trip per acquisition.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - requested
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 60)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+@dataclass
+class BucketStats:
+    """Wait-time metrics of a bucket"""
+    acquisitions: int = 0
+    throttled: int = 0
+    wait_seconds_total: float = 0.0
+    last_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.acquisitions += 1
+        self.last_wait_seconds = wait
+        if wait > 0:
+            self.throttled += 1
+            self.wait_seconds_total += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens/second, holding at most `capacity`
+
+    Uses the Redis script when a client is given (limits shared by all
+    processes), otherwise in-process state. Falls back to in-process state
+    if Redis errors.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, redis_client: Any = None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.redis = redis_client
+        self.stats = BucketStats()
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _reserve_local(self, tokens: float) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate) - tokens
+        self._updated = now
+        return max(0.0, -self._tokens / self.rate)
+
+    async def _reserve_redis(self, tokens: float) -> float:
+        wait = await self.redis.eval(
+            _TOKEN_BUCKET_SCRIPT, 1, f"ratelimit:{self.name}",
+            self.rate, self.capacity, tokens
+        )
+        return float(wait)
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Reserve tokens, sleeping until they are available. Returns the wait in seconds."""
+        if self.redis is not None:
+            try:
+                wait = await self._reserve_redis(tokens)
+            except Exception as e:
+                logger.warning(f"Rate limiter '{self.name}' Redis error, using local bucket: {str(e)}")
+                self.redis = None
+                wait = self._reserve_local(tokens)
+        else:
+            wait = self._reserve_local(tokens)
+
+        self.stats.record(wait)
+        if wait > 0:
+            logger.debug(f"Rate limiter '{self.name}': waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def current_wait(self) -> float:
+        """Wait a new caller would currently get (local estimate)"""
+        if self.redis is not None:
+            return self.stats.last_wait_seconds
+        tokens = min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+        return (1 - tokens) / self.rate if tokens < 1 else 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.redis is not None else "local",
+            "rate_per_minute": round(self.rate * 60, 2),
+            "capacity": self.capacity,
+            "current_wait_seconds": round(self.current_wait(), 3),
+            "acquisitions": self.stats.acquisitions,
+            "throttled": self.stats.throttled,
+            "wait_seconds_total": round(self.stats.wait_seconds_total, 3),
+            "last_wait_seconds": round(self.stats.last_wait_seconds, 3),
+            "max_wait_seconds": round(self.stats.max_wait_seconds, 3),
+        }
+
+
+class ProviderRateLimiter:
+    """Registry of per-provider buckets configured from settings"""
+
+    # bucket name -> settings attribute holding its per-minute limit
+    LIMITS = {
+        "gemini": "GEMINI_RPM",
+        "openai": "OPENAI_RPM",
+        "openai_tokens": "OPENAI_TPM",
+        "replicate": "REPLICATE_RPM",
+    }
+
+    def __init__(self, redis_client: Any = None):
+        self._redis = redis_client
+        self._connected = redis_client is not None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def _get_redis(self) -> Optional[Any]:
+        """Lazily connect to Redis when the redis backend is selected"""
+        if self._connected or settings.RATE_LIMIT_BACKEND == "local" or not REDIS_AVAILABLE:
+            return self._redis
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if not self._connected:
+                self._connected = True
+                try:
+                    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+                    await client.ping()
+                    self._redis = client
+                    logger.info("Provider rate limits shared through Redis")
+                except Exception as e:
+                    logger.warning(f"Rate limiter using in-process buckets: {str(e)}")
+        return self._redis
+
+    async def _bucket(self, name: str) -> Optional[TokenBucket]:
+        bucket = self.buckets.get(name)
+        if bucket is not None:
+            return bucket
+
+        per_minute = getattr(settings, self.LIMITS[name], 0)
+        if per_minute <= 0:
+            return None
+
+        rate = per_minute / 60.0
+        capacity = max(1.0, rate * settings.RATE_LIMIT_BURST_SECONDS)
+        bucket = TokenBucket(name, rate, capacity, await self._get_redis())
+        return self.buckets.setdefault(name, bucket)
+
+    async def acquire(self, name: str, tokens: float = 1) -> float:
+        """Wait for `tokens` from the named bucket (no-op if the limit is disabled)"""
+        if name not in self.LIMITS:
+            raise ValueError(f"Unknown rate limit bucket: {name}")
+
+        bucket = await self._bucket(name)
+        if bucket is None:
+            return 0.0
+        return await bucket.acquire(tokens)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: bucket.metrics() for name, bucket in self.buckets.items()}
+
+
+# Global instance
+rate_limiter = ProviderRateLimiter()
@@ -0,0 +1,144 @@
+"""
+Single-flight call coalescing
+Concurrent calls for the same key share one execution and its result,
+within the process and, when Redis is reachable, across worker processes
+"""
+
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class SingleFlight:
+    """
+    Deduplicates in-flight work by key
+
+    In-process: the first caller runs the function, later callers await the same future.
+    Cross-process: the leader holds a Redis lock while running and publishes the
+    encoded result under a short-lived key; followers in other processes poll it.
+    If the leader fails or dies, its lock goes away and a follower takes over.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_client: Any = None,
+        use_redis: bool = True,
+        lock_ttl_seconds: int = 300,
+        result_ttl_seconds: int = 60,
+        poll_interval: float = 0.5,
+        encode: Callable[[Any], str] = json.dumps,
+        decode: Callable[[str], Any] = json.loads
+    ):
+        self.namespace = namespace
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval = poll_interval
+        self.encode = encode
+        self.decode = decode
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._redis = redis_client
+        self._use_redis = use_redis and (redis_client is not None or (REDIS_AVAILABLE and bool(settings.REDIS_URL)))
+
+    async def _get_redis(self) -> Optional[Any]:
+        """Lazily connect to Redis, disabling cross-process mode if it is unreachable"""
+        if not self._use_redis:
+            return None
+
+        if self._redis is None:
+            try:
+                client = aioredis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+                await client.ping()
+                self._redis = client
+            except Exception as e:
+                logger.warning(f"Single-flight '{self.namespace}' running in-process only: {str(e)}")
+                self._use_redis = False
+                return None
+
+        return self._redis
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` once per key among concurrent callers and return its result"""
+        future = self._inflight.get(key)
+        if future is not None:
+            logger.debug(f"Single-flight '{self.namespace}': joining in-flight call {key[:12]}")
+            try:
+                # Shield so a cancelled follower does not cancel the shared call
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leader was cancelled, not us: run it ourselves
+                    return await self.do(key, fn)
+                raise
+
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._run(key, fn)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unjoined failure is not reported as never retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run as leader, or wait for the leader of another process"""
+        client = await self._get_redis()
+        if client is None:
+            return await fn()
+
+        lock_key = f"singleflight:{self.namespace}:lock:{key}"
+        result_key = f"singleflight:{self.namespace}:result:{key}"
+        token = uuid.uuid4().hex
+
+        while True:
+            try:
+                cached = await client.get(result_key)
+                if cached is not None:
+                    logger.info(f"Single-flight '{self.namespace}': reusing result from another worker")
+                    return self.decode(cached)
+
+                if await client.set(lock_key, token, nx=True, ex=self.lock_ttl_seconds):
+                    break
+            except Exception as e:
+                logger.warning(f"Single-flight '{self.namespace}' Redis error, running locally: {str(e)}")
+                return await fn()
+
+            # Another process is running it: wait for its result or for the lock to go away
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    if await client.exists(result_key) or not await client.exists(lock_key):
+                        break
+                except Exception:
+                    return await fn()
+
+        try:
+            result = await fn()
+            try:
+                await client.set(result_key, self.encode(result), ex=self.result_ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Single-flight '{self.namespace}': could not publish result: {str(e)}")
+            return result
+        finally:
+            try:
+                if await client.get(lock_key) == token:
+                    await client.delete(lock_key)
+            except Exception:
+                pass
@@ -0,0 +1,291 @@
+"""
+Task change events
+Feeds the SSE progress stream: the task store publishes what changed,
+watchers receive it with resumable event IDs (Last-Event-ID)
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.models.generation import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+# Events kept per task for Last-Event-ID replay
+MAX_EVENTS_PER_TASK = 500
+
+# Status values after which a task stream is over (events carry plain strings)
+TERMINAL_VALUES = {status.value for status in TERMINAL_STATUSES}
+
+
+def _id_key(event_id: str) -> Tuple[int, int]:
+    """Sort key for "ms-seq" style event IDs"""
+    try:
+        first, _, second = event_id.partition("-")
+        return int(first), int(second or 0)
+    except ValueError:
+        return 0, 0
+
+
+class _Subscriber:
+    """Queue of one SSE connection, fed from any thread"""
+
+    def __init__(self):
+        self.loop = asyncio.get_event_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def push(self, event: Dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+
+class TaskEventBus:
+    """
+    Per-task event log with live fan-out
+
+    Memory backend: events kept in a bounded deque per task, dropped
+    FINISHED_TTL seconds after the task's final status event (late
+    subscribers then get a snapshot instead of a replay).
+    Redis backend: events appended to a capped stream per task (its entry IDs
+    are the SSE event IDs); a single reader per task and process fans them out
+    to every local watcher, so N watchers cost one blocking read.
+    """
+
+    STREAM_TTL = 24 * 60 * 60
+    FINISHED_TTL = 10 * 60
+
+    def __init__(self, store: Any):
+        self._store = store
+        self._lock = Lock()
+        self._memory_events: Dict[str, Deque[Dict[str, Any]]] = {}
+        # Process-wide event counter: IDs keep increasing even after a task's events are dropped
+        self._memory_seq = 0
+        # task_id -> when its events are dropped (tasks that reached a final status)
+        self._memory_expiry: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._pumps: Dict[str, asyncio.Task] = {}
+        self._async_redis: Any = None
+
+    def _stream_key(self, task_id: str) -> str:
+        return f"task-events:{task_id}"
+
+    @property
+    def _redis(self) -> Any:
+        """Sync Redis client of the task store, if it is using Redis"""
+        return self._store._redis_client if self._store._use_redis else None
+
+    # ===== Publishing =====
+
+    def publish(self, task_id: str, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Append (type, data) events to the task log and notify watchers"""
+        if not events:
+            return
+
+        client = self._redis
+        if client is not None:
+            try:
+                key = self._stream_key(task_id)
+                pipe = client.pipeline()
+                for event_type, data in events:
+                    pipe.xadd(
+                        key,
+                        {"type": event_type, "data": json.dumps(data, default=str)},
+                        maxlen=MAX_EVENTS_PER_TASK,
+                        approximate=True
+                    )
+                pipe.expire(key, self.STREAM_TTL)
+                pipe.execute()
+                # Local watchers are fed by the Redis reader
+                return
+            except Exception as e:
+                logger.error(f"Redis error publishing events for {task_id}: {e}. Using memory.")
+
+        with self._lock:
+            self._drop_expired()
+            log = self._memory_events.setdefault(task_id, deque(maxlen=MAX_EVENTS_PER_TASK))
+            published = []
+            for event_type, data in events:
+                self._memory_seq += 1
+                event = {"id": f"{self._memory_seq}-0", "type": event_type, "data": data}
+                log.append(event)
+                published.append(event)
+
+            if any(t == "status" and d.get("status") in TERMINAL_VALUES for t, d in events):
+                self._memory_expiry[task_id] = time.monotonic() + self.FINISHED_TTL
+            else:
+                # Resumed: keep its events again
+                self._memory_expiry.pop(task_id, None)
+            subscribers = list(self._subscribers.get(task_id, ()))
+
+        for subscriber in subscribers:
+            for event in published:
+                subscriber.push(event)
+
+    def _drop_expired(self) -> None:
+        """Forget the events of tasks finished more than FINISHED_TTL ago (lock held)"""
+        now = time.monotonic()
+        for task_id in [t for t, expires in self._memory_expiry.items() if expires <= now]:
+            del self._memory_expiry[task_id]
+            self._memory_events.pop(task_id, None)
+
+    # ===== Reading =====
+
+    def _decode_entry(self, entry_id: Any, fields: Dict[Any, Any]) -> Dict[str, Any]:
+        def text(value: Any) -> str:
+            return value.decode() if isinstance(value, bytes) else value
+
+        decoded = {text(k): text(v) for k, v in fields.items()}
+        return {
+            "id": text(entry_id),
+            "type": decoded.get("type", "message"),
+            "data": json.loads(decoded.get("data") or "{}")
+        }
+
+    def history(self, task_id: str, after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Events after `after_id` (all kept events if None)"""
+        client = self._redis
+        if client is not None:
+            try:
+                start = f"({after_id}" if after_id else "-"
+                entries = client.xrange(self._stream_key(task_id), min=start, max="+")
+                return [self._decode_entry(entry_id, fields) for entry_id, fields in entries]
+            except Exception as e:
+                logger.error(f"Redis error reading events for {task_id}: {e}")
+                return []
+
+        with self._lock:
+            events = list(self._memory_events.get(task_id, ()))
+        if after_id:
+            after = _id_key(after_id)
+            events = [e for e in events if _id_key(e["id"]) > after]
+        return events
+
+    def last_event_id(self, task_id: str) -> str:
+        """ID of the latest event of a task ("0-0" if none)"""
+        client = self._redis
+        if client is not None:
+            try:
+                entries = client.xrevrange(self._stream_key(task_id), count=1)
+                if entries:
+                    entry_id = entries[0][0]
+                    return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                return "0-0"
+            except Exception as e:
+                logger.error(f"Redis error reading events for {task_id}: {e}")
+                return "0-0"
+
+        with self._lock:
+            events = self._memory_events.get(task_id)
+            return events[-1]["id"] if events else "0-0"
+
+    async def ahistory(self, task_id: str, after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """history() without blocking the event loop on Redis"""
+        if self._redis is not None:
+            return await self._store.executor.run("task_events", self.history, task_id, after_id)
+        return self.history(task_id, after_id)
+
+    async def alast_event_id(self, task_id: str) -> str:
+        """last_event_id() without blocking the event loop on Redis"""
+        if self._redis is not None:
+            return await self._store.executor.run("task_events", self.last_event_id, task_id)
+        return self.last_event_id(task_id)
+
+    async def _get_async_redis(self) -> Any:
+        if self._async_redis is None:
+            self._async_redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._async_redis
+
+    async def _pump(self, task_id: str, start_id: str) -> None:
+        """Single blocking reader per task, fanning out to local watchers"""
+        client = await self._get_async_redis()
+        key = self._stream_key(task_id)
+        last_id = start_id
+
+        while self._subscribers.get(task_id):
+            try:
+                response = await client.xread({key: last_id}, block=15000, count=100)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis error streaming events for {task_id}: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for _stream, entries in response or []:
+                for entry_id, fields in entries:
+                    event = self._decode_entry(entry_id, fields)
+                    last_id = event["id"]
+                    for subscriber in list(self._subscribers.get(task_id, ())):
+                        subscriber.push(event)
+
+    async def _register(self, task_id: str, subscriber: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscriber)
+
+        if self._redis is not None and REDIS_AVAILABLE:
+            pump = self._pumps.get(task_id)
+            if pump is None or pump.done():
+                start_id = await self.alast_event_id(task_id)
+                pump = self._pumps.get(task_id)
+                if pump is None or pump.done():
+                    self._pumps[task_id] = asyncio.ensure_future(self._pump(task_id, start_id))
+
+    def _unregister(self, task_id: str, subscriber: _Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if subscribers:
+                    return
+                del self._subscribers[task_id]
+
+        pump = self._pumps.pop(task_id, None)
+        if pump is not None:
+            pump.cancel()
+
+    async def subscribe(
+        self,
+        task_id: str,
+        last_event_id: Optional[str] = None,
+        keepalive: float = 15.0
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Replay events after `last_event_id`, then yield live ones
+
+        Yields None when nothing happened for `keepalive` seconds.
+        """
+        subscriber = _Subscriber()
+        # Register before replaying so nothing published in between is lost
+        await self._register(task_id, subscriber)
+        try:
+            last_seen = _id_key(last_event_id) if last_event_id else (0, 0)
+            if last_event_id:
+                for event in await self.ahistory(task_id, last_event_id):
+                    last_seen = _id_key(event["id"])
+                    yield event
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                # Skip events already delivered by the replay
+                if _id_key(event["id"]) <= last_seen:
+                    continue
+                last_seen = _id_key(event["id"])
+                yield event
+        finally:
+            self._unregister(task_id, subscriber)
@@ -3,13 +3,18 @@ Task store for generation tracking with Redis backend
 Falls back to in-memory storage when Redis is unavailable
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from threading import Lock
 from app.models.generation import GenerationStatus, GenerationStatusEnum
 from app.core.config import settings
+from app.core.task_events import TaskEventBus
+from app.core.blocking import BlockingExecutor
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -33,7 +38,13 @@ class RedisTaskStore:
         self._redis_client = None
         self._use_redis = False
         self._memory_tasks: Dict[str, dict] = {}
+        self._memory_leases: Dict[str, Tuple[str, float]] = {}
         self._lock = Lock()
+        # task_id -> [lock, holders and waiters] serializing the async updates of a task
+        self._task_locks: Dict[str, list] = {}
+        # Own pool: status and cancel checks must not queue behind slow SDK calls
+        self.executor = BlockingExecutor(settings.TASK_STORE_POOL_SIZE, thread_name_prefix="task-store")
+        self.events = TaskEventBus(self)
 
         # Try to connect to Redis if available
         if REDIS_AVAILABLE and settings.REDIS_URL:
@@ -60,6 +71,31 @@ class RedisTaskStore:
         """Generate Redis key for task"""
         return f"task:{task_id}"
 
+    def _get_cancel_key(self, task_id: str) -> str:
+        """
+        Redis key of the cancelled flag of a task
+
+        Kept apart from the task record: progress updates rewrite the whole
+        record (read, modify, write), so a flag stored in it could be
+        overwritten by an update that read the record before the cancel.
+        """
+        return f"cancel:{task_id}"
+
+    def _read_redis_task(self, task_id: str) -> Optional[dict]:
+        """Task record and cancelled flag in one round trip (the flag wins over the stored status)"""
+        with self._redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(self._get_redis_key(task_id))
+            pipe.exists(self._get_cancel_key(task_id))
+            task_json, cancelled = pipe.execute()
+
+        if not task_json:
+            return None
+
+        task = self._deserialize_task(json.loads(task_json))
+        if cancelled:
+            task["status"] = GenerationStatusEnum.CANCELLED
+        return task
+
     def _serialize_task(self, task: dict) -> dict:
         """Serialize task for storage (convert datetime to ISO strings)"""
         serialized = task.copy()
@@ -111,7 +147,9 @@ class RedisTaskStore:
             "transcript_text": None,
             "extracted_concepts": None,
             "generated_icons": None,
-            "error": None
+            "error": None,
+            "checkpoint": {},
+            "metadata": {}
         }
 
         if self._use_redis:
@@ -135,6 +173,99 @@ class RedisTaskStore:
             self._memory_tasks[task_id] = task
             logger.debug(f"Created task {task_id} in memory")
 
+    @staticmethod
+    def _event_snapshot(task: dict) -> dict:
+        """Fields watched for change events"""
+        return {
+            "status": task.get("status"),
+            "progress": task.get("progress"),
+            "message": task.get("message"),
+            "error": task.get("error"),
+            "has_transcript": bool(task.get("transcript")),
+            "extracted_concepts": task.get("extracted_concepts"),
+            "generated_icons": list(task.get("generated_icons") or []),
+        }
+
+    @staticmethod
+    def _diff_events(before: dict, task: dict) -> List[Tuple[str, dict]]:
+        """Change events between two snapshots of a task"""
+        after = RedisTaskStore._event_snapshot(task)
+        status = after["status"].value if isinstance(after["status"], GenerationStatusEnum) else after["status"]
+        events = []
+
+        if after["status"] != before["status"] or after["error"] != before["error"]:
+            events.append(("status", {
+                "status": status,
+                "progress": after["progress"],
+                "message": after["message"],
+                "error": after["error"],
+            }))
+        elif after["progress"] != before["progress"] or after["message"] != before["message"]:
+            events.append(("progress", {
+                "progress": after["progress"],
+                "message": after["message"],
+            }))
+
+        if after["has_transcript"] and not before["has_transcript"]:
+            events.append(("transcript", {"segments": len(task["transcript"])}))
+
+        if after["extracted_concepts"] and after["extracted_concepts"] != before["extracted_concepts"]:
+            events.append(("concepts", {"concepts": after["extracted_concepts"]}))
+
+        known = set(before["generated_icons"])
+        for icon_id in after["generated_icons"]:
+            if icon_id not in known:
+                events.append(("icon", {"icon_id": icon_id, "count": len(after["generated_icons"])}))
+
+        return events
+
+    def _apply_updates(
+        self,
+        task: dict,
+        status: Optional[GenerationStatusEnum] = None,
+        progress: Optional[int] = None,
+        message: Optional[str] = None,
+        transcript: Optional[list] = None,
+        extracted_concepts: Optional[list] = None,
+        generated_icons: Optional[list] = None,
+        error: Optional[str] = None,
+        checkpoint: Optional[dict] = None,
+        metadata: Optional[dict] = None
+    ) -> dict:
+        """Apply field updates to a task dict (shared by Redis and memory backends)"""
+        if task.get("status") == GenerationStatusEnum.CANCELLED:
+            # A cancelled task keeps its status; late worker updates only refresh results
+            status = None
+            error = None
+
+        if status is not None:
+            task["status"] = status
+        if progress is not None:
+            task["progress"] = progress
+        if message is not None:
+            task["message"] = message
+        if transcript is not None:
+            task["transcript"] = transcript
+        if extracted_concepts is not None:
+            task["extracted_concepts"] = extracted_concepts
+        if generated_icons is not None:
+            task["generated_icons"] = generated_icons
+        if error is not None:
+            task["error"] = error
+            task["status"] = GenerationStatusEnum.FAILED
+        if checkpoint is not None:
+            # Shallow merge so stages can checkpoint independently
+            task["checkpoint"] = {**(task.get("checkpoint") or {}), **checkpoint}
+        if metadata is not None:
+            task["metadata"] = {**(task.get("metadata") or {}), **metadata}
+
+        task["updated_at"] = datetime.utcnow()
+
+        if status == GenerationStatusEnum.COMPLETED:
+            task["completed_at"] = datetime.utcnow()
+
+        return task
+
     def update_task(
         self,
         task_id: str,
@@ -144,41 +275,33 @@ class RedisTaskStore:
         transcript: Optional[list] = None,
         extracted_concepts: Optional[list] = None,
         generated_icons: Optional[list] = None,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        checkpoint: Optional[dict] = None,
+        metadata: Optional[dict] = None
     ) -> None:
-        """Update task fields"""
+        """Update task fields (checkpoint and metadata are merged into the existing ones)"""
+        updates = dict(
+            status=status,
+            progress=progress,
+            message=message,
+            transcript=transcript,
+            extracted_concepts=extracted_concepts,
+            generated_icons=generated_icons,
+            error=error,
+            checkpoint=checkpoint,
+            metadata=metadata
+        )
+
         if self._use_redis:
             try:
                 key = self._get_redis_key(task_id)
-                task_json = self._redis_client.get(key)
+                task = self._read_redis_task(task_id)
 
-                if not task_json:
+                if not task:
                     raise ValueError(f"Task {task_id} not found")
 
-                task = json.loads(task_json)
-                task = self._deserialize_task(task)
-
-                # Update fields
-                if status is not None:
-                    task["status"] = status
-                if progress is not None:
-                    task["progress"] = progress
-                if message is not None:
-                    task["message"] = message
-                if transcript is not None:
-                    task["transcript"] = transcript
-                if extracted_concepts is not None:
-                    task["extracted_concepts"] = extracted_concepts
-                if generated_icons is not None:
-                    task["generated_icons"] = generated_icons
-                if error is not None:
-                    task["error"] = error
-                    task["status"] = GenerationStatusEnum.FAILED
-
-                task["updated_at"] = datetime.utcnow()
-
-                if status == GenerationStatusEnum.COMPLETED:
-                    task["completed_at"] = datetime.utcnow()
+                before = self._event_snapshot(task)
+                task = self._apply_updates(task, **updates)
 
                 # Save back to Redis
                 serialized = self._serialize_task(task)
@@ -188,6 +311,7 @@ class RedisTaskStore:
                     json.dumps(serialized)
                 )
                 logger.debug(f"Updated task {task_id} in Redis")
+                self.events.publish(task_id, self._diff_events(before, task))
                 return
             except ValueError:
                 # Task not found - re-raise
@@ -202,40 +326,165 @@ class RedisTaskStore:
                 raise ValueError(f"Task {task_id} not found")
 
             task = self._memory_tasks[task_id]
+            before = self._event_snapshot(task)
+            self._apply_updates(task, **updates)
+            logger.debug(f"Updated task {task_id} in memory")
 
-            if status is not None:
-                task["status"] = status
-            if progress is not None:
-                task["progress"] = progress
-            if message is not None:
-                task["message"] = message
-            if transcript is not None:
-                task["transcript"] = transcript
-            if extracted_concepts is not None:
-                task["extracted_concepts"] = extracted_concepts
-            if generated_icons is not None:
-                task["generated_icons"] = generated_icons
-            if error is not None:
-                task["error"] = error
-                task["status"] = GenerationStatusEnum.FAILED
-
-            task["updated_at"] = datetime.utcnow()
-
-            if status == GenerationStatusEnum.COMPLETED:
-                task["completed_at"] = datetime.utcnow()
+        self.events.publish(task_id, self._diff_events(before, task))
 
-            logger.debug(f"Updated task {task_id} in memory")
+    def cancel_task(self, task_id: str) -> None:
+        """Flag a task as cancelled; running workers notice it and stop"""
+        if self._use_redis:
+            try:
+                self._redis_client.set(self._get_cancel_key(task_id), "1", ex=self.TASK_TTL)
+            except Exception as e:
+                logger.error(f"Redis error cancelling task {task_id}: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        self.update_task(
+            task_id,
+            status=GenerationStatusEnum.CANCELLED,
+            message="Cancellation requested..."
+        )
+
+    def is_cancelled(self, task_id: str) -> bool:
+        """Check whether a task was cancelled"""
+        if self._use_redis:
+            try:
+                return self._redis_client.exists(self._get_cancel_key(task_id)) > 0
+            except Exception as e:
+                logger.error(f"Redis error checking task {task_id}: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        task = self.get_task(task_id)
+        return bool(task and task["status"] == GenerationStatusEnum.CANCELLED)
+
+    def reset_for_resume(self, task_id: str) -> None:
+        """Clear the failure state of a task so it can be resumed from its checkpoint"""
+        task = self.get_task(task_id)
+        if not task:
+            raise ValueError(f"Task {task_id} not found")
+
+        before = self._event_snapshot(task)
+        task = dict(task)
+        task.update(
+            status=GenerationStatusEnum.PENDING,
+            message="Resuming from checkpoint...",
+            error=None,
+            updated_at=datetime.utcnow()
+        )
+        if self._use_redis:
+            try:
+                self._redis_client.delete(self._get_cancel_key(task_id))
+            except Exception as e:
+                logger.error(f"Redis error resetting task {task_id}: {e}. Falling back to memory.")
+                self._use_redis = False
+        self._save_task(task)
+        self.events.publish(task_id, self._diff_events(before, task))
+
+    def _save_task(self, task: dict) -> None:
+        """Overwrite a whole task record"""
+        if self._use_redis:
+            try:
+                self._redis_client.setex(
+                    self._get_redis_key(task["task_id"]),
+                    self.TASK_TTL,
+                    json.dumps(self._serialize_task(task))
+                )
+                return
+            except Exception as e:
+                logger.error(f"Redis error saving task {task['task_id']}: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        with self._lock:
+            self._memory_tasks[task["task_id"]] = task
+
+    def list_task_ids(self) -> List[str]:
+        """List IDs of all stored tasks"""
+        if self._use_redis:
+            try:
+                return [
+                    key[len("task:"):]
+                    for key in self._redis_client.scan_iter(match=self._get_redis_key("*"), count=500)
+                ]
+            except Exception as e:
+                logger.error(f"Redis error listing tasks: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        with self._lock:
+            return list(self._memory_tasks.keys())
+
+    # ===== Leases =====
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        """Take an expiring exclusive lease, or renew it if `owner` already holds it"""
+        if self._use_redis:
+            try:
+                key = f"lease:{name}"
+                if self._redis_client.set(key, owner, nx=True, ex=ttl_seconds):
+                    return True
+                if self._redis_client.get(key) == owner:
+                    self._redis_client.expire(key, ttl_seconds)
+                    return True
+                return False
+            except Exception as e:
+                logger.error(f"Redis error acquiring lease {name}: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        with self._lock:
+            now = time.monotonic()
+            holder = self._memory_leases.get(name)
+            if holder and holder[0] != owner and holder[1] > now:
+                return False
+            self._memory_leases[name] = (owner, now + ttl_seconds)
+            return True
+
+    def is_leased(self, name: str) -> bool:
+        """Check whether a lease is currently held by anyone"""
+        if self._use_redis:
+            try:
+                return self._redis_client.exists(f"lease:{name}") > 0
+            except Exception as e:
+                logger.error(f"Redis error checking lease {name}: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        with self._lock:
+            holder = self._memory_leases.get(name)
+            return bool(holder and holder[1] > time.monotonic())
+
+    def release_lease(self, name: str, owner: str) -> None:
+        """Release a lease held by `owner`"""
+        if self._use_redis:
+            try:
+                key = f"lease:{name}"
+                # Delete only if still held by the caller (WATCH aborts if it changed meanwhile)
+                with self._redis_client.pipeline() as pipe:
+                    pipe.watch(key)
+                    if pipe.get(key) == owner:
+                        pipe.multi()
+                        pipe.delete(key)
+                        pipe.execute()
+                    else:
+                        pipe.unwatch()
+                return
+            except redis.WatchError:
+                return
+            except Exception as e:
+                logger.error(f"Redis error releasing lease {name}: {e}. Falling back to memory.")
+                self._use_redis = False
+
+        with self._lock:
+            holder = self._memory_leases.get(name)
+            if holder and holder[0] == owner:
+                del self._memory_leases[name]
 
     def get_task(self, task_id: str) -> Optional[dict]:
         """Get task by ID"""
         if self._use_redis:
             try:
-                key = self._get_redis_key(task_id)
-                task_json = self._redis_client.get(key)
+                task = self._read_redis_task(task_id)
 
-                if task_json:
-                    task = json.loads(task_json)
-                    task = self._deserialize_task(task)
+                if task:
                     logger.debug(f"Retrieved task {task_id} from Redis")
                     return task
                 return None
@@ -268,6 +517,68 @@ class RedisTaskStore:
             logger.debug(f"Task {task_id} exists in memory: {exists}")
             return exists
 
+    # ===== Async API (for callers running on the event loop) =====
+
+    async def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Redis round trips run in the task store pool, memory operations inline"""
+        if self._use_redis:
+            return await self.executor.run("task_store", fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    @asynccontextmanager
+    async def _task_lock(self, task_id: str) -> AsyncIterator[None]:
+        """
+        Serialize the updates of a task within this process
+
+        Updates read, modify and write the whole record from pool threads, so
+        concurrent pipeline stages would otherwise overwrite each other's
+        checkpoints. The lock is FIFO: updates land in the order they were made.
+        """
+        entry = self._task_locks.get(task_id)
+        if entry is None:
+            entry = self._task_locks[task_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._task_locks[task_id]
+
+    async def acreate_task(self, task_id: str, source_type: str, source_data: dict) -> None:
+        await self._call(self.create_task, task_id, source_type, source_data)
+
+    async def aget_task(self, task_id: str) -> Optional[dict]:
+        return await self._call(self.get_task, task_id)
+
+    async def aupdate_task(self, task_id: str, **updates: Any) -> None:
+        async with self._task_lock(task_id):
+            await self._call(self.update_task, task_id, **updates)
+
+    async def acancel_task(self, task_id: str) -> None:
+        async with self._task_lock(task_id):
+            await self._call(self.cancel_task, task_id)
+
+    async def ais_cancelled(self, task_id: str) -> bool:
+        return await self._call(self.is_cancelled, task_id)
+
+    async def areset_for_resume(self, task_id: str) -> None:
+        async with self._task_lock(task_id):
+            await self._call(self.reset_for_resume, task_id)
+
+    async def alist_task_ids(self) -> List[str]:
+        return await self._call(self.list_task_ids)
+
+    async def aacquire_lease(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        return await self._call(self.acquire_lease, name, owner, ttl_seconds)
+
+    async def ais_leased(self, name: str) -> bool:
+        return await self._call(self.is_leased, name)
+
+    async def arelease_lease(self, name: str, owner: str) -> None:
+        await self._call(self.release_lease, name, owner)
+
 
 # Global instance
 task_store = RedisTaskStore()
@@ -0,0 +1,24 @@
+"""
+Text normalization
+Comparable forms of concept and icon names
+"""
+
+import re
+import unicodedata
+
+# Ligatures and letters that do not decompose into a base letter and an accent
+_LETTERS = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae", "ø": "o", "Ø": "o", "ł": "l", "Ł": "l"})
+
+# Everything but letters and digits separates words ("Plus-value", "S&P 500", "l'or")
+_SEPARATORS = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def fold_accents(text: str) -> str:
+    """Remove accents and expand ligatures ("Épargne" -> "Epargne", "œuvre" -> "oeuvre")"""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_LETTERS))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_name(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a name ("Plus-Value " -> "plus value")"""
+    return _SEPARATORS.sub(" ", fold_accents(name).casefold()).strip()
@@ -0,0 +1,391 @@
+"""
+Tolerant JSON decoding
+Recovers the data of slightly malformed JSON written by LLMs in one linear
+pass: markdown fences, unescaped quotes and apostrophes, invalid escapes,
+single-quoted strings, trailing or missing commas and truncated output
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+from app.core.blocking import blocking_executor
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class TolerantDecodeError(ValueError):
+    """Raised when no JSON value can be recovered from the text"""
+
+
+@dataclass
+class Decoded:
+    """Decoded value and the repairs that were needed (none for valid JSON)"""
+    value: Any
+    repairs: List[str] = field(default_factory=list)
+
+    @property
+    def repaired(self) -> bool:
+        return bool(self.repairs)
+
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Runs of plain string characters, consumed in one step
+_STRING_RUN = {
+    '"': re.compile(r'[^"\\\x00-\x1f]+'),
+    "'": re.compile(r"[^'\\\x00-\x1f]+"),
+}
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_\-]*")
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+# What may follow the closing quote of a string
+_AFTER_STRING = ",:}]"
+# What may follow the comma after a string value
+_AFTER_COMMA = "\"'{[]}-0123456789"
+
+
+class _Truncated(Exception):
+    """The text ended inside a value; `partial` is what could be kept of it"""
+
+    def __init__(self, partial: Any = None):
+        self.partial = partial
+
+
+class _Parser:
+    """Recursive descent parser that repairs instead of failing"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.repairs: List[str] = []
+
+    def _repair(self, name: str) -> None:
+        if name not in self.repairs:
+            self.repairs.append(name)
+
+    def _skip_ws(self) -> None:
+        text, pos, end = self.text, self.pos, len(self.text)
+        while pos < end and text[pos] in " \t\r\n":
+            pos += 1
+        self.pos = pos
+
+    def parse(self) -> Any:
+        starts = [i for i in (self.text.find("{"), self.text.find("[")) if i != -1]
+        if not starts:
+            raise TolerantDecodeError("No JSON object or array found")
+        self.pos = min(starts)
+        if self.text[:self.pos].strip():
+            self._repair("text before JSON")
+
+        try:
+            value = self._value()
+        except _Truncated as truncated:
+            self._repair("truncated")
+            if truncated.partial is None:
+                raise TolerantDecodeError("Text ends before any complete value")
+            return truncated.partial
+
+        if self.text[self.pos:].strip().strip("`").strip():
+            self._repair("text after JSON")
+        return value
+
+    def _value(self) -> Any:
+        self._skip_ws()
+        if self.pos >= len(self.text):
+            raise _Truncated()
+
+        char = self.text[self.pos]
+        if char in ",}]":
+            self._repair("missing value")
+            return None
+        if char == "{":
+            return self._object()
+        if char == "[":
+            return self._array()
+        if char in "\"'":
+            return self._string()
+        return self._literal()
+
+    def _object(self) -> Dict[str, Any]:
+        self.pos += 1
+        obj: Dict[str, Any] = {}
+        expect_comma = after_comma = False
+
+        while True:
+            self._skip_ws()
+            if self.pos >= len(self.text):
+                raise _Truncated(obj)
+
+            char = self.text[self.pos]
+            if char == "}":
+                if after_comma:
+                    self._repair("trailing comma")
+                self.pos += 1
+                return obj
+            if char == ",":
+                self.pos += 1
+                expect_comma = False
+                after_comma = True
+                continue
+            if char == "]":
+                self._repair("stray bracket")
+                self.pos += 1
+                continue
+
+            if expect_comma:
+                self._repair("missing comma")
+
+            if char in "\"'":
+                try:
+                    key = self._string()
+                except _Truncated:
+                    raise _Truncated(obj)
+            else:
+                match = _WORD.match(self.text, self.pos)
+                if not match:
+                    self._repair("stray character")
+                    self.pos += 1
+                    continue
+                self._repair("unquoted key")
+                key = match.group()
+                self.pos = match.end()
+
+            self._skip_ws()
+            if self.pos >= len(self.text):
+                raise _Truncated(obj)
+            if self.text[self.pos] == ":":
+                self.pos += 1
+            else:
+                self._repair("missing colon")
+
+            try:
+                obj[key] = self._value()
+            except _Truncated as truncated:
+                if isinstance(truncated.partial, (dict, list)):
+                    obj[key] = truncated.partial
+                raise _Truncated(obj)
+            expect_comma = True
+            after_comma = False
+
+    def _array(self) -> List[Any]:
+        self.pos += 1
+        items: List[Any] = []
+        after_comma = False
+
+        while True:
+            self._skip_ws()
+            if self.pos >= len(self.text):
+                raise _Truncated(items)
+
+            char = self.text[self.pos]
+            if char == "]":
+                if after_comma:
+                    self._repair("trailing comma")
+                self.pos += 1
+                return items
+            if char == ",":
+                self.pos += 1
+                after_comma = True
+                continue
+            if char == "}":
+                self._repair("stray bracket")
+                self.pos += 1
+                continue
+
+            try:
+                items.append(self._value())
+            except _Truncated:
+                # An incomplete trailing item is dropped
+                raise _Truncated(items)
+            after_comma = False
+
+    def _closes_string(self, pos: int) -> bool:
+        """Whether a quote at pos - 1 ends the string, judging by what follows"""
+        text, end = self.text, len(self.text)
+        start = pos
+        while pos < end and text[pos] in " \t\r\n":
+            pos += 1
+        if pos >= end or text[pos] in "`":
+            return True
+        if text[pos] == '"' and "\n" in text[start:pos]:
+            # Next member on the following line, comma missing
+            return True
+        if text[pos] not in _AFTER_STRING:
+            return False
+        if text[pos] != ",":
+            return True
+
+        pos += 1
+        while pos < end and text[pos] in " \t\r\n":
+            pos += 1
+        return pos >= end or text[pos] in _AFTER_COMMA
+
+    def _string(self) -> str:
+        text, end = self.text, len(self.text)
+        quote = text[self.pos]
+        if quote == "'":
+            self._repair("single quotes")
+        run = _STRING_RUN[quote]
+        pos = self.pos + 1
+        parts: List[str] = []
+
+        while pos < end:
+            match = run.match(text, pos)
+            if match:
+                parts.append(match.group())
+                pos = match.end()
+                if pos >= end:
+                    break
+
+            char = text[pos]
+            if char == quote:
+                if self._closes_string(pos + 1):
+                    self.pos = pos + 1
+                    return "".join(parts)
+                self._repair("unescaped quote")
+                parts.append(char)
+                pos += 1
+            elif char == "\\":
+                if pos + 1 >= end:
+                    break
+                escape = text[pos + 1]
+                if escape in _ESCAPES:
+                    parts.append(_ESCAPES[escape])
+                    pos += 2
+                elif escape == "u":
+                    digits = text[pos + 2:pos + 6]
+                    if len(digits) < 4:
+                        break
+                    try:
+                        parts.append(chr(int(digits, 16)))
+                        pos += 6
+                    except ValueError:
+                        self._repair("invalid escape")
+                        parts.append(escape)
+                        pos += 2
+                else:
+                    # e.g. \' written for an apostrophe
+                    self._repair("invalid escape")
+                    parts.append(escape)
+                    pos += 2
+            else:
+                # Raw control character (e.g. a newline) inside the string
+                self._repair("control character")
+                parts.append(char)
+                pos += 1
+
+        raise _Truncated()
+
+    def _literal(self) -> Any:
+        text = self.text
+        match = _NUMBER.match(text, self.pos)
+        if match:
+            if match.end() >= len(text):
+                raise _Truncated()
+            self.pos = match.end()
+            number = match.group()
+            return float(number) if any(c in number for c in ".eE") else int(number)
+
+        match = _WORD.match(text, self.pos)
+        if match:
+            if match.end() >= len(text):
+                raise _Truncated()
+            self.pos = match.end()
+            word = match.group()
+            if word in _LITERALS:
+                if word not in ("true", "false", "null"):
+                    self._repair("python literal")
+                return _LITERALS[word]
+            self._repair("bare word")
+            return word
+
+        # Skip characters that cannot start a value (always at least one, so
+        # e.g. a "-" without digits cannot loop back here)
+        self._repair("stray character")
+        pos, end = self.pos + 1, len(text)
+        while pos < end and text[pos] not in "{[\"',}]" and not (_NUMBER.match(text, pos) or _WORD.match(text, pos)):
+            pos += 1
+        self.pos = pos
+        return self._value()
+
+
+class DebugSink:
+    """Receives texts that had to be repaired or could not be decoded (no-op)"""
+
+    def capture(self, label: str, text: str, repairs: List[str], error: Optional[str] = None) -> None:
+        pass
+
+
+class MemoryDebugSink(DebugSink):
+    """Keeps the last captures in memory"""
+
+    def __init__(self, max_entries: int = 50):
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+
+    def capture(self, label: str, text: str, repairs: List[str], error: Optional[str] = None) -> None:
+        self.entries.append({"label": label, "text": text, "repairs": repairs, "error": error, "at": time.time()})
+
+
+class DirectoryDebugSink(DebugSink):
+    """Writes each capture to a JSON file, from the blocking pool so callers never wait on disk"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _write(self, label: str, text: str, repairs: List[str], error: Optional[str]) -> None:
+        name = f"{label}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json"
+        try:
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+                json.dump({"label": label, "repairs": repairs, "error": error, "text": text}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Could not write JSON debug capture: {str(e)}")
+
+    def capture(self, label: str, text: str, repairs: List[str], error: Optional[str] = None) -> None:
+        blocking_executor.executor.submit(self._write, label, text, repairs, error)
+
+
+def build_debug_sink(target: str) -> DebugSink:
+    """JSON_DEBUG_SINK: "" (disabled), "memory", or a directory to write captures to"""
+    if not target:
+        return DebugSink()
+    if target == "memory":
+        return MemoryDebugSink()
+    return DirectoryDebugSink(target)
+
+
+debug_sink: DebugSink = build_debug_sink(settings.JSON_DEBUG_SINK)
+
+
+def decode(text: str, label: str = "json") -> Decoded:
+    """
+    Decode JSON, repairing it if needed
+
+    Valid JSON, by far the most common case with JSON mode, goes through
+    the C json.loads. Anything else (fences and prose included) gets a
+    single tolerant pass that recovers what it can; an incomplete trailing
+    array item is dropped. Repaired and undecodable texts are passed to the
+    debug sink under `label`.
+
+    Raises:
+        TolerantDecodeError: If nothing could be recovered
+    """
+    try:
+        return Decoded(json.loads(text))
+    except ValueError:
+        pass
+
+    parser = _Parser(text)
+    try:
+        value = parser.parse()
+    except TolerantDecodeError as e:
+        debug_sink.capture(label, text, parser.repairs, str(e))
+        raise
+    debug_sink.capture(label, text, parser.repairs)
+    return Decoded(value, parser.repairs)
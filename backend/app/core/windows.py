@@ -0,0 +1,104 @@
+"""
+Transcript time windows
+Fixed time windows over transcript segments, so concepts can be extracted
+window by window and linked back to when the video mentions them
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.concept_normalizer import key_forms, stem_phrase
+from app.models.generation import ConceptExtraction
+
+
+@dataclass
+class TranscriptWindow:
+    """Segments of one time window, in seconds from the start of the video"""
+    index: int
+    start: float
+    end: float
+    text: str
+    segments: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "start": self.start,
+            "end": self.end,
+            "duration": round(self.end - self.start, 2),
+            "text": self.text,
+            "segments": len(self.segments),
+        }
+
+
+def _segment_end(segment: Dict[str, Any]) -> float:
+    return segment.get("start", 0.0) + segment.get("duration", 0.0)
+
+
+def split_windows(segments: Sequence[Dict[str, Any]], window_seconds: float) -> List[TranscriptWindow]:
+    """
+    Segments grouped into fixed windows: [0, w), [w, 2w), ...
+
+    A segment belongs to the window its start falls in, and windows without
+    speech are skipped. Boundaries do not depend on the content, so a change
+    in one part of a transcript leaves the other windows, and their cached
+    extractions, untouched. A last window shorter than half a window is
+    merged into the previous one instead of costing an extraction of its own.
+    """
+    if window_seconds <= 0:
+        raise ValueError("window_seconds must be positive")
+
+    slots: Dict[int, List[Dict[str, Any]]] = {}
+    for segment in segments:
+        if segment.get("text", "").strip():
+            slots.setdefault(int(segment.get("start", 0.0) // window_seconds), []).append(segment)
+
+    grouped = [slots[slot] for slot in sorted(slots)]
+    if len(grouped) > 1:
+        tail = grouped[-1]
+        if max(_segment_end(s) for s in tail) - tail[0].get("start", 0.0) < window_seconds / 2:
+            grouped.pop()
+            grouped[-1] = grouped[-1] + tail
+
+    return [
+        TranscriptWindow(
+            index=index,
+            start=round(members[0].get("start", 0.0), 2),
+            end=round(max(_segment_end(s) for s in members), 2),
+            text=" ".join(s["text"] for s in members),
+            segments=members
+        )
+        for index, members in enumerate(grouped)
+    ]
+
+
+def attach_times(
+    concepts: Sequence[ConceptExtraction],
+    segments: Sequence[Dict[str, Any]],
+    default: Optional[Tuple[float, float]] = None
+) -> List[ConceptExtraction]:
+    """
+    Concepts with start/end set from their mentions in `segments`
+
+    A concept spans from its first mentioning segment to the end of its last
+    one (names, plurals and aliases are matched on stemmed text), or gets
+    `default` when no segment mentions it verbatim. Concepts that already
+    have a start are kept as they are.
+    """
+    if all(c.start is not None for c in concepts):
+        return list(concepts)
+
+    texts = [f" {stem_phrase(s['text'])} " for s in segments]
+    located = []
+    for concept in concepts:
+        if concept.start is not None:
+            located.append(concept)
+            continue
+
+        forms = [f" {form} " for form in key_forms(concept.name)]
+        hits = [i for i, text in enumerate(texts) if any(form in text for form in forms)]
+        if hits:
+            span = (round(segments[hits[0]].get("start", 0.0), 2), round(_segment_end(segments[hits[-1]]), 2))
+        else:
+            span = default
+        located.append(concept if span is None else concept.model_copy(update={"start": span[0], "end": span[1]}))
+    return located
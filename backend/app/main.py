@@ -3,11 +3,38 @@ FastAPI Main Application
 Point d'entrée de l'API Finary Icons
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import icons, generate, health
 from app.core.logging import logger
+from app.services.container import services
+from app.workers.dispatcher import resume_interrupted_tasks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrage et arrêt de l'application"""
+    logger.info(f"🚀 {settings.PROJECT_NAME} starting...")
+    logger.info(f"📍 Environment: {settings.ENVIRONMENT}")
+    logger.info(f"🔧 Debug mode: {settings.DEBUG}")
+
+    # Clients créés une fois par process, partagés par les routes et les workers
+    await services.startup()
+    app.state.services = services
+
+    # With the Redis queue, interrupted jobs are reclaimed by workers instead
+    if settings.JOB_QUEUE_BACKEND == "inline" and settings.RESUME_INTERRUPTED_TASKS:
+        resumed = await resume_interrupted_tasks()
+        if resumed:
+            logger.info(f"♻️ Resumed {len(resumed)} interrupted tasks")
+
+    yield
+
+    logger.info(f"👋 {settings.PROJECT_NAME} shutting down...")
+    await services.shutdown()
+
 
 # Créer l'application
 app = FastAPI(
@@ -15,7 +42,8 @@ app = FastAPI(
     description="API de génération et gestion d'icônes style Finary",
     version=settings.VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS
@@ -33,18 +61,6 @@ app.include_router(health.router, tags=["health"])
 app.include_router(icons.router, prefix="/api", tags=["icons"])
 app.include_router(generate.router, prefix="/api", tags=["generate"])
 
-@app.on_event("startup")
-async def startup_event():
-    """Démarrage de l'application"""
-    logger.info(f"🚀 {settings.PROJECT_NAME} starting...")
-    logger.info(f"📍 Environment: {settings.ENVIRONMENT}")
-    logger.info(f"🔧 Debug mode: {settings.DEBUG}")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Arrêt de l'application"""
-    logger.info(f"👋 {settings.PROJECT_NAME} shutting down...")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -8,6 +8,7 @@ from .generation import (
     GenerationStatus,
     ConceptExtraction
 )
+from .image import GeneratedImage
 
 __all__ = [
     "Icon",
@@ -20,4 +21,5 @@ __all__ = [
     "GenerateResponse",
     "GenerationStatus",
     "ConceptExtraction",
+    "GeneratedImage",
 ]
@@ -2,7 +2,7 @@
 Generation request and response models
 """
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -18,6 +18,18 @@ class GenerationStatusEnum(str, Enum):
     UPLOADING = "uploading"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+# Statuses after which a task is not processed any more (until it is resumed)
+TERMINAL_STATUSES = frozenset({
+    GenerationStatusEnum.COMPLETED,
+    GenerationStatusEnum.FAILED,
+    GenerationStatusEnum.CANCELLED,
+})
+
+# Terminal statuses of a task that stopped before finishing; it can be resumed
+STOPPED_STATUSES = frozenset({GenerationStatusEnum.FAILED, GenerationStatusEnum.CANCELLED})
 
 
 class ConceptPriority(str, Enum):
@@ -34,6 +46,8 @@ class ConceptExtraction(BaseModel):
     priority: ConceptPriority = Field(..., description="Importance priority")
     visual_description: str = Field(..., description="Visual description for generation")
     context: Optional[str] = Field(None, description="Context from transcript")
+    start: Optional[float] = Field(None, description="First mention in the video, in seconds")
+    end: Optional[float] = Field(None, description="End of the last mention in the video, in seconds")
 
 
 class GenerateConceptRequest(BaseModel):
@@ -62,6 +76,15 @@ class GenerateYouTubeRequest(BaseModel):
     min_priority: ConceptPriority = Field(default=ConceptPriority.MEDIUM, description="Minimum priority level")
     style: str = Field(default="finary-glass-3d", description="Visual style")
     auto_generate: bool = Field(default=True, description="Auto-generate icons after extraction")
+    max_parallel_concepts: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Concepts processed concurrently (capped by MAX_PARALLEL_CONCEPTS)"
+    )
+    force_regenerate: bool = Field(
+        default=False,
+        description="Render every icon again instead of using cached images or existing icons"
+    )
 
     class Config:
         json_schema_extra = {
@@ -69,6 +92,35 @@ class GenerateYouTubeRequest(BaseModel):
                 "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
                 "max_concepts": 30,
                 "min_priority": "medium",
+                "auto_generate": True,
+                "max_parallel_concepts": 4
+            }
+        }
+
+
+class GenerateYouTubeBatchRequest(BaseModel):
+    """Request to generate icons from several YouTube videos or a playlist"""
+    youtube_urls: Optional[List[HttpUrl]] = Field(None, description="YouTube video URLs")
+    playlist_id: Optional[str] = Field(None, description="YouTube playlist ID or URL (needs YOUTUBE_API_KEY)")
+    max_concepts_per_video: int = Field(default=10, ge=1, description="Maximum concepts to extract per video")
+    max_total_concepts: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Maximum distinct concepts generated for the whole batch"
+    )
+    auto_generate: bool = Field(default=True, description="Auto-generate icons after extraction")
+
+    @model_validator(mode="after")
+    def check_source(self) -> "GenerateYouTubeBatchRequest":
+        if not self.youtube_urls and not self.playlist_id:
+            raise ValueError("Provide youtube_urls or playlist_id")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "playlist_id": "PLxxxxxxxxxxxxxxxx",
+                "max_concepts_per_video": 10,
                 "auto_generate": True
             }
         }
@@ -88,6 +140,8 @@ class GenerationStatus(BaseModel):
     # Results
     extracted_concepts: Optional[List[ConceptExtraction]] = None
     generated_icons: Optional[List[str]] = Field(None, description="List of generated icon IDs")
+    parent_task_id: Optional[str] = Field(None, description="Batch task this video belongs to")
+    child_task_ids: Optional[List[str]] = Field(None, description="Per-video tasks of a batch")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
 
@@ -107,3 +161,8 @@ class GenerateResponse(BaseModel):
                 "estimated_time_seconds": 120
             }
         }
+
+
+class GenerateBatchResponse(GenerateResponse):
+    """Response for batch generation request"""
+    child_task_ids: List[str] = Field(default_factory=list, description="Per-video task IDs")
@@ -0,0 +1,68 @@
+"""
+Binary image results
+Images travel through generation, background removal and upload as bytes
+with their metadata; base64 is only produced at the API edge
+"""
+
+import base64
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+
+def sniff_mime_type(data: bytes, default: str = "image/png") -> str:
+    """MIME type of image bytes from their signature"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+@dataclass(frozen=True)
+class GeneratedImage:
+    """An image and what produced it"""
+    data: bytes
+    mime_type: str = "image/png"
+    concept: Optional[str] = None
+    prompt: Optional[str] = None
+    animation_prompt: Optional[str] = None
+    style: Optional[str] = None
+    size: Optional[str] = None
+    # Served from the image cache instead of generated
+    cached: bool = False
+    background_removed: bool = False
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the image bytes"""
+        return memoryview(self.data)
+
+    def with_data(self, data: bytes, **changes: Any) -> "GeneratedImage":
+        """Same metadata around new image bytes (the old bytes are not copied)"""
+        return replace(self, data=data, **changes)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+    def to_dict(self, include_data: bool = False) -> Dict[str, Any]:
+        """
+        API representation: metadata, plus the image as base64 in
+        `image_data` only when the client asks for it
+        """
+        return {
+            "image_data": self.to_base64() if include_data else None,
+            "mime_type": self.mime_type,
+            "bytes": self.nbytes,
+            "concept": self.concept,
+            "prompt": self.prompt,
+            "animation_prompt": self.animation_prompt,
+            "style": self.style,
+            "size": self.size,
+            "cached": self.cached,
+            "background_removed": self.background_removed,
+        }
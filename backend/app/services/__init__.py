@@ -5,6 +5,7 @@ from .generation_service import GenerationService
 from .background_removal_service import BackgroundRemovalService
 from .youtube_service import YouTubeService
 from .concept_extraction_service import ConceptExtractionService
+from .container import ServiceContainer, get_services
 
 __all__ = [
     "SupabaseService",
@@ -12,4 +13,6 @@ __all__ = [
     "BackgroundRemovalService",
     "YouTubeService",
     "ConceptExtractionService",
+    "ServiceContainer",
+    "get_services",
 ]
@@ -6,6 +6,10 @@ Best background removal model 2025 with 8-bit alpha matting
 import replicate
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.adaptive_limiter import provider_slot
+from app.core.blocking import run_blocking
+from app.core.rate_limiter import rate_limiter
+from app.models.image import GeneratedImage
 from typing import Optional
 import base64
 from io import BytesIO
@@ -25,20 +29,27 @@ class BackgroundRemovalService:
             self.client = None
             logger.warning("Replicate API token not configured")
 
+        # Shared HTTP client for downloading results (keep-alive connections)
+        self.http = httpx.AsyncClient(timeout=60.0)
+
+    async def close(self):
+        """Close the download HTTP client"""
+        await self.http.aclose()
+
     async def remove_background(
         self,
-        image_data: bytes,
+        image: GeneratedImage,
         output_format: str = "png"
-    ) -> bytes:
+    ) -> GeneratedImage:
         """
         Remove background using BRIA RMBG 2.0
 
         Args:
-            image_data: Input image bytes
+            image: Input image
             output_format: Output format (png recommended for transparency)
 
         Returns:
-            Image bytes with removed background
+            The image with its background removed (same metadata)
         """
         if not self.client:
             raise Exception("Replicate client not initialized")
@@ -46,34 +57,45 @@ class BackgroundRemovalService:
         try:
             logger.info("Removing background with BRIA RMBG 2.0")
 
-            # Convert bytes to base64 data URI
-            image_b64 = base64.b64encode(image_data).decode('utf-8')
-            data_uri = f"data:image/png;base64,{image_b64}"
+            # File object over the image bytes (BytesIO shares the buffer until written to):
+            # the Replicate SDK uploads it, no data URI built here
+            image_file = BytesIO(image.data)
 
             # Run BRIA RMBG 2.0 model
             # This model provides 8-bit alpha matting (256 transparency levels)
             # +5-8 IoU points better than competitors
             # 50% fewer halo artifacts
-            output = self.client.run(
-                "briaai/RMBG-2.0:59626141ca33e4fb7cf0fbba36a2629d29aa4a728e7268abf314e0d8e16e7c9e",
-                input={
-                    "image": data_uri,
+            await rate_limiter.acquire("replicate")
+            async with provider_slot("replicate"):
+                model = "briaai/RMBG-2.0:59626141ca33e4fb7cf0fbba36a2629d29aa4a728e7268abf314e0d8e16e7c9e"
+                model_input = {
+                    "image": image_file,
                     "output_format": output_format
                 }
-            )
-
-            # Output is a URL to the processed image
-            if isinstance(output, str):
-                # Download the result
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(output)
+                if hasattr(self.client, "async_run"):
+                    # Native async client: the prediction is polled without blocking the loop
+                    output = await self.client.async_run(model, input=model_input)
+                else:
+                    # SDK without async support
+                    output = await run_blocking("replicate", self.client.run, model, input=model_input)
+
+                # Output is a URL to the processed image
+                if isinstance(output, str):
+                    # Download the result
+                    response = await self.http.get(output)
                     response.raise_for_status()
                     result_data = response.content
-            else:
-                result_data = output
+                elif hasattr(output, "aread"):
+                    # File output of newer SDKs, downloaded without blocking the loop
+                    result_data = await output.aread()
+                elif hasattr(output, "read"):
+                    # File output without async read: read() downloads synchronously
+                    result_data = await run_blocking("replicate", output.read)
+                else:
+                    result_data = output
 
             logger.info("Background removed successfully")
-            return result_data
+            return image.with_data(result_data, mime_type=f"image/{output_format}", background_removed=True)
 
         except Exception as e:
             logger.error(f"Failed to remove background: {str(e)}")
@@ -92,49 +114,50 @@ class BackgroundRemovalService:
         """
         try:
             # Decode base64
-            image_data = base64.b64decode(image_base64)
-
-            # Remove background
-            result_data = await self.remove_background(image_data, output_format)
+            image = GeneratedImage(data=base64.b64decode(image_base64))
 
-            # Encode back to base64
-            result_base64 = base64.b64encode(result_data).decode('utf-8')
-
-            return result_base64
+            # Remove background, then encode back to base64
+            return (await self.remove_background(image, output_format)).to_base64()
 
         except Exception as e:
             logger.error(f"Failed to process base64 image: {str(e)}")
             raise
 
+    def _remove_locally(self, image_data: bytes) -> bytes:
+        """Remove the background with the local rembg model"""
+        from rembg import remove
+        image = Image.open(BytesIO(image_data))
+        output = remove(image)
+
+        # Convert back to bytes
+        output_bytes = BytesIO()
+        output.save(output_bytes, format='PNG')
+        return output_bytes.getvalue()
+
     async def process_with_fallback(
         self,
-        image_data: bytes
-    ) -> bytes:
+        image: GeneratedImage
+    ) -> GeneratedImage:
         """
         Remove background with fallback to simple methods if API fails
         """
         try:
             # Try BRIA RMBG 2.0 first
-            return await self.remove_background(image_data)
+            return await self.remove_background(image)
 
         except Exception as e:
             logger.warning(f"BRIA RMBG 2.0 failed, using fallback: {str(e)}")
 
             # Fallback: Use rembg library
             try:
-                from rembg import remove
-                image = Image.open(BytesIO(image_data))
-                output = remove(image)
-
-                # Convert back to bytes
-                output_bytes = BytesIO()
-                output.save(output_bytes, format='PNG')
-                return output_bytes.getvalue()
+                # CPU-bound local model: run it in the blocking pool
+                result_data = await run_blocking("rembg", self._remove_locally, image.data)
+                return image.with_data(result_data, mime_type="image/png", background_removed=True)
 
             except Exception as fallback_error:
                 logger.error(f"Fallback also failed: {str(fallback_error)}")
                 # Return original image if all fails
-                return image_data
+                return image
 
 
 # Singleton instance
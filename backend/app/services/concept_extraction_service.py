@@ -3,11 +3,22 @@ Concept Extraction Service using GPT-4
 Extracts ALL concepts (not just financial) from transcripts
 """
 
+import asyncio
+import hashlib
 from openai import AsyncOpenAI
+from app.core.cache import build_cache
+from app.core.candidates import Candidate
+from app.core.concept_normalizer import canonical_key, merge_similar_concepts, similar_key, time_span
+from app.core.chunking import estimate_tokens, split_text
 from app.core.config import settings
+from app.core.json_stream import JsonArrayStream
 from app.core.logging import logger
+from app.core.rate_limiter import rate_limiter
+from app.core.windows import TranscriptWindow, attach_times
+from app.services.icon_index import icon_index
+from app.core import tolerant_json
 from app.models.generation import ConceptExtraction, ConceptPriority
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional
 import json
 
 
@@ -75,10 +86,82 @@ CATEGORIES = {
     }
 }
 
+# Lower rank = more important
+PRIORITY_RANK = {ConceptPriority.HIGH: 0, ConceptPriority.MEDIUM: 1, ConceptPriority.LOW: 2}
+
+
+def concept_key(name: str) -> str:
+    """Key under which two concept names are considered the same concept"""
+    return canonical_key(name)
+
+
+def raised_priority(priority: ConceptPriority, mentions: int) -> ConceptPriority:
+    """Priority of a concept mentioned by `mentions` chunks (3+: high, 2: at least medium)"""
+    if mentions >= 3:
+        return ConceptPriority.HIGH
+    if mentions == 2 and priority == ConceptPriority.LOW:
+        return ConceptPriority.MEDIUM
+    return priority
+
+
+def merge_concepts(chunk_results: List[List[ConceptExtraction]], max_contexts: int = 3) -> List[ConceptExtraction]:
+    """
+    Merge the concepts extracted from the chunks of one transcript
+
+    Same-name concepts become one: the description of its most important
+    occurrence is kept, its priority is raised by the number of chunks
+    mentioning it (3+ chunks: high, 2 chunks: at least medium), up to
+    `max_contexts` distinct context snippets are kept and its time span
+    covers every occurrence.
+    Sorted by priority, then mentions, then first appearance.
+    """
+    merged: Dict[str, ConceptExtraction] = {}
+    mentions: Dict[str, int] = {}
+    contexts: Dict[str, List[str]] = {}
+    occurrences: Dict[str, List[ConceptExtraction]] = {}
+
+    for concepts in chunk_results:
+        seen_in_chunk = set()
+        for concept in concepts:
+            key = concept_key(concept.name)
+            if not key:
+                continue
+
+            current = merged.get(key)
+            if current is None or PRIORITY_RANK[concept.priority] < PRIORITY_RANK[current.priority]:
+                merged[key] = concept
+            if key not in seen_in_chunk:
+                seen_in_chunk.add(key)
+                mentions[key] = mentions.get(key, 0) + 1
+
+            occurrences.setdefault(key, []).append(concept)
+            snippets = contexts.setdefault(key, [])
+            if concept.context and concept.context not in snippets and len(snippets) < max_contexts:
+                snippets.append(concept.context)
+
+    results = []
+    for key, concept in merged.items():
+        results.append(concept.model_copy(update={
+            "priority": raised_priority(concept.priority, mentions[key]),
+            "context": " | ".join(contexts[key]) or None,
+            **time_span(occurrences[key])
+        }))
+
+    order = {key: idx for idx, key in enumerate(merged)}
+    results.sort(key=lambda c: (
+        PRIORITY_RANK[c.priority],
+        -mentions[concept_key(c.name)],
+        order[concept_key(c.name)]
+    ))
+    return results
+
 
 class ConceptExtractionService:
     """Service for extracting concepts from text using GPT-4"""
 
+    MODEL = "gpt-4o"
+    SYSTEM_PROMPT = "You are an expert at analyzing content and extracting visual concepts for icon generation. You MUST return ONLY valid JSON with properly escaped quotes in strings. Never use unescaped quotes inside JSON string values."
+
     def __init__(self):
         """Initialize OpenAI client"""
         if settings.OPENAI_API_KEY:
@@ -88,65 +171,30 @@ class ConceptExtractionService:
             self.client = None
             logger.warning("OpenAI API key not configured")
 
-    def _repair_json(self, content: str) -> str:
-        """
-        Attempt to repair malformed JSON from GPT-4o
-        Fixes French apostrophes and other common issues
-        """
-        import re
-        import os
-        import tempfile
-        from datetime import datetime
-
-        # Save original for debugging
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        debug_file = os.path.join(tempfile.gettempdir(), f"gpt4o_response_{timestamp}.json")
-        try:
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                f.write(content)
-            logger.debug(f"Saved GPT-4o response to: {debug_file}")
-        except Exception as e:
-            logger.warning(f"Could not save debug file: {e}")
-
-        # Replace French apostrophe patterns that break JSON
-        # d'épargne -> de epargne, l'investissement -> le investissement
-        french_patterns = [
-            (r"d'(\w)", r"de \1"),
-            (r"D'(\w)", r"De \1"),
-            (r"l'(\w)", r"le \1"),
-            (r"L'(\w)", r"Le \1"),
-            (r"s'(\w)", r"se \1"),
-            (r"S'(\w)", r"Se \1"),
-            (r"n'(\w)", r"ne \1"),
-            (r"N'(\w)", r"Ne \1"),
-            (r"c'(\w)", r"ce \1"),
-            (r"C'(\w)", r"Ce \1"),
-            (r"m'(\w)", r"me \1"),
-            (r"M'(\w)", r"Me \1"),
-            (r"t'(\w)", r"te \1"),
-            (r"T'(\w)", r"Te \1"),
-            (r"qu'(\w)", r"que \1"),
-            (r"Qu'(\w)", r"Que \1"),
-        ]
-
-        original = content
-        for pattern, replacement in french_patterns:
-            content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
-
-        if content != original:
-            logger.info("Applied French apostrophe repairs to JSON")
-            # Save repaired version
-            repaired_file = os.path.join(tempfile.gettempdir(), f"gpt4o_repaired_{timestamp}.json")
-            try:
-                with open(repaired_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                logger.debug(f"Saved repaired JSON to: {repaired_file}")
-            except Exception as e:
-                logger.warning(f"Could not save repaired file: {e}")
-
-        return content
-
-    def _build_extraction_prompt(self, transcript: str, max_concepts: int = 30) -> str:
+        # Parsed concept lists by transcript hash and prompt version
+        self.cache = build_cache(
+            "concepts",
+            default_ttl=settings.CONCEPT_CACHE_TTL_SECONDS,
+            max_entries=settings.CONCEPT_CACHE_MAX_ENTRIES
+        )
+        self._prompt_version = None
+
+    async def warmup(self):
+        """Open the connection to OpenAI ahead of the first extraction"""
+        if self.client:
+            await self.client.models.retrieve(self.MODEL)
+
+    async def close(self):
+        """Close the OpenAI client and its connection pool"""
+        if self.client:
+            await self.client.close()
+
+    def _build_extraction_prompt(
+        self,
+        transcript: str,
+        max_concepts: int = 30,
+        candidates: Optional[List[Candidate]] = None
+    ) -> str:
         """Build prompt for GPT-4 to extract concepts"""
 
         categories_desc = "\n".join([
@@ -176,7 +224,7 @@ EXTRACTION RULES:
 5. Avoid duplicates or very similar concepts
 
 TRANSCRIPT TO ANALYZE:
-{transcript}
+{transcript}{self._candidates_section(candidates)}
 
 VISUAL DESCRIPTION REQUIREMENTS:
 - Keep descriptions SHORT and SIMPLE - maximum 2 sentences
@@ -222,177 +270,562 @@ Return ONLY valid JSON. NO markdown, NO explanation, NO additional text before o
 """
         return prompt
 
+    @staticmethod
+    def _candidates_section(candidates: Optional[List[Candidate]]) -> str:
+        """Prompt section with the mention counts measured locally (empty without candidates)"""
+        if not candidates:
+            return ""
+        lines = "\n".join(
+            f"- {c.term}: {c.mentions} mentions, in {c.spread:.0%} of the video"
+            for c in candidates
+        )
+        return f"""
+
+CANDIDATE TERMS WITH EXACT MENTION COUNTS (measured on the transcript):
+{lines}
+Use these counts for the PRIORITY GUIDE instead of counting mentions yourself.
+Candidates are hints: skip the ones that are not visual concepts, and add concepts they miss."""
+
+    def extract_concepts_locally(
+        self,
+        candidates: List[Candidate],
+        max_concepts: int = 30,
+        min_priority: ConceptPriority = ConceptPriority.MEDIUM
+    ) -> List[ConceptExtraction]:
+        """
+        Concepts built from local candidates only, without GPT-4o
+
+        Priority comes from the mention counts, the category from the
+        category examples when the term matches one ("objets" otherwise),
+        and the visual description from a fixed template.
+        """
+        examples = {
+            example.casefold(): category
+            for category, info in CATEGORIES.items()
+            for example in info["examples"]
+        }
+
+        concepts = []
+        for candidate in candidates:
+            if not self._meets_priority(candidate.priority, min_priority):
+                continue
+            concepts.append(ConceptExtraction(
+                name=candidate.term,
+                category=examples.get(candidate.term.casefold(), "objets"),
+                priority=candidate.priority,
+                visual_description=(
+                    f"3D glass icon representing {candidate.term}, frosted glass with soft blue and peach tones. "
+                    "Black background no reflection."
+                ),
+                context=f"Mentioned {candidate.mentions} times"
+            ))
+            if len(concepts) >= max_concepts:
+                break
+
+        concepts = merge_similar_concepts(concepts)
+        logger.info(f"Extracted {len(concepts)} concepts locally from {len(candidates)} candidates")
+        return concepts
+
     async def extract_concepts(
         self,
         transcript: str,
         max_concepts: int = 30,
-        min_priority: ConceptPriority = ConceptPriority.MEDIUM
+        min_priority: ConceptPriority = ConceptPriority.MEDIUM,
+        candidates: Optional[List[Candidate]] = None
     ) -> List[ConceptExtraction]:
         """
         Extract concepts from transcript using GPT-4
 
+        Transcripts longer than CONCEPT_CHUNK_TOKENS are split into overlapping
+        chunks extracted concurrently, then merged (map-reduce), so latency
+        follows the longest chunk rather than the whole video.
+
         Args:
             transcript: Text transcript to analyze
             max_concepts: Maximum number of concepts to extract
             min_priority: Minimum priority level to include
+            candidates: Locally found terms with their mention counts, given
+                to the model so it does not have to count mentions itself
 
         Returns:
             List of extracted concepts
         """
-        if not self.client:
-            raise Exception("OpenAI client not initialized")
+        cache_key = self._cache_key(transcript, max_concepts, candidates)
+        cached = await self.cache.get(cache_key) if settings.CONCEPT_CACHE_ENABLED else None
 
-        try:
-            logger.info(f"Extracting concepts from transcript ({len(transcript)} chars)")
-
-            prompt = self._build_extraction_prompt(transcript, max_concepts)
-
-            # Call GPT-4
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert at analyzing content and extracting visual concepts for icon generation. You MUST return ONLY valid JSON with properly escaped quotes in strings. Never use unescaped quotes inside JSON string values."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=4000,
-                response_format={"type": "json_object"}
+        if cached is not None:
+            concepts = [ConceptExtraction(**c) for c in cached]
+            logger.info(f"Concept cache hit ({len(concepts)} concepts), skipping OpenAI")
+        else:
+            if not self.client:
+                raise Exception("OpenAI client not initialized")
+
+            chunks = split_text(
+                transcript,
+                settings.CONCEPT_CHUNK_TOKENS,
+                settings.CONCEPT_CHUNK_OVERLAP_TOKENS
             )
 
-            # Parse response
-            content = response.choices[0].message.content
-            logger.debug(f"Response content: {content[:500]}")
+            if len(chunks) > 1:
+                concepts = await self._extract_chunked(chunks, max_concepts, candidates)
+            else:
+                concepts = await self._extract_from_text(transcript, max_concepts, candidates)
+
+            # Cached before the priority filter, which is applied on every read
+            if settings.CONCEPT_CACHE_ENABLED:
+                await self.cache.set(cache_key, [c.model_dump(mode="json") for c in concepts])
+
+        # Near-duplicates merged on every read, so alias and threshold changes apply to cached results
+        concepts = merge_similar_concepts(concepts)
+        # Priority filter after merging, as mentions across chunks can raise it
+        concepts = [c for c in concepts if self._meets_priority(c.priority, min_priority)][:max_concepts]
+
+        logger.info(f"Extracted {len(concepts)} concepts")
+        return concepts
+
+    async def extract_concepts_windowed(
+        self,
+        windows: List[TranscriptWindow],
+        max_concepts: int = 30,
+        min_priority: ConceptPriority = ConceptPriority.MEDIUM,
+        candidates: Optional[List[Candidate]] = None
+    ) -> List[ConceptExtraction]:
+        """
+        Extract concepts window by window (see app.core.windows)
+
+        Windows are extracted concurrently and each one is cached on its own
+        text, so re-running a video with other settings only calls GPT-4o
+        for the windows that changed. Concepts carry the time of their
+        mentions; merged concepts span every window mentioning them.
+        """
+        logger.info(f"Extracting concepts from {len(windows)} transcript windows")
+        slots = asyncio.Semaphore(settings.CONCEPT_CHUNK_CONCURRENCY)
+
+        async def extract(window: TranscriptWindow) -> List[ConceptExtraction]:
+            async with slots:
+                return [concept async for concept in self._window_concepts(window, candidates)]
+
+        results = await asyncio.gather(*(extract(window) for window in windows), return_exceptions=True)
+        succeeded = self._successful(results, "windows")
+
+        concepts = merge_similar_concepts(merge_concepts(succeeded))
+        concepts = [c for c in concepts if self._meets_priority(c.priority, min_priority)][:max_concepts]
+
+        logger.info(f"Extracted {len(concepts)} concepts from {len(succeeded)} windows")
+        return concepts
 
-            # Try to parse JSON, with fallback for malformed JSON
+    async def extract_concepts_stream(
+        self,
+        transcript: str,
+        max_concepts: int = 30,
+        min_priority: ConceptPriority = ConceptPriority.MEDIUM,
+        candidates: Optional[List[Candidate]] = None,
+        windows: Optional[List[TranscriptWindow]] = None
+    ) -> AsyncIterator[ConceptExtraction]:
+        """
+        Streaming variant of extract_concepts: yields each concept as soon as
+        GPT-4o has finished writing it, so callers can start working on the
+        first concepts while the rest is still being generated
+
+        Chunks of long transcripts are streamed concurrently. A concept is
+        yielded the first time it reaches min_priority (mentions in several
+        chunks raise it), so the order can differ from extract_concepts.
+        The merged extraction is cached once every chunk has completed.
+
+        With `windows`, transcript windows replace the token chunks: each one
+        is streamed or replayed from its own cache (see
+        extract_concepts_windowed) and its concepts carry their times.
+        """
+        if windows:
+            logger.info(f"Streaming concepts from {len(windows)} transcript windows")
+            sources = [self._window_concepts(window, candidates) for window in windows]
+        else:
+            cache_key = self._cache_key(transcript, max_concepts, candidates)
+            cached = await self.cache.get(cache_key) if settings.CONCEPT_CACHE_ENABLED else None
+
+            if cached is not None:
+                logger.info(f"Concept cache hit ({len(cached)} concepts), skipping OpenAI")
+                concepts = merge_similar_concepts([ConceptExtraction(**c) for c in cached])
+                for concept in [c for c in concepts if self._meets_priority(c.priority, min_priority)][:max_concepts]:
+                    yield concept
+                return
+
+            if not self.client:
+                raise Exception("OpenAI client not initialized")
+
+            chunks = split_text(
+                transcript,
+                settings.CONCEPT_CHUNK_TOKENS,
+                settings.CONCEPT_CHUNK_OVERLAP_TOKENS
+            )
+            if len(chunks) > 1:
+                logger.info(f"Long transcript: streaming concepts from {len(chunks)} chunks")
+            sources = [self._stream_from_text(chunk, max_concepts, candidates) for chunk in chunks]
+
+        # (chunk index, concept), then (chunk index, None or the error) when a chunk is done
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(settings.CONCEPT_CHUNK_CONCURRENCY)
+
+        async def produce(idx: int, source: AsyncIterator[ConceptExtraction]) -> None:
             try:
-                concepts_data = json.loads(content)
-                logger.info("Successfully parsed JSON on first attempt")
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse JSON on first attempt: {str(e)}")
-                logger.warning(f"Error at position {e.pos}, line {e.lineno}, column {e.colno}")
-                logger.debug(f"Problematic content around error: {content[max(0, e.pos-100):min(len(content), e.pos+100)]}")
-
-                # STEP 1: Remove markdown code blocks if present
-                if content.startswith("```"):
-                    content = content.split("```")[1]
-                    if content.startswith("json"):
-                        content = content[4:]
-                    content = content.strip()
-                    logger.info("Removed markdown code blocks")
-
-                # STEP 2: Apply French apostrophe repairs
-                content = self._repair_json(content)
-
-                # STEP 3: Try parsing again after repairs
-                try:
-                    concepts_data = json.loads(content)
-                    logger.info("✅ Successfully parsed JSON after French apostrophe repairs!")
-                except json.JSONDecodeError as e2:
-                    logger.warning(f"Failed to parse JSON even after repairs: {str(e2)}")
-                    logger.warning(f"Error at position {e2.pos}, line {e2.lineno}, column {e2.colno}")
-
-                    # STEP 4: Last resort - try ast.literal_eval
-                    import re
-                    try:
-                        import ast
-                        concepts_data = ast.literal_eval(content)
-                        logger.info("Successfully parsed JSON using ast.literal_eval")
-                    except:
-                        # STEP 5: Final fallback - extract concepts array manually
-                        try:
-                            match = re.search(r'"concepts"\s*:\s*\[(.*)\]', content, re.DOTALL)
-                            if match:
-                                logger.warning("Attempting to extract concepts array manually")
-                                concepts_data = json.loads('{"concepts": [' + match.group(1) + ']}')
-                                logger.info("Successfully extracted concepts array manually")
-                            else:
-                                logger.error(f"Failed to parse JSON even after all repair attempts")
-                                logger.error(f"Content around position {e2.pos}: {content[max(0, e2.pos-200):min(len(content), e2.pos+200)]}")
-                                raise Exception(f"Invalid JSON from GPT-4o even after repairs: {str(e2)}")
-                        except Exception as e3:
-                            logger.error(f"All parsing attempts failed: {str(e3)}")
-                            raise Exception(f"Invalid JSON from GPT-4o: {str(e)}")
-
-            # Handle wrapped JSON response from GPT-4o
-            if isinstance(concepts_data, dict):
-                # Check if concepts are wrapped in a key
-                if "concepts" in concepts_data:
-                    concepts_data = concepts_data["concepts"]
-                elif "items" in concepts_data:
-                    concepts_data = concepts_data["items"]
-                else:
-                    # Check if this is a single concept object (has the expected keys)
-                    expected_keys = {'name', 'category', 'priority', 'visual_description'}
-                    if expected_keys.issubset(set(concepts_data.keys())):
-                        # This is a single concept object, wrap it in an array
-                        logger.warning(f"GPT-4o returned a single concept object instead of array. Wrapping in array.")
-                        concepts_data = [concepts_data]
-                    else:
-                        # Log unexpected structure
-                        logger.error(f"Unexpected JSON structure from GPT-4o. Keys: {list(concepts_data.keys())}")
-                        logger.debug(f"Response content: {content[:500]}")
-                        raise Exception(f"Unexpected JSON format from GPT-4o. Expected array or object with 'concepts' key.")
-
-            # Ensure we have a list
-            if not isinstance(concepts_data, list):
-                logger.error(f"concepts_data is not a list after unwrapping: {type(concepts_data)}")
-                raise Exception(f"Expected list of concepts, got {type(concepts_data)}")
-
-            # Convert to ConceptExtraction objects
-            concepts = []
-            for item in concepts_data:
-                # Skip if below minimum priority
-                priority = ConceptPriority(item['priority'])
-                if min_priority == ConceptPriority.HIGH and priority != ConceptPriority.HIGH:
+                async with slots:
+                    async for concept in source:
+                        queue.put_nowait((idx, concept))
+            except Exception as e:
+                queue.put_nowait((idx, e))
+                return
+            queue.put_nowait((idx, None))
+
+        producers = [asyncio.ensure_future(produce(idx, source)) for idx, source in enumerate(sources)]
+        chunk_results: List[List[ConceptExtraction]] = [[] for _ in sources]
+        mentioned_in: Dict[str, set] = {}
+        best: Dict[str, ConceptPriority] = {}
+        yielded = set()
+        failures: List[Exception] = []
+        pending = len(sources)
+
+        try:
+            while pending:
+                idx, event = await queue.get()
+                if event is None or isinstance(event, Exception):
+                    pending -= 1
+                    if event is not None:
+                        failures.append(event)
                     continue
-                if min_priority == ConceptPriority.MEDIUM and priority == ConceptPriority.LOW:
+
+                chunk_results[idx].append(event)
+                key = concept_key(event.name)
+                if not key:
                     continue
+                # Near-duplicates of a concept count as mentions of it
+                key = similar_key(key, mentioned_in, settings.CONCEPT_MERGE_SIMILARITY) or key
+                if key in yielded:
+                    continue
+
+                mentioned_in.setdefault(key, set()).add(idx)
+                if key not in best or PRIORITY_RANK[event.priority] < PRIORITY_RANK[best[key]]:
+                    best[key] = event.priority
+                priority = raised_priority(best[key], len(mentioned_in[key]))
+
+                if len(yielded) < max_concepts and self._meets_priority(priority, min_priority):
+                    yielded.add(key)
+                    yield event.model_copy(update={"priority": priority})
+        finally:
+            for producer in producers:
+                producer.cancel()
+
+        if len(failures) == len(sources):
+            raise failures[0]
+        if failures:
+            logger.warning(f"{len(failures)}/{len(sources)} chunks failed, kept the concepts of the {len(sources) - len(failures)} others")
+        elif settings.CONCEPT_CACHE_ENABLED and not windows:
+            # Partial extractions are not cached (windows are cached one by one)
+            concepts = merge_concepts(chunk_results) if len(sources) > 1 else chunk_results[0]
+            await self.cache.set(cache_key, [c.model_dump(mode="json") for c in concepts])
+
+        logger.info(f"Streamed {len(yielded)} concepts")
+
+    @property
+    def prompt_version(self) -> str:
+        """
+        Hash of everything that shapes the extraction besides the transcript
+
+        Derived from the rendered prompt template (candidates section included),
+        system prompt, categories and model, so editing any of them invalidates
+        cached extractions.
+        """
+        if self._prompt_version is None:
+            placeholder = Candidate("{term}", 0, 0.0, 0.0, 0.0, 0.0)
+            template = self._build_extraction_prompt("{transcript}", 0, [placeholder])
+            material = json.dumps([self.MODEL, self.SYSTEM_PROMPT, template, CATEGORIES], sort_keys=True)
+            self._prompt_version = hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+        return self._prompt_version
+
+    @staticmethod
+    def _prompt_candidates(text: str, candidates: Optional[List[Candidate]]) -> List[Candidate]:
+        """
+        Candidates listed in the prompt of `text`: the terms it contains,
+        most mentioned first
+
+        Ordered by mention count rather than score, so the prompt (and its
+        cache key) does not change when the background corpus shifts IDF.
+        """
+        if not candidates:
+            return []
+        folded = text.casefold()
+        return sorted((c for c in candidates if c.term.casefold() in folded), key=lambda c: (-c.mentions, c.term))
+
+    def _candidates_hash(self, text: str, candidates: Optional[List[Candidate]]) -> str:
+        """Hash of the candidates section the prompt of `text` gets ("none" without candidates)"""
+        listed = self._prompt_candidates(text, candidates)
+        if not listed:
+            return "none"
+        return hashlib.sha256(self._candidates_section(listed).encode("utf-8")).hexdigest()[:16]
+
+    def _cache_key(self, transcript: str, max_concepts: int, candidates: Optional[List[Candidate]] = None) -> str:
+        """Cache key of an extraction: transcript hash, parameters, listed candidates and prompt version"""
+        transcript_hash = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+        chunking = f"{settings.CONCEPT_CHUNK_TOKENS}-{settings.CONCEPT_CHUNK_OVERLAP_TOKENS}"
+        return (
+            f"{self.prompt_version}:{self.MODEL}:{max_concepts}:{chunking}:"
+            f"{self._candidates_hash(transcript, candidates)}:{transcript_hash}"
+        )
+
+    def _window_cache_key(self, text: str, candidates: Optional[List[Candidate]] = None) -> str:
+        """Cache key of a window extraction: window text hash, per-window limit, its listed candidates and prompt version"""
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return (
+            f"{self.prompt_version}:{self.MODEL}:window-{settings.CONCEPT_WINDOW_MAX_CONCEPTS}:"
+            f"{self._candidates_hash(text, candidates)}:{text_hash}"
+        )
+
+    @staticmethod
+    def _meets_priority(priority: ConceptPriority, min_priority: ConceptPriority) -> bool:
+        return PRIORITY_RANK[priority] <= PRIORITY_RANK[min_priority]
+
+    async def _extract_chunked(
+        self,
+        chunks: List[str],
+        max_concepts: int,
+        candidates: Optional[List[Candidate]] = None
+    ) -> List[ConceptExtraction]:
+        """Map: extract every chunk concurrently. Reduce: merge the results."""
+        logger.info(f"Long transcript: extracting concepts from {len(chunks)} chunks")
+        slots = asyncio.Semaphore(settings.CONCEPT_CHUNK_CONCURRENCY)
+
+        async def extract(chunk: str) -> List[ConceptExtraction]:
+            async with slots:
+                return await self._extract_from_text(chunk, max_concepts, candidates)
+
+        results = await asyncio.gather(*(extract(chunk) for chunk in chunks), return_exceptions=True)
+        succeeded = self._successful(results, "chunks")
+
+        merged = merge_concepts(succeeded)
+        logger.info(f"Merged {sum(len(r) for r in succeeded)} chunk concepts into {len(merged)}")
+        return merged
+
+    @staticmethod
+    def _successful(results: List[Any], label: str) -> List[List[ConceptExtraction]]:
+        """Results of the parts that succeeded (raises when none did)"""
+        for result in results:
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+        failures = [r for r in results if isinstance(r, BaseException)]
+        succeeded = [r for r in results if not isinstance(r, BaseException)]
+
+        if not succeeded:
+            raise failures[0]
+        if failures:
+            logger.warning(f"{len(failures)}/{len(results)} {label} failed, merging the {len(succeeded)} others")
+        return succeeded
+
+    async def _window_concepts(
+        self,
+        window: TranscriptWindow,
+        candidates: Optional[List[Candidate]] = None
+    ) -> AsyncIterator[ConceptExtraction]:
+        """
+        Streamed extraction of one window, each concept with its times
 
-                concept = ConceptExtraction(
-                    name=item['name'],
-                    category=item['category'],
-                    priority=priority,
-                    visual_description=item['visual_description'],
-                    context=item.get('context')
-                )
-                concepts.append(concept)
+        Cached on the window text and the candidates its prompt lists (the
+        terms it contains, with their counts), so editing another window only
+        invalidates this one if it changes the count of a term both mention.
+        """
+        default = (window.start, window.end)
+        cache_key = self._window_cache_key(window.text, candidates)
+        cached = await self.cache.get(cache_key) if settings.CONCEPT_CACHE_ENABLED else None
 
-            logger.info(f"Extracted {len(concepts)} concepts")
-            return concepts
+        if cached is not None:
+            logger.debug(f"Window {window.index} cache hit ({len(cached)} concepts)")
+            for concept in attach_times([ConceptExtraction(**c) for c in cached], window.segments, default):
+                yield concept
+            return
+
+        if not self.client:
+            raise Exception("OpenAI client not initialized")
+
+        concepts = []
+        async for concept in self._stream_from_text(window.text, settings.CONCEPT_WINDOW_MAX_CONCEPTS, candidates):
+            concepts.append(concept)
+            yield attach_times([concept], window.segments, default)[0]
+
+        if settings.CONCEPT_CACHE_ENABLED:
+            await self.cache.set(cache_key, [c.model_dump(mode="json") for c in concepts])
+
+    async def _request_completion(
+        self,
+        transcript: str,
+        max_concepts: int,
+        candidates: Optional[List[Candidate]] = None,
+        stream: bool = False
+    ) -> Any:
+        """Send the extraction prompt to GPT-4o (a chunk stream if `stream`)"""
+        logger.info(f"Extracting concepts from transcript ({len(transcript)} chars)")
+
+        # Only the terms this chunk or window actually contains
+        candidates = self._prompt_candidates(transcript, candidates)
+        prompt = self._build_extraction_prompt(transcript, max_concepts, candidates)
+
+        # Respect OpenAI request and token quotas (prompt + completion budget)
+        await rate_limiter.acquire("openai")
+        await rate_limiter.acquire("openai_tokens", estimate_tokens(prompt) + 4000)
+
+        # Call GPT-4
+        return await self.client.chat.completions.create(
+            model=self.MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": self.SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0.3,
+            max_tokens=4000,
+            response_format={"type": "json_object"},
+            stream=stream
+        )
+
+    async def _extract_from_text(
+        self,
+        transcript: str,
+        max_concepts: int,
+        candidates: Optional[List[Candidate]] = None
+    ) -> List[ConceptExtraction]:
+        """Single GPT-4o extraction call (all priorities)"""
+        try:
+            response = await self._request_completion(transcript, max_concepts, candidates)
+            content = response.choices[0].message.content
+            return self._parse_concepts(content)
 
         except Exception as e:
             logger.error(f"Failed to extract concepts: {str(e)}")
             raise
 
-    async def check_existing_icon(self, concept_name: str) -> bool:
+    async def _stream_from_text(
+        self,
+        transcript: str,
+        max_concepts: int,
+        candidates: Optional[List[Candidate]] = None
+    ) -> AsyncIterator[ConceptExtraction]:
         """
-        Check if icon for this concept already exists
-        TODO: Implement database query
+        Single streamed GPT-4o extraction call (all priorities)
+
+        Yields each concept as soon as its JSON object is closed. The complete
+        text then goes through the regular parser, and concepts that could not
+        be decoded incrementally (malformed or missing array) follow.
         """
-        # TODO: Query Supabase to check if icon exists
-        return False
+        try:
+            stream = await self._request_completion(transcript, max_concepts, candidates, stream=True)
+            parser = JsonArrayStream()
+            yielded = set()
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                for item in parser.feed(chunk.choices[0].delta.content or ""):
+                    try:
+                        concept = self._to_concept(item)
+                    except Exception as e:
+                        logger.warning(f"Skipping invalid streamed concept: {str(e)}")
+                        continue
+                    yielded.add(concept_key(concept.name))
+                    yield concept
+
+            # The complete text recovers objects the incremental parser could not decode
+            for concept in self._parse_concepts(parser.text):
+                if concept_key(concept.name) not in yielded:
+                    yield concept
+
+        except Exception as e:
+            logger.error(f"Failed to extract concepts: {str(e)}")
+            raise
+
+    def _parse_concepts(self, content: str) -> List[ConceptExtraction]:
+        """Parse a complete extraction response, repairing malformed JSON"""
+        logger.debug(f"Response content: {content[:500]}")
+
+        # Malformed JSON is repaired in a single pass (see app.core.tolerant_json)
+        try:
+            decoded = tolerant_json.decode(content, label="concepts")
+        except tolerant_json.TolerantDecodeError as e:
+            logger.error(f"Could not recover any JSON from GPT-4o response: {str(e)}")
+            raise Exception(f"Invalid JSON from GPT-4o: {str(e)}")
+
+        if decoded.repaired:
+            logger.warning(f"Repaired malformed JSON from GPT-4o: {', '.join(decoded.repairs)}")
+        concepts_data = decoded.value
+
+        # Handle wrapped JSON response from GPT-4o
+        if isinstance(concepts_data, dict):
+            # Check if concepts are wrapped in a key
+            if "concepts" in concepts_data:
+                concepts_data = concepts_data["concepts"]
+            elif "items" in concepts_data:
+                concepts_data = concepts_data["items"]
+            else:
+                # Check if this is a single concept object (has the expected keys)
+                expected_keys = {'name', 'category', 'priority', 'visual_description'}
+                if expected_keys.issubset(set(concepts_data.keys())):
+                    # This is a single concept object, wrap it in an array
+                    logger.warning(f"GPT-4o returned a single concept object instead of array. Wrapping in array.")
+                    concepts_data = [concepts_data]
+                else:
+                    # Log unexpected structure
+                    logger.error(f"Unexpected JSON structure from GPT-4o. Keys: {list(concepts_data.keys())}")
+                    logger.debug(f"Response content: {content[:500]}")
+                    raise Exception(f"Unexpected JSON format from GPT-4o. Expected array or object with 'concepts' key.")
+
+        # Ensure we have a list
+        if not isinstance(concepts_data, list):
+            logger.error(f"concepts_data is not a list after unwrapping: {type(concepts_data)}")
+            raise Exception(f"Expected list of concepts, got {type(concepts_data)}")
+
+        # Convert to ConceptExtraction objects, skipping incomplete ones
+        concepts = []
+        for item in concepts_data:
+            try:
+                concepts.append(self._to_concept(item))
+            except Exception as e:
+                logger.warning(f"Skipping invalid concept: {str(e)}")
+
+        if concepts_data and not concepts:
+            raise Exception("No valid concept in GPT-4o response")
+        return concepts
+
+    @staticmethod
+    def _to_concept(item: Dict[str, Any]) -> ConceptExtraction:
+        return ConceptExtraction(
+            name=item['name'],
+            category=item['category'],
+            priority=ConceptPriority(item['priority']),
+            visual_description=item['visual_description'],
+            context=item.get('context')
+        )
+
+    async def check_existing_icon(self, concept_name: str) -> bool:
+        """Check if icon for this concept already exists"""
+        return icon_index.lookup(concept_name) is not None
+
+    async def match_existing_icons(self, concepts: List[ConceptExtraction]) -> Dict[str, str]:
+        """Existing icon ID per concept name, for the concepts that already have one"""
+        if not settings.REUSE_EXISTING_ICONS:
+            return {}
+        return await icon_index.amatch_concepts(concepts)
 
     async def filter_new_concepts(
         self,
         concepts: List[ConceptExtraction]
     ) -> List[ConceptExtraction]:
         """Filter out concepts that already have icons"""
-        new_concepts = []
-
-        for concept in concepts:
-            exists = await self.check_existing_icon(concept.name)
-            if not exists:
-                new_concepts.append(concept)
-            else:
-                logger.info(f"Icon already exists for: {concept.name}")
+        existing = await self.match_existing_icons(concepts)
+        for name in existing:
+            logger.info(f"Icon already exists for: {name}")
 
-        return new_concepts
+        return [c for c in concepts if c.name not in existing]
 
 
 # Singleton instance
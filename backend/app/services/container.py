@@ -0,0 +1,113 @@
+"""
+Application-scoped service container
+Provider clients are created once per process, warmed at startup,
+shared by routes and workers, and closed on shutdown
+"""
+
+import asyncio
+from typing import Any, Dict
+from app.core.config import settings
+from app.core.blocking import blocking_executor, loop_watchdog
+from app.core.candidates import background_corpus
+from app.core.logging import logger
+from app.core.task_store import task_store
+from app.services.youtube_service import youtube_service, YouTubeService
+from app.services.concept_extraction_service import concept_extraction_service, ConceptExtractionService
+from app.services.generation_service import generation_service, GenerationService
+from app.services.background_removal_service import background_removal_service, BackgroundRemovalService
+from app.services.supabase_service import supabase_service, SupabaseService
+from app.services.icon_index import icon_index
+
+
+class ServiceContainer:
+    """Holds the process-wide service instances and manages their lifecycle"""
+
+    def __init__(self):
+        self.youtube: YouTubeService = youtube_service
+        self.concepts: ConceptExtractionService = concept_extraction_service
+        self.generation: GenerationService = generation_service
+        self.bg_removal: BackgroundRemovalService = background_removal_service
+        self.supabase: SupabaseService = supabase_service
+        self.started = False
+
+    def _services(self) -> Dict[str, Any]:
+        return {
+            "youtube": self.youtube,
+            "concepts": self.concepts,
+            "generation": self.generation,
+            "bg_removal": self.bg_removal,
+            "supabase": self.supabase,
+        }
+
+    def configured(self) -> Dict[str, bool]:
+        """Which provider clients are configured"""
+        return {
+            name: getattr(service, "client", True) is not None
+            for name, service in self._services().items()
+        }
+
+    async def _warm(self, name: str, service: Any) -> None:
+        warmup = getattr(service, "warmup", None)
+        if warmup is None or getattr(service, "client", True) is None:
+            return
+        try:
+            await warmup()
+            logger.info(f"Warmed up {name} client")
+        except Exception as e:
+            logger.warning(f"Could not warm up {name} client: {str(e)}")
+
+    async def _load_icon_index(self) -> None:
+        if not settings.REUSE_EXISTING_ICONS or getattr(self.supabase, "client", None) is None:
+            return
+        try:
+            await icon_index.load(self.supabase)
+        except Exception as e:
+            logger.warning(f"Could not load icon index, existing icons will not be reused: {str(e)}")
+
+    async def startup(self) -> None:
+        """Warm up provider connections (TLS handshakes, connection pools) and load the icon index"""
+        if self.started:
+            return
+        self.started = True
+
+        if settings.LOOP_BLOCKING_DEBUG:
+            loop_watchdog.start()
+
+        if settings.WARM_CLIENTS_ON_STARTUP:
+            await asyncio.gather(*(
+                self._warm(name, service) for name, service in self._services().items()
+            ))
+
+        await self._load_icon_index()
+
+    async def shutdown(self) -> None:
+        """Close provider clients and their connection pools"""
+        for name, service in self._services().items():
+            close = getattr(service, "close", None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.warning(f"Error closing {name} client: {str(e)}")
+
+        try:
+            await icon_index.save()
+        except Exception as e:
+            logger.warning(f"Could not save icon index: {str(e)}")
+
+        background_corpus.flush()
+
+        loop_watchdog.stop()
+        blocking_executor.shutdown()
+        task_store.executor.shutdown()
+        self.started = False
+
+
+# Process-wide container
+services = ServiceContainer()
+
+
+def get_services() -> ServiceContainer:
+    """Service container accessor, usable as a FastAPI dependency"""
+    return services
@@ -6,15 +6,46 @@ from google import genai
 from google.genai import types
 from app.core.config import settings
 from app.core.logging import logger
-from typing import Optional, Dict, Any
+from app.core.adaptive_limiter import provider_slot
+from app.core.image_cache import image_cache, image_key
+from app.core.rate_limiter import rate_limiter
+from app.core.single_flight import SingleFlight
+from app.models.image import GeneratedImage, sniff_mime_type
+from typing import Optional, Dict, Any, List, Union
 import base64
+import hashlib
+import json
+import re
 from io import BytesIO
 from PIL import Image
 
 
+def _encode_flight_result(image: GeneratedImage) -> str:
+    """Image published to single-flight followers of other processes (Redis holds text)"""
+    return json.dumps({"mime_type": image.mime_type, "data": image.to_base64()})
+
+
+def _decode_flight_result(encoded: str) -> GeneratedImage:
+    payload = json.loads(encoded)
+    return GeneratedImage(data=base64.b64decode(payload["data"]), mime_type=payload["mime_type"])
+
+
+# Shared by every GenerationService instance of the process. Followers in the
+# same process share the leader's image object; base64 is only used across processes
+_generation_flight = SingleFlight(
+    "gemini-image",
+    use_redis=settings.SINGLE_FLIGHT_REDIS,
+    lock_ttl_seconds=settings.SINGLE_FLIGHT_LOCK_SECONDS,
+    encode=_encode_flight_result,
+    decode=_decode_flight_result
+)
+
+
 class GenerationService:
     """Service for generating icons using Gemini 3 Pro Image"""
 
+    MODEL = "gemini-3-pro-image-preview"  # Gemini 3 Pro Image
+
     def __init__(self):
         """Initialize Gemini API"""
         if settings.GEMINI_API_KEY:
@@ -24,6 +55,20 @@ class GenerationService:
             self.client = None
             logger.warning("Gemini API key not configured")
 
+    async def warmup(self):
+        """Open the connection to Gemini ahead of the first generation"""
+        if self.client:
+            await self.client.aio.models.get(model=self.MODEL)
+
+    async def close(self):
+        """Release the Gemini clients (sync and async)"""
+        aclose = getattr(getattr(self.client, "aio", None), "aclose", None)
+        if aclose:
+            await aclose()
+        close = getattr(self.client, "close", None)
+        if close:
+            close()
+
     def _build_prompt(
         self,
         concept: str,
@@ -64,59 +109,97 @@ Effects:
 
 Style: Professional, elegant, understated"""
 
+    def _flight_key(self, prompt: str, size: str) -> str:
+        """Deduplication key: normalized prompt + model + size"""
+        normalized = re.sub(r"\s+", " ", prompt).strip().casefold()
+        return hashlib.sha256(f"{self.MODEL}|{size}|{normalized}".encode("utf-8")).hexdigest()
+
+    async def _generate_image(self, prompt: str) -> GeneratedImage:
+        """Call Gemini and return the generated image bytes"""
+        await rate_limiter.acquire("gemini")
+        async with provider_slot("gemini"):
+            # Native async client (client.aio) keeps the loop free during generation
+            response = await self.client.aio.models.generate_content(
+                model=self.MODEL,
+                contents=[prompt],
+            )
+
+        # Extract generated image from response
+        for part in response.parts:
+            if part.inline_data is not None:
+                # Raw image bytes, kept as they are
+                image_bytes = part.inline_data.data
+                mime_type = getattr(part.inline_data, "mime_type", None) or sniff_mime_type(image_bytes)
+                return GeneratedImage(data=image_bytes, mime_type=mime_type)
+
+        raise Exception("No image generated by Gemini")
+
+    async def _render(self, prompt: str, cache_key: str) -> GeneratedImage:
+        """Generate the image with Gemini and store it in the image cache"""
+        image = await self._generate_image(prompt)
+        await image_cache.put(cache_key, image.data)
+        return image
+
     async def generate_icon(
         self,
         concept: str,
         style: str = "finary-glass-3d",
         category: Optional[str] = None,
-        size: str = "2048x2048"
-    ) -> Dict[str, Any]:
+        size: str = "2048x2048",
+        force_regenerate: bool = False
+    ) -> GeneratedImage:
         """
         Generate icon using Gemini 3 Pro Image (Nano Banana Pro)
 
+        Images already rendered for the same prompt, model, size and style
+        come from the image cache unless `force_regenerate` (the new render
+        then replaces the cached one).
+
         Returns:
-            Dict with image_data (base64), prompt, and animation_prompt
+            The image bytes with prompt, animation_prompt and whether it was cached
         """
-        if not self.client:
-            raise Exception("Gemini client not initialized")
-
         try:
             prompt = self._build_prompt(concept, style, category)
             animation_prompt = self._build_animation_prompt(concept, style)
-
-            logger.info(f"Generating icon for concept: {concept}")
-
-            # Generate image using Gemini 3 Pro Image
-            response = self.client.models.generate_content(
-                model="gemini-3-pro-image-preview",  # Gemini 3 Pro Image
-                contents=[prompt],
+            cache_key = image_key(prompt, self.MODEL, size, style)
+
+            cached = None
+            if force_regenerate:
+                image_cache.bypass()
+            else:
+                cached = await image_cache.get(cache_key)
+
+            if cached is not None:
+                logger.info(f"Image cache hit for concept: {concept}")
+                image = GeneratedImage(data=cached, mime_type=sniff_mime_type(cached), cached=True)
+            else:
+                if not self.client:
+                    raise Exception("Gemini client not initialized")
+
+                logger.info(f"Generating icon for concept: {concept}")
+
+                # Identical prompts requested concurrently (other tasks, other workers)
+                # share a single Gemini call
+                if settings.SINGLE_FLIGHT_ENABLED:
+                    image = await _generation_flight.do(
+                        self._flight_key(prompt, size),
+                        lambda: self._render(prompt, cache_key)
+                    )
+                else:
+                    image = await self._render(prompt, cache_key)
+
+                logger.info(f"Successfully generated icon for: {concept}")
+
+            # Metadata around the same bytes (no copy)
+            return image.with_data(
+                image.data,
+                concept=concept,
+                prompt=prompt,
+                animation_prompt=animation_prompt,
+                style=style,
+                size=size
             )
 
-            # Extract generated image from response
-            image_bytes = None
-            for part in response.parts:
-                if part.inline_data is not None:
-                    # Get raw image bytes directly from inline_data
-                    image_bytes = part.inline_data.data
-                    break
-
-            if image_bytes is None:
-                raise Exception("No image generated by Gemini")
-
-            # Convert bytes to base64
-            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-
-            logger.info(f"Successfully generated icon for: {concept}")
-
-            return {
-                "image_data": image_base64,
-                "prompt": prompt,
-                "animation_prompt": animation_prompt,
-                "concept": concept,
-                "style": style,
-                "size": size
-            }
-
         except Exception as e:
             logger.error(f"Failed to generate icon for {concept}: {str(e)}")
             raise
@@ -125,31 +208,28 @@ Style: Professional, elegant, understated"""
         self,
         concept: str,
         category: Optional[str] = None,
-        visual_description: Optional[str] = None
-    ) -> Optional[bytes]:
+        visual_description: Optional[str] = None,
+        force_regenerate: bool = False
+    ) -> Optional[GeneratedImage]:
         """
-        Generate icon from concept and return raw image bytes
+        Generate icon from concept, None if generation fails
 
         Args:
             concept: The concept name to generate
             category: Optional category
             visual_description: Optional detailed visual description (not used with template)
+            force_regenerate: Bypass the image cache
 
         Returns:
-            Image bytes or None if generation fails
+            Generated image or None if generation fails
         """
         try:
-            result = await self.generate_icon(
+            return await self.generate_icon(
                 concept=concept,
-                category=category
+                category=category,
+                force_regenerate=force_regenerate
             )
 
-            if result and "image_data" in result:
-                # Convert base64 back to bytes
-                return base64.b64decode(result["image_data"])
-
-            return None
-
         except Exception as e:
             logger.error(f"Failed to generate icon from concept {concept}: {str(e)}")
             return None
@@ -159,8 +239,8 @@ Style: Professional, elegant, understated"""
         concepts: list[str],
         style: str = "finary-glass-3d",
         category: Optional[str] = None
-    ) -> list[Dict[str, Any]]:
-        """Generate multiple icons in batch"""
+    ) -> List[Union[GeneratedImage, Dict[str, Any]]]:
+        """Generate multiple icons in batch ({concept, error} for the failed ones)"""
         results = []
 
         for concept in concepts:
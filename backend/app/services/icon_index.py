@@ -0,0 +1,446 @@
+"""
+Existing icon index
+Finds the existing icon of a concept so it is reused instead of generated
+again: exact canonical names and aliases first, then MinHash LSH over name
+trigrams and prompts for near-duplicates ("Crypto-monnaie" / "Cryptomonnaies").
+Persisted to a compact .npz file (16-bit signatures), so a restart only
+fetches the icons created since the last sync.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from threading import RLock
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+import numpy as np
+from app.core.blocking import run_blocking
+from app.core.candidates import STOPWORDS
+from app.core.concept_normalizer import KEY_VERSION, canonical_key, jaccard, number_tokens, trigrams
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.minhash import MinHasher, MinHashLSH, pack_strings, unpack_strings
+from app.core.text import normalize_name
+from app.models.generation import ConceptExtraction
+
+# Bump when the layout of the persisted arrays changes
+FORMAT_VERSION = 2
+
+# A prompt match also needs names at least this similar (shared prompt templates)
+MIN_PROMPT_NAME_SIMILARITY = 0.5
+
+# Prompt shingles found in more than this share of the prompts are template
+# boilerplate: left out of prompt signatures, or every prompt would share a bucket
+TEMPLATE_SHINGLE_SHARE = 0.5
+# Prompts indexed before the template shingles are measured and fixed
+TEMPLATE_SAMPLE = 50
+
+
+def prompt_shingles(prompt: str) -> List[str]:
+    """Word bigrams of a prompt, stopwords removed"""
+    words = [w for w in normalize_name(prompt).split() if len(w) > 1 and w not in STOPWORDS]
+    if len(words) < 2:
+        return words
+    return [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass
+class _PreparedIcon:
+    """Keys and signatures of one icon, computed off the event loop"""
+    icon_id: str
+    keys: List[str]
+    name_sigs: List[np.ndarray]
+    prompt_sig: Optional[np.ndarray]
+    tags: str
+    created_at: Optional[str]
+    # Prompt shingles, and whether template shingles were left out of prompt_sig
+    shingles: List[str]
+    filtered: bool
+
+
+class IconIndex:
+    """
+    Icon IDs by canonical concept key (accents, plurals and aliases ignored)
+
+    Names and `metadata.aliases` are indexed exactly and in a MinHash LSH
+    over their trigrams; prompts in a second LSH over word bigrams, only
+    trusted when the category matches and the names are somewhat similar.
+    Bigrams shared by most prompts (the generation template) are measured
+    on the first TEMPLATE_SAMPLE prompts and left out of prompt signatures.
+    Built from the icons table at startup (from the .npz file plus the
+    icons created since), kept up to date by `add` on every created icon,
+    and synced in the background once older than `refresh_seconds` to pick
+    up icons created by other processes.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        page_size: int = 1000,
+        refresh_seconds: float = 600,
+        name_similarity: float = 0.8,
+        prompt_similarity: float = 0.7,
+        num_perm: int = 64,
+        bands: int = 16
+    ):
+        self.path = path
+        self.page_size = page_size
+        self.refresh_seconds = refresh_seconds
+        self.name_similarity = name_similarity
+        self.prompt_similarity = prompt_similarity
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+
+        self._ids: Dict[str, str] = {}
+        self._indexed: set = set()
+        self.names = MinHashLSH(num_perm, bands)
+        self._name_keys: List[str] = []
+        self.prompts = MinHashLSH(num_perm, bands)
+        self._prompt_tags: List[str] = []
+        # Primary name key of each prompt entry
+        self._prompt_keys: List[str] = []
+        # Template shingles (None until TEMPLATE_SAMPLE prompts were seen) and the prompts seen until then
+        self._template: Optional[FrozenSet[str]] = None
+        self._sample: List[_PreparedIcon] = []
+        # Lookups may run in the blocking pool while the event loop indexes new icons
+        self._lock = RLock()
+
+        self.synced_at: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._source: Any = None
+        self._syncing: Optional[asyncio.Task] = None
+        self._dirty = False
+        self.matches: Counter = Counter()
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ===== Indexing =====
+
+    @staticmethod
+    def _names(icon: Dict[str, Any]) -> List[str]:
+        names = [icon.get("name") or ""]
+        aliases = (icon.get("metadata") or {}).get("aliases") or []
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        names.extend(a for a in aliases if isinstance(a, str))
+        return names
+
+    def _signature_shingles(self, shingles: List[str]) -> List[str]:
+        """Prompt shingles that go into its signature (template ones left out)"""
+        template = self._template or frozenset()
+        return [s for s in shingles if s not in template]
+
+    def _prepare_page(self, page: List[Dict[str, Any]]) -> List[_PreparedIcon]:
+        """Keys and signatures of a page of icons, all signatures hashed in one pass"""
+        filtered = self._template is not None
+        icons = []
+        for icon in page:
+            keys = list(dict.fromkeys(k for k in map(canonical_key, self._names(icon)) if k))
+            if icon.get("id") and keys:
+                shingles = prompt_shingles(icon.get("prompt") or "")
+                icons.append((icon, keys, shingles, self._signature_shingles(shingles)))
+        if not icons:
+            return []
+
+        name_sigs = iter(self.hasher.signatures([trigrams(k) for _, keys, _, _ in icons for k in keys]))
+        prompt_sigs = iter(self.hasher.signatures([kept for _, _, _, kept in icons if kept]))
+
+        prepared = []
+        for icon, keys, shingles, kept in icons:
+            tags = [icon.get("category") or ""] + list(icon.get("tags") or [])
+            prepared.append(_PreparedIcon(
+                icon_id=str(icon["id"]),
+                keys=keys,
+                name_sigs=[next(name_sigs) for _ in keys],
+                prompt_sig=next(prompt_sigs) if kept else None,
+                tags="|".join(t.casefold() for t in tags if isinstance(t, str) and t),
+                created_at=icon.get("created_at"),
+                shingles=shingles,
+                filtered=filtered
+            ))
+        return prepared
+
+    def _add_prompt(self, icon: _PreparedIcon, signature: np.ndarray) -> None:
+        self.prompts.add(icon.icon_id, signature)
+        self._prompt_tags.append(icon.tags)
+        self._prompt_keys.append(icon.keys[0])
+
+    def _apply(self, icon: _PreparedIcon) -> None:
+        with self._lock:
+            if icon.icon_id in self._indexed:
+                return
+            self._indexed.add(icon.icon_id)
+
+            for key, sig in zip(icon.keys, icon.name_sigs):
+                # The oldest icon of a name stays the canonical one
+                if key not in self._ids:
+                    self._ids[key] = icon.icon_id
+                    self.names.add(icon.icon_id, sig)
+                    self._name_keys.append(key)
+
+            if self._template is None:
+                if icon.shingles:
+                    self._sample.append(icon)
+                    self._add_prompt(icon, icon.prompt_sig)
+                    self._fix_template()
+            elif not icon.filtered:
+                # Prepared before the template was fixed
+                kept = self._signature_shingles(icon.shingles)
+                if kept:
+                    self._add_prompt(icon, self.hasher.signature(kept))
+            elif icon.prompt_sig is not None:
+                self._add_prompt(icon, icon.prompt_sig)
+            self._dirty = True
+
+    def _fix_template(self) -> None:
+        """Once TEMPLATE_SAMPLE prompts were seen, fix the template shingles and re-hash those prompts without them"""
+        if len(self._sample) < TEMPLATE_SAMPLE:
+            return
+        counts = Counter(s for icon in self._sample for s in set(icon.shingles))
+        limit = TEMPLATE_SHINGLE_SHARE * len(self._sample)
+        self._template = frozenset(s for s, n in counts.items() if n > limit)
+        logger.info(f"Icon index: {len(self._template)} template shingles left out of prompt signatures")
+
+        sample, self._sample = self._sample, []
+        self.prompts = MinHashLSH(self.hasher.num_perm, self.bands)
+        self._prompt_tags, self._prompt_keys = [], []
+        kept = [self._signature_shingles(icon.shingles) for icon in sample]
+        signatures = iter(self.hasher.signatures([k for k in kept if k]))
+        for icon, shingles in zip(sample, kept):
+            if shingles:
+                self._add_prompt(icon, next(signatures))
+        self.prompts.compact()
+
+    def add(self, icon: Dict[str, Any]) -> None:
+        """Index a newly created icon record"""
+        for prepared in self._prepare_page([icon]):
+            self._apply(prepared)
+
+    # ===== Loading, syncing and persistence =====
+
+    async def load(self, source: Any) -> int:
+        """
+        Load the index from its file, then sync it with `source` (SupabaseService)
+
+        Returns the number of indexed names.
+        """
+        self._source = source
+        started = time.perf_counter()
+        if not self.loaded and self.path:
+            arrays = await run_blocking("icon_index", self._read, self.path)
+            if arrays is not None:
+                self._restore(arrays)
+
+        added = await self.sync()
+        logger.info(
+            f"Icon index loaded: {len(self._ids)} names, {len(self.prompts)} prompts "
+            f"({added} new icons synced) in {time.perf_counter() - started:.2f}s"
+        )
+        return len(self._ids)
+
+    async def sync(self) -> int:
+        """Index the icons created since the last sync (all of them the first time)"""
+        since = latest = self.synced_at
+        added = 0
+        offset = 0
+        while True:
+            page = await self._source.list_icon_names(offset=offset, limit=self.page_size, since=since)
+            for icon in await run_blocking("icon_index", self._prepare_page, page):
+                if icon.icon_id not in self._indexed:
+                    self._apply(icon)
+                    added += 1
+                if icon.created_at and (latest is None or icon.created_at > latest):
+                    latest = icon.created_at
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size
+
+        self.synced_at = latest
+        self.loaded_at = time.monotonic()
+        with self._lock:
+            self.names.compact()
+            self.prompts.compact()
+        await self.save()
+        return added
+
+    async def _refresh(self) -> None:
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.warning(f"Could not refresh icon index: {str(e)}")
+            # Retry after another refresh interval, not on every lookup
+            self.loaded_at = time.monotonic()
+
+    def refresh_if_stale(self) -> None:
+        """Start a background sync if the index is older than refresh_seconds"""
+        if self._source is None or self.loaded_at is None or self.refresh_seconds <= 0:
+            return
+        if self._syncing is not None and not self._syncing.done():
+            return
+        if time.monotonic() - self.loaded_at >= self.refresh_seconds:
+            self._syncing = asyncio.ensure_future(self._refresh())
+
+    def _meta(self) -> np.ndarray:
+        return np.array([FORMAT_VERSION, self.hasher.num_perm, self.hasher.seed, self.bands], dtype=np.int64)
+
+    def _snapshot(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            arrays = {
+                "meta": self._meta(),
+                "key_version": np.array(KEY_VERSION),
+                "synced_at": np.array(self.synced_at or ""),
+                "name_keys": pack_strings(self._name_keys),
+                "prompt_tags": pack_strings(self._prompt_tags),
+                "prompt_keys": pack_strings(self._prompt_keys),
+                "template_fixed": np.array(self._template is not None),
+                "template": pack_strings(sorted(self._template or ())),
+            }
+            arrays.update(self.names.to_arrays("names"))
+            arrays.update(self.prompts.to_arrays("prompts"))
+        return arrays
+
+    def _restore(self, arrays: Dict[str, np.ndarray]) -> None:
+        if not np.array_equal(arrays["meta"], self._meta()) or str(arrays["key_version"]) != KEY_VERSION:
+            logger.info("Icon index file is outdated, rebuilding from the database")
+            return
+        if not bool(arrays["template_fixed"]):
+            # Too few prompts when saved: their shingles are needed again to measure the template
+            logger.info("Icon index file predates its prompt template, rebuilding from the database")
+            return
+
+        self._template = frozenset(unpack_strings(arrays["template"]))
+        self.names.load_arrays(arrays, "names")
+        self._name_keys = unpack_strings(arrays["name_keys"])
+        self._ids = dict(zip(self._name_keys, self.names.ids))
+        self.prompts.load_arrays(arrays, "prompts")
+        self._prompt_tags = unpack_strings(arrays["prompt_tags"])
+        self._prompt_keys = unpack_strings(arrays["prompt_keys"])
+        self._indexed = set(self.names.ids) | set(self.prompts.ids)
+        self.synced_at = str(arrays["synced_at"]) or None
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read icon index file: {str(e)}")
+            return None
+
+    @staticmethod
+    def _write(path: str, arrays: Dict[str, np.ndarray]) -> None:
+        directory = os.path.dirname(path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save icon index: {str(e)}")
+
+    async def save(self) -> None:
+        """Write the index file if anything changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        arrays = self._snapshot()
+        self._dirty = False
+        await run_blocking("icon_index", self._write, self.path, arrays)
+
+    # ===== Lookups =====
+
+    def lookup(self, name: str, prompt: Optional[str] = None, category: Optional[str] = None) -> Optional[str]:
+        """
+        ID of the existing icon for a concept, if any
+
+        Exact canonical name first, then a near-duplicate name, then (with
+        `prompt`) an icon of the same category drawn from a near-identical prompt.
+        """
+        with self._lock:
+            return self._lookup(name, prompt, category)
+
+    def _lookup(self, name: str, prompt: Optional[str], category: Optional[str]) -> Optional[str]:
+        key = canonical_key(name)
+        icon_id = self._ids.get(key) if key else None
+        if icon_id:
+            self.matches["exact"] += 1
+            return icon_id
+        if not key:
+            self.matches["miss"] += 1
+            return None
+
+        grams = trigrams(key)
+        if self.name_similarity < 1 and len(self.names):
+            numbers = number_tokens(key)
+            for row, _ in self.names.query(self.hasher.signature(grams), self.name_similarity):
+                if number_tokens(self._name_keys[row]) == numbers:
+                    self.matches["similar_name"] += 1
+                    return self.names.ids[row]
+
+        shingles = prompt_shingles(prompt) if prompt and self.prompt_similarity < 1 else []
+        shingles = self._signature_shingles(shingles)
+        if shingles and len(self.prompts):
+            category = (category or "").casefold()
+            for row, _ in self.prompts.query(self.hasher.signature(shingles), self.prompt_similarity):
+                if category and category not in self._prompt_tags[row].split("|"):
+                    continue
+                if jaccard(grams, trigrams(self._prompt_keys[row])) >= MIN_PROMPT_NAME_SIMILARITY:
+                    self.matches["similar_prompt"] += 1
+                    return self.prompts.ids[row]
+
+        self.matches["miss"] += 1
+        return None
+
+    def lookup_many(self, names: Iterable[str]) -> Dict[str, str]:
+        """{name: icon ID} for the names that already have an icon"""
+        self.refresh_if_stale()
+        found: Dict[str, str] = {}
+        for name in names:
+            icon_id = self.lookup(name)
+            if icon_id:
+                found[name] = icon_id
+        return found
+
+    def match_concepts(self, concepts: Iterable[ConceptExtraction]) -> Dict[str, str]:
+        """{concept name: icon ID} for the concepts that already have an icon"""
+        self.refresh_if_stale()
+        return self._match(list(concepts))
+
+    async def amatch_concepts(self, concepts: Iterable[ConceptExtraction]) -> Dict[str, str]:
+        """match_concepts run in the blocking pool, off the event loop"""
+        self.refresh_if_stale()
+        return await run_blocking("icon_index", self._match, list(concepts))
+
+    def _match(self, concepts: List[ConceptExtraction]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for concept in concepts:
+            icon_id = self.lookup(concept.name, prompt=concept.visual_description, category=concept.category)
+            if icon_id:
+                found[concept.name] = icon_id
+        return found
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "names": len(self._ids),
+            "prompts": len(self.prompts),
+            "loaded": self.loaded,
+            "synced_at": self.synced_at,
+            **self.matches,
+        }
+
+
+icon_index = IconIndex(
+    path=os.path.join(settings.CACHE_DIR, "icon_index.npz"),
+    refresh_seconds=settings.ICON_INDEX_REFRESH_SECONDS,
+    name_similarity=settings.ICON_MATCH_SIMILARITY,
+    prompt_similarity=settings.ICON_PROMPT_SIMILARITY
+)
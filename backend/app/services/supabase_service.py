@@ -5,6 +5,8 @@ Supabase database and storage service
 from supabase import create_client, Client
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.blocking import run_blocking
+from app.services.icon_index import icon_index
 from typing import Optional, List, Dict, Any
 import base64
 from io import BytesIO
@@ -25,6 +27,18 @@ class SupabaseService:
             )
             logger.info("Supabase client initialized")
 
+    async def warmup(self):
+        """Open the connection to Supabase ahead of the first request"""
+        if self.client:
+            await run_blocking("supabase.db", self.client.table("icons").select("id").limit(1).execute)
+
+    async def close(self):
+        """Close the PostgREST HTTP session"""
+        if self.client:
+            session = getattr(self.client.postgrest, "session", None)
+            if session is not None:
+                session.close()
+
     # ===== Icons Table Operations =====
 
     async def create_icon(self, icon_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -33,8 +47,9 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.table("icons").insert(icon_data).execute()
+            result = await run_blocking("supabase.db", self.client.table("icons").insert(icon_data).execute)
             logger.info(f"Created icon: {result.data[0].get('id')}")
+            icon_index.add(result.data[0])
             return result.data[0]
         except Exception as e:
             logger.error(f"Failed to create icon: {str(e)}")
@@ -46,7 +61,7 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.table("icons").select("*").eq("id", icon_id).execute()
+            result = await run_blocking("supabase.db", self.client.table("icons").select("*").eq("id", icon_id).execute)
             if result.data:
                 return result.data[0]
             return None
@@ -77,7 +92,7 @@ class SupabaseService:
             # Apply pagination
             query = query.range(offset, offset + limit - 1).order("created_at", desc=True)
 
-            result = query.execute()
+            result = await run_blocking("supabase.db", query.execute)
             total = result.count if result.count else 0
 
             return result.data, total
@@ -86,13 +101,34 @@ class SupabaseService:
             logger.error(f"Failed to list icons: {str(e)}")
             raise
 
+    async def list_icon_names(
+        self,
+        offset: int = 0,
+        limit: int = 1000,
+        since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Icon fields used by the icon index, oldest first, optionally only those created after `since`"""
+        if not self.client:
+            raise Exception("Supabase client not initialized")
+
+        try:
+            query = self.client.table("icons").select("id,name,category,tags,prompt,metadata,created_at")
+            if since:
+                query = query.gt("created_at", since)
+            query = query.order("created_at").range(offset, offset + limit - 1)
+            result = await run_blocking("supabase.db", query.execute)
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Failed to list icon names: {str(e)}")
+            raise
+
     async def update_icon(self, icon_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         """Update icon record"""
         if not self.client:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.table("icons").update(updates).eq("id", icon_id).execute()
+            result = await run_blocking("supabase.db", self.client.table("icons").update(updates).eq("id", icon_id).execute)
             logger.info(f"Updated icon: {icon_id}")
             return result.data[0]
         except Exception as e:
@@ -105,7 +141,7 @@ class SupabaseService:
             return
 
         try:
-            self.client.rpc("increment_download_count", {"icon_id": icon_id}).execute()
+            await run_blocking("supabase.db", self.client.rpc("increment_download_count", {"icon_id": icon_id}).execute)
         except Exception as e:
             logger.error(f"Failed to increment download count: {str(e)}")
 
@@ -123,14 +159,17 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.storage.from_(bucket).upload(
+            storage = self.client.storage.from_(bucket)
+            await run_blocking(
+                "supabase.storage",
+                storage.upload,
                 path=file_name,
                 file=file_data,
                 file_options={"content-type": content_type}
             )
 
-            # Get public URL
-            url = self.client.storage.from_(bucket).get_public_url(file_name)
+            # Get public URL (built locally, no request)
+            url = storage.get_public_url(file_name)
             logger.info(f"Uploaded image: {file_name}")
             return url
 
@@ -159,7 +198,9 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.storage.from_(bucket).create_signed_url(
+            result = await run_blocking(
+                "supabase.storage",
+                self.client.storage.from_(bucket).create_signed_url,
                 path=file_path,
                 expires_in=expires_in
             )
@@ -176,7 +217,7 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.table("generations").insert(task_data).execute()
+            result = await run_blocking("supabase.db", self.client.table("generations").insert(task_data).execute)
             return result.data[0]
         except Exception as e:
             logger.error(f"Failed to create generation task: {str(e)}")
@@ -188,7 +229,7 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.table("generations").update(updates).eq("task_id", task_id).execute()
+            result = await run_blocking("supabase.db", self.client.table("generations").update(updates).eq("task_id", task_id).execute)
             return result.data[0]
         except Exception as e:
             logger.error(f"Failed to update generation task: {str(e)}")
@@ -200,7 +241,7 @@ class SupabaseService:
             raise Exception("Supabase client not initialized")
 
         try:
-            result = self.client.table("generations").select("*").eq("task_id", task_id).execute()
+            result = await run_blocking("supabase.db", self.client.table("generations").select("*").eq("task_id", task_id).execute)
             if result.data:
                 return result.data[0]
             return None
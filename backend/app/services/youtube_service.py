@@ -2,9 +2,14 @@
 YouTube Transcript Extraction Service
 """
 
-from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, VideoUnavailable
+import requests
+from app.core.cache import build_cache
+from app.core.config import settings
 from app.core.logging import logger
-from typing import Optional, Dict, Any
+from app.core.blocking import run_blocking
+from app.core.windows import split_windows
+from typing import Optional, Dict, Any, List
 import re
 from urllib.parse import urlparse, parse_qs
 
@@ -12,10 +17,26 @@ from urllib.parse import urlparse, parse_qs
 class YouTubeService:
     """Service for extracting transcripts from YouTube videos"""
 
+    PLAYLIST_ITEMS_URL = "https://www.googleapis.com/youtube/v3/playlistItems"
+
     def __init__(self):
         """Initialize YouTube service"""
+        # One HTTP session per process so transcript fetches reuse connections
+        self.http = requests.Session()
+        self.api = YouTubeTranscriptApi(http_client=self.http)
+
+        # video ID + language -> segments, or a negative entry when missing
+        self.transcript_cache = build_cache(
+            "transcripts",
+            default_ttl=settings.TRANSCRIPT_CACHE_TTL_SECONDS,
+            max_entries=settings.TRANSCRIPT_CACHE_MAX_ENTRIES
+        )
         logger.info("YouTube service initialized")
 
+    async def close(self):
+        """Close the HTTP session"""
+        self.http.close()
+
     def extract_video_id(self, youtube_url: str) -> Optional[str]:
         """
         Extract video ID from various YouTube URL formats
@@ -52,6 +73,51 @@ class YouTubeService:
             logger.error(f"Failed to extract video ID: {str(e)}")
             return None
 
+    def _transcript_key(self, video_id: str, language: str) -> str:
+        return f"{video_id}:{language}"
+
+    async def _cache_missing(self, video_id: str, languages: List[str]) -> None:
+        """Remember that these languages have no transcript for the video"""
+        for lang in languages:
+            await self.transcript_cache.set(
+                self._transcript_key(video_id, lang),
+                {"missing": True},
+                ttl=settings.TRANSCRIPT_CACHE_NEGATIVE_TTL_SECONDS
+            )
+
+    async def _fetch_transcript(self, video_id: str, languages: List[str]) -> List[Dict[str, Any]]:
+        """Fetch from YouTube: list the transcripts once, then fetch the preferred language"""
+        try:
+            transcript_list = await run_blocking("youtube", self.api.list, video_id)
+        except (TranscriptsDisabled, VideoUnavailable):
+            await self._cache_missing(video_id, languages)
+            raise
+
+        available = {transcript.language_code for transcript in transcript_list}
+        missing = [lang for lang in languages if lang not in available]
+        if missing:
+            logger.info(f"No transcript in {missing} for video {video_id}")
+            await self._cache_missing(video_id, missing)
+
+        wanted = [lang for lang in languages if lang in available]
+        if not wanted:
+            raise Exception(f"No transcript available for this video in languages {languages}")
+
+        transcript = transcript_list.find_transcript(wanted)
+        transcript_data = await run_blocking("youtube", transcript.fetch)
+        logger.info(f"Got transcript in {transcript.language_code}")
+
+        # Convert FetchedTranscriptSnippet objects to dicts
+        segments = [
+            {'text': segment.text, 'start': segment.start, 'duration': segment.duration}
+            for segment in transcript_data
+        ]
+        if not segments:
+            raise Exception("No transcript available for this video")
+
+        await self.transcript_cache.set(self._transcript_key(video_id, transcript.language_code), segments)
+        return segments
+
     async def get_transcript(
         self,
         youtube_url: str,
@@ -60,6 +126,9 @@ class YouTubeService:
         """
         Get transcript from YouTube video
 
+        Transcripts (and missing languages) are cached per video ID and
+        language, so re-runs and retries do not call YouTube again.
+
         Args:
             youtube_url: YouTube video URL
             languages: Preferred languages (in order)
@@ -73,38 +142,19 @@ class YouTubeService:
             if not video_id:
                 raise ValueError(f"Could not extract video ID from URL: {youtube_url}")
 
-            logger.info(f"Fetching transcript for video: {video_id}")
-
-            # Create API instance (v1.2.3 uses instance methods)
-            api = YouTubeTranscriptApi()
-
-            # Try to fetch transcript one language at a time
-            # (v1.2.3 doesn't handle multiple languages well)
-            transcript_data = None
+            # Cached languages in preference order; stop at the first unknown one
             for lang in languages:
-                try:
-                    transcript_data = api.fetch(video_id, [lang])
-                    logger.info(f"Got transcript in {lang}")
+                cached = await self.transcript_cache.get(self._transcript_key(video_id, lang))
+                if cached is None:
                     break
-                except Exception as e:
-                    logger.warning(f"Could not get transcript in {lang}: {str(e)}")
-                    continue
-
-            # If still no transcript, raise error
-            if not transcript_data:
-                raise Exception(f"No transcript available for this video in languages {languages}")
-
-            if not transcript_data:
-                raise Exception("No transcript available for this video")
-
-            # Convert FetchedTranscriptSnippet objects to dicts
-            segments = []
-            for segment in transcript_data:
-                segments.append({
-                    'text': segment.text,
-                    'start': segment.start,
-                    'duration': segment.duration
-                })
+                if isinstance(cached, list):
+                    logger.info(f"Transcript cache hit for video {video_id} ({lang}, {len(cached)} segments)")
+                    return cached
+            else:
+                raise Exception(f"No transcript available for this video in languages {languages} (cached)")
+
+            logger.info(f"Fetching transcript for video: {video_id}")
+            segments = await self._fetch_transcript(video_id, list(languages))
 
             logger.info(f"Successfully fetched transcript ({len(segments)} segments)")
 
@@ -114,47 +164,82 @@ class YouTubeService:
             logger.error(f"Failed to get transcript for {youtube_url}: {str(e)}")
             raise
 
+    def extract_playlist_id(self, playlist: str) -> Optional[str]:
+        """
+        Extract playlist ID from a playlist URL or a bare playlist ID
+
+        Supports:
+        - https://www.youtube.com/playlist?list=PLAYLIST_ID
+        - https://www.youtube.com/watch?v=VIDEO_ID&list=PLAYLIST_ID
+        - PLAYLIST_ID
+        """
+        playlist = str(playlist).strip()
+        if "://" in playlist or "list=" in playlist:
+            query_params = parse_qs(urlparse(playlist).query)
+            return query_params.get('list', [None])[0]
+
+        if re.fullmatch(r'[0-9A-Za-z_-]{10,64}', playlist):
+            return playlist
+        return None
+
+    async def get_playlist_video_urls(self, playlist_id: str, max_videos: int = 200) -> List[str]:
+        """
+        List the video URLs of a playlist with the YouTube Data API
+
+        Requires YOUTUBE_API_KEY. Pages through the playlist 50 items at a time.
+        """
+        if not settings.YOUTUBE_API_KEY:
+            raise Exception("YouTube API key not configured, cannot read playlists")
+
+        urls: List[str] = []
+        page_token = None
+        try:
+            while len(urls) < max_videos:
+                params = {
+                    "part": "contentDetails",
+                    "playlistId": playlist_id,
+                    "maxResults": 50,
+                    "key": settings.YOUTUBE_API_KEY
+                }
+                if page_token:
+                    params["pageToken"] = page_token
+
+                response = await run_blocking(
+                    "youtube", self.http.get, self.PLAYLIST_ITEMS_URL, params=params, timeout=30
+                )
+                response.raise_for_status()
+                data = response.json()
+
+                for item in data.get("items", []):
+                    video_id = (item.get("contentDetails") or {}).get("videoId")
+                    if video_id:
+                        urls.append(f"https://www.youtube.com/watch?v={video_id}")
+
+                page_token = data.get("nextPageToken")
+                if not page_token:
+                    break
+
+            logger.info(f"Playlist {playlist_id}: {len(urls[:max_videos])} videos")
+            return urls[:max_videos]
+
+        except Exception as e:
+            logger.error(f"Failed to list playlist {playlist_id}: {str(e)}")
+            raise
+
     async def get_transcript_segments(
         self,
         youtube_url: str,
-        min_duration: float = 5.0
-    ) -> list[Dict[str, Any]]:
+        window_seconds: float = 60.0
+    ) -> List[Dict[str, Any]]:
         """
-        Get transcript as time-segmented chunks
+        Get transcript as fixed time windows
 
         Useful for extracting concepts from specific parts of the video
+        (see app.core.windows)
         """
         try:
-            result = await self.get_transcript(youtube_url)
-            segments = result['segments']
-
-            # Group segments by minimum duration
-            grouped_segments = []
-            current_group = []
-            current_duration = 0
-
-            for segment in segments:
-                current_group.append(segment)
-                current_duration += segment['duration']
-
-                if current_duration >= min_duration:
-                    grouped_segments.append({
-                        "text": " ".join([s['text'] for s in current_group]),
-                        "start": current_group[0]['start'],
-                        "duration": current_duration
-                    })
-                    current_group = []
-                    current_duration = 0
-
-            # Add remaining segments
-            if current_group:
-                grouped_segments.append({
-                    "text": " ".join([s['text'] for s in current_group]),
-                    "start": current_group[0]['start'],
-                    "duration": current_duration
-                })
-
-            return grouped_segments
+            segments = await self.get_transcript(youtube_url)
+            return [window.to_dict() for window in split_windows(segments, window_seconds)]
 
         except Exception as e:
             logger.error(f"Failed to segment transcript: {str(e)}")
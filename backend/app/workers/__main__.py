@@ -0,0 +1,7 @@
+"""Run the generation worker: python -m app.workers"""
+
+import asyncio
+from app.workers.runner import main
+
+if __name__ == "__main__":
+    asyncio.run(main())
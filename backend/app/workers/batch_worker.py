@@ -0,0 +1,451 @@
+"""
+YouTube batch worker
+Processes a playlist or a list of videos as one job: transcripts and concepts
+are fetched concurrently, concepts are deduplicated across the whole batch,
+then every distinct concept goes through one shared icon pipeline
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.core.concept_normalizer import cluster_names
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.task_store import task_store
+from app.models.generation import STOPPED_STATUSES, TERMINAL_STATUSES, GenerationStatusEnum, ConceptExtraction
+from app.services.concept_extraction_service import concept_key
+from app.services.container import ServiceContainer, get_services
+from app.workers.cancellation import cancellable, raise_if_cancelled
+from app.workers.leases import TaskAlreadyRunning, task_lease
+from app.workers.youtube_worker import (
+    ConceptJob,
+    IconPipeline,
+    _already_finished,
+    _extract,
+    _extraction_input,
+    _finish_cancelled,
+    _load_icons_checkpoint
+)
+
+
+# Lower rank = more important
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+def _priority(concept: ConceptExtraction) -> str:
+    return getattr(concept.priority, "value", concept.priority)
+
+
+def merge_batch_concepts(
+    per_video: Dict[str, List[ConceptExtraction]],
+    max_total: Optional[int] = None
+) -> Tuple[List[ConceptExtraction], List[List[str]]]:
+    """
+    Deduplicate concepts across the videos of a batch
+
+    Near-duplicate names (accents, plurals, aliases, similar spellings) are
+    clustered over the whole batch in one indexed pass.
+    Returns the distinct concepts, most important first (priority, then number
+    of videos mentioning them), and for each the child task IDs it came from.
+    """
+    entries = [
+        (child_id, concept)
+        for child_id, concepts in per_video.items()
+        for concept in concepts
+        if concept_key(concept.name)
+    ]
+    labels = cluster_names([concept.name for _, concept in entries])
+
+    merged: Dict[int, ConceptExtraction] = {}
+    owners: Dict[int, List[str]] = {}
+
+    for key, (child_id, concept) in zip(labels, entries):
+        current = merged.get(key)
+        if current is None or PRIORITY_RANK.get(_priority(concept), 3) < PRIORITY_RANK.get(_priority(current), 3):
+            merged[key] = concept
+        if child_id not in owners.setdefault(key, []):
+            owners[key].append(child_id)
+
+    keys = sorted(merged, key=lambda k: (PRIORITY_RANK.get(_priority(merged[k]), 3), -len(owners[k])))
+    if max_total:
+        keys = keys[:max_total]
+
+    return [merged[k] for k in keys], [owners[k] for k in keys]
+
+
+class BatchIconPipeline(IconPipeline):
+    """Icon pipeline of a batch: also reports each icon to the videos sharing its concept"""
+
+    def __init__(self, *args, owners: List[List[str]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owners = owners
+
+    def icons_of(self, child_id: str) -> List[str]:
+        """Stored icon IDs of the concepts of one video, in concept order"""
+        return [
+            result[1]
+            for result, owners in zip(self.results, self.owners)
+            if result and result[1] and child_id in owners
+        ]
+
+    async def _generate(self, job: ConceptJob) -> Optional[ConceptJob]:
+        """Skip concepts whose videos were all cancelled on their own"""
+        owners = self.owners[job.index]
+        cancelled = [child_id for child_id in owners if await task_store.ais_cancelled(child_id)]
+        if owners and len(cancelled) == len(owners):
+            logger.info(f"[{self.task_id}] Skipping {job.concept.name}: its videos were cancelled")
+            await self._finish(job, None)
+            return None
+        return await super()._generate(job)
+
+    async def _finish(self, job: ConceptJob, result: Optional[Tuple[str, Optional[str]]]) -> None:
+        await super()._finish(job, result)
+        if result and result[1]:
+            for child_id in self.owners[job.index]:
+                await task_store.aupdate_task(child_id, generated_icons=self.icons_of(child_id))
+
+
+def _remap_checkpoint(
+    checkpointed: Dict[int, Tuple[str, Optional[str]]],
+    concepts: List[ConceptExtraction]
+) -> Dict[int, Tuple[str, Optional[str]]]:
+    """
+    Checkpointed icons re-attached to the concepts by name
+
+    Concept indices change when the batch concepts are merged again (videos
+    retried on resume add theirs), names do not.
+    """
+    by_name = {concept_key(name): (name, icon_id) for name, icon_id in checkpointed.values()}
+    remapped = {}
+    for idx, concept in enumerate(concepts):
+        result = by_name.get(concept_key(concept.name))
+        if result:
+            remapped[idx] = result
+    return remapped
+
+
+async def reset_batch_for_resume(task_id: str, child_task_ids: List[str]) -> List[str]:
+    """
+    Make the unfinished videos of a batch run again
+
+    Videos that failed (e.g. a transient transcript or LLM error) or were
+    cancelled with the whole batch are reset, and the merged concepts are
+    dropped from the checkpoint so they are merged again with the concepts of
+    the retried videos. Videos cancelled on their own stay cancelled.
+    Returns the reset child task IDs.
+    """
+    reset = []
+    for child_id in child_task_ids:
+        child = await task_store.aget_task(child_id)
+        if not child or child["status"] == GenerationStatusEnum.COMPLETED:
+            continue
+        if child["status"] == GenerationStatusEnum.CANCELLED and not (child.get("metadata") or {}).get("cancelled_with_batch"):
+            continue
+        await task_store.areset_for_resume(child_id)
+        await task_store.aupdate_task(child_id, metadata={"cancelled_with_batch": None})
+        reset.append(child_id)
+
+    if reset:
+        await task_store.aupdate_task(task_id, checkpoint={"owners": None})
+        logger.info(f"[{task_id}] Retrying {len(reset)} unfinished videos of the batch")
+    return reset
+
+
+async def _prepare_video(
+    parent_id: str,
+    child_id: str,
+    youtube_url: str,
+    max_concepts: int,
+    services: ServiceContainer,
+    transcript_slots: asyncio.Semaphore,
+    extraction_slots: asyncio.Semaphore
+) -> Optional[List[ConceptExtraction]]:
+    """Transcript and concepts of one video of the batch (None if it failed)"""
+    saved = await task_store.aget_task(child_id) or {}
+    if saved.get("status") in STOPPED_STATUSES:
+        return None
+
+    try:
+        transcript = saved.get("transcript")
+        if not transcript:
+            async with transcript_slots:
+                await raise_if_cancelled(parent_id)
+                await task_store.aupdate_task(
+                    child_id,
+                    status=GenerationStatusEnum.PROCESSING,
+                    progress=5,
+                    message="Extracting YouTube transcript..."
+                )
+                segments = await services.youtube.get_transcript(youtube_url)
+
+            if not segments:
+                raise Exception("Failed to extract transcript from YouTube video")
+
+            transcript = [
+                {"text": seg["text"], "start": seg["start"], "duration": seg["duration"]}
+                for seg in segments
+            ]
+            await task_store.aupdate_task(
+                child_id,
+                progress=20,
+                message=f"Transcript extracted ({len(transcript)} segments)",
+                transcript=transcript
+            )
+
+        saved_concepts = saved.get("extracted_concepts")
+        if saved_concepts:
+            return [ConceptExtraction(**c) for c in saved_concepts]
+
+        async with extraction_slots:
+            await raise_if_cancelled(parent_id)
+            await task_store.aupdate_task(
+                child_id,
+                status=GenerationStatusEnum.EXTRACTING_CONCEPTS,
+                progress=25,
+                message="Analyzing transcript with GPT-4..."
+            )
+            extraction = await _extraction_input(child_id, transcript, services.youtube.extract_video_id(youtube_url))
+            concepts = await _extract(services.concepts, extraction, max_concepts)
+
+        if not concepts:
+            raise Exception("No concepts could be extracted from the transcript")
+
+        await task_store.aupdate_task(
+            child_id,
+            progress=40,
+            message=f"Extracted {len(concepts)} concepts",
+            extracted_concepts=[c.model_dump() for c in concepts]
+        )
+        return concepts
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        error_msg = f"YouTube generation failed: {str(e)}"
+        logger.error(f"[{parent_id}] Video {child_id}: {error_msg}")
+        await task_store.aupdate_task(
+            child_id,
+            status=GenerationStatusEnum.FAILED,
+            error=error_msg,
+            message=error_msg
+        )
+        return None
+
+
+async def process_youtube_batch(
+    task_id: str,
+    youtube_urls: List[str],
+    child_task_ids: List[str],
+    max_concepts_per_video: int = 10,
+    max_total_concepts: Optional[int] = None,
+    auto_generate: bool = True,
+    playlist_id: Optional[str] = None
+):
+    """
+    Background job for a batch of YouTube videos
+
+    Args:
+        task_id: Parent task identifier (aggregate progress)
+        youtube_urls: Video URLs, in the same order as child_task_ids
+        child_task_ids: Per-video task identifiers
+        max_concepts_per_video: Maximum concepts extracted per video
+        max_total_concepts: Maximum distinct concepts generated for the batch
+        auto_generate: Whether to generate icons after extraction
+        playlist_id: Source playlist, if any (informational)
+
+    Like single videos, the batch resumes from its checkpoint when run again.
+    """
+    try:
+        async with task_lease(task_id):
+            if await _already_finished(task_id):
+                return
+
+            try:
+                async with cancellable(task_id):
+                    await _run_youtube_batch(
+                        task_id,
+                        youtube_urls,
+                        child_task_ids,
+                        max_concepts_per_video,
+                        max_total_concepts,
+                        auto_generate
+                    )
+            except asyncio.CancelledError:
+                if not await task_store.ais_cancelled(task_id):
+                    # Worker shutdown, not a user cancellation: leave it resumable
+                    raise
+                await _finish_cancelled(task_id)
+                for child_id in child_task_ids:
+                    child = await task_store.aget_task(child_id)
+                    if child and child["status"] not in TERMINAL_STATUSES:
+                        await task_store.acancel_task(child_id)
+                        await task_store.aupdate_task(child_id, metadata={"cancelled_with_batch": True})
+    except TaskAlreadyRunning as e:
+        logger.warning(f"[{task_id}] {str(e)}, skipping")
+
+
+async def _run_youtube_batch(
+    task_id: str,
+    youtube_urls: List[str],
+    child_task_ids: List[str],
+    max_concepts_per_video: int,
+    max_total_concepts: Optional[int],
+    auto_generate: bool
+):
+    """Body of process_youtube_batch, run while holding the parent lease"""
+    try:
+        logger.info(f"[{task_id}] Starting YouTube batch of {len(youtube_urls)} videos")
+
+        saved_task = await task_store.aget_task(task_id) or {}
+        checkpoint = saved_task.get("checkpoint") or {}
+        services = get_services()
+
+        # Step 1: transcripts and concepts of every video, concurrently (0-40%)
+        saved_concepts = saved_task.get("extracted_concepts")
+        if saved_concepts and checkpoint.get("owners"):
+            concepts = [ConceptExtraction(**c) for c in saved_concepts]
+            owners: List[List[str]] = checkpoint["owners"]
+            logger.info(f"[{task_id}] Resuming with {len(concepts)} checkpointed batch concepts")
+        else:
+            await task_store.aupdate_task(
+                task_id,
+                status=GenerationStatusEnum.PROCESSING,
+                progress=5,
+                message=f"Extracting transcripts of {len(youtube_urls)} videos..."
+            )
+
+            transcript_slots = asyncio.Semaphore(settings.BATCH_TRANSCRIPT_CONCURRENCY)
+            extraction_slots = asyncio.Semaphore(settings.BATCH_EXTRACTION_CONCURRENCY)
+            prepared = 0
+
+            async def prepare(child_id: str, url: str) -> Optional[List[ConceptExtraction]]:
+                nonlocal prepared
+                result = await _prepare_video(
+                    task_id, child_id, url, max_concepts_per_video,
+                    services, transcript_slots, extraction_slots
+                )
+                prepared += 1
+                await task_store.aupdate_task(
+                    task_id,
+                    progress=5 + int(prepared / len(child_task_ids) * 35),
+                    message=f"Analyzed {prepared}/{len(child_task_ids)} videos"
+                )
+                return result
+
+            results = await asyncio.gather(*(
+                prepare(child_id, url) for child_id, url in zip(child_task_ids, youtube_urls)
+            ))
+            per_video = {
+                child_id: result
+                for child_id, result in zip(child_task_ids, results)
+                if result
+            }
+            if not per_video:
+                raise Exception("No concepts could be extracted from any video of the batch")
+
+            concepts, owners = merge_batch_concepts(per_video, max_total_concepts)
+            total = sum(len(c) for c in per_video.values())
+            logger.info(f"[{task_id}] {len(concepts)} distinct concepts from {len(per_video)} videos ({total} extracted)")
+
+            await task_store.aupdate_task(
+                task_id,
+                status=GenerationStatusEnum.EXTRACTING_CONCEPTS,
+                progress=40,
+                message=f"{len(concepts)} distinct concepts from {len(per_video)} videos ({total} extracted)",
+                extracted_concepts=[c.model_dump() for c in concepts],
+                checkpoint={"owners": owners}
+            )
+
+        # Videos whose transcript and concepts were extracted
+        active_children = []
+        for child_id in child_task_ids:
+            child = await task_store.aget_task(child_id)
+            if child and child["status"] not in STOPPED_STATUSES:
+                active_children.append(child_id)
+
+        if not auto_generate:
+            for child_id in active_children:
+                await task_store.aupdate_task(
+                    child_id,
+                    status=GenerationStatusEnum.COMPLETED,
+                    progress=100,
+                    message="Concept extraction completed."
+                )
+            await task_store.aupdate_task(
+                task_id,
+                status=GenerationStatusEnum.COMPLETED,
+                progress=100,
+                message=f"Concept extraction completed. {len(concepts)} distinct concepts ready for generation."
+            )
+            return
+
+        await raise_if_cancelled(task_id)
+
+        # Step 2: one pipeline for the whole batch, paced by the provider limiters (45-80%)
+        await task_store.aupdate_task(
+            task_id,
+            status=GenerationStatusEnum.GENERATING_IMAGES,
+            progress=45,
+            message=f"Generating {len(concepts)} icons..."
+        )
+        for child_id in active_children:
+            await task_store.aupdate_task(
+                child_id,
+                status=GenerationStatusEnum.GENERATING_IMAGES,
+                progress=45,
+                message="Generating icons with the rest of the batch..."
+            )
+
+        icon_pipeline = BatchIconPipeline(
+            task_id,
+            concepts,
+            services.generation,
+            services.bg_removal,
+            services.supabase,
+            # The adaptive limiter and rate limiter decide how many calls really run
+            generation_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+            checkpointed=_remap_checkpoint(_load_icons_checkpoint(checkpoint), concepts),
+            concept_service=services.concepts,
+            owners=owners
+        )
+        await icon_pipeline.run()
+
+        generated_concepts = icon_pipeline.generated_concepts
+        generated_icon_ids = icon_pipeline.generated_icon_ids
+        if not generated_concepts:
+            raise Exception("Failed to generate any icons")
+
+        for child_id in active_children:
+            icon_ids = icon_pipeline.icons_of(child_id)
+            await task_store.aupdate_task(
+                child_id,
+                status=GenerationStatusEnum.COMPLETED,
+                progress=100,
+                message=f"{len(icon_ids)} icons generated with the batch",
+                generated_icons=icon_ids
+            )
+
+        failed_videos = len(child_task_ids) - len(active_children)
+        message = f"Generated {len(generated_concepts) - icon_pipeline.reused} icons for {len(active_children)} videos"
+        if icon_pipeline.reused:
+            message += f", reused {icon_pipeline.reused} existing icons"
+        if failed_videos:
+            message += f" ({failed_videos} videos failed)"
+
+        await task_store.aupdate_task(
+            task_id,
+            status=GenerationStatusEnum.COMPLETED,
+            progress=100,
+            message=message,
+            generated_icons=generated_icon_ids
+        )
+        logger.info(f"[{task_id}] YouTube batch completed. {message}")
+
+    except Exception as e:
+        error_msg = f"YouTube batch failed: {str(e)}"
+        logger.error(f"[{task_id}] {error_msg}")
+        await task_store.aupdate_task(
+            task_id,
+            status=GenerationStatusEnum.FAILED,
+            error=error_msg,
+            message=error_msg
+        )
@@ -0,0 +1,61 @@
+"""
+Task cancellation
+Stops a running task when its cancelled flag is set in the task store,
+whichever process the cancel request was received by
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.task_store import task_store
+
+
+# task_id -> asyncio task running it in this process
+_running: Dict[str, asyncio.Task] = {}
+
+
+async def raise_if_cancelled(task_id: str) -> None:
+    """Checkpoint between stages: stop here if the task was cancelled"""
+    if await task_store.ais_cancelled(task_id):
+        raise asyncio.CancelledError()
+
+
+def cancel_running(task_id: str) -> bool:
+    """Cancel the task immediately if it runs in this process"""
+    running = _running.get(task_id)
+    if running is None or running.done():
+        return False
+
+    logger.info(f"[{task_id}] Cancelling in-process task")
+    running.cancel()
+    return True
+
+
+@asynccontextmanager
+async def cancellable(task_id: str) -> AsyncIterator[None]:
+    """
+    Run the enclosed block as the cancellable body of a task
+
+    A watcher polls the cancelled flag (set by another process) and cancels
+    the current asyncio task, which interrupts in-flight provider awaits.
+    """
+    current = asyncio.current_task()
+    _running[task_id] = current
+
+    async def watch() -> None:
+        while True:
+            await asyncio.sleep(settings.CANCEL_POLL_SECONDS)
+            if await task_store.ais_cancelled(task_id):
+                logger.info(f"[{task_id}] Cancellation requested, stopping")
+                current.cancel()
+                return
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        if _running.get(task_id) is current:
+            del _running[task_id]
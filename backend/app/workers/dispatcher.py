@@ -0,0 +1,99 @@
+"""
+Job dispatch
+Routes generation jobs either to in-process BackgroundTasks or to the durable job queue
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from fastapi import BackgroundTasks
+from app.core.config import settings
+from app.core.job_queue import get_job_queue
+from app.core.logging import logger
+from app.core.task_store import task_store
+from app.models.generation import TERMINAL_STATUSES
+from app.workers.leases import is_task_running
+from app.workers.batch_worker import process_youtube_batch, reset_batch_for_resume
+from app.workers.youtube_worker import process_youtube_generation
+
+
+# Job type -> coroutine function called with the job payload as keyword arguments
+JOB_HANDLERS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "youtube": process_youtube_generation,
+    "youtube_batch": process_youtube_batch,
+}
+
+# Inline jobs started outside a request (kept referenced until done)
+_inline_jobs: Set[asyncio.Task] = set()
+
+
+async def dispatch_job(
+    background_tasks: Optional[BackgroundTasks],
+    job_type: str,
+    payload: Dict[str, Any]
+) -> None:
+    """
+    Hand a job to the configured backend
+
+    - inline: run inside the web process with FastAPI BackgroundTasks
+    - redis: push to the Redis stream, consumed by `python -m app.workers`
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    if settings.JOB_QUEUE_BACKEND == "redis":
+        await get_job_queue().enqueue(job_type, payload)
+        return
+
+    logger.debug(f"Running {job_type} job inline")
+    if background_tasks is not None:
+        background_tasks.add_task(JOB_HANDLERS[job_type], **payload)
+        return
+
+    job = asyncio.ensure_future(JOB_HANDLERS[job_type](**payload))
+    _inline_jobs.add(job)
+    job.add_done_callback(_inline_jobs.discard)
+
+
+async def resume_task(task_id: str, background_tasks: Optional[BackgroundTasks] = None) -> None:
+    """
+    Re-dispatch a task from its stored source data
+
+    The worker picks up the checkpoint and skips finished stages and concepts.
+    """
+    task = await task_store.aget_task(task_id)
+    if not task:
+        raise ValueError(f"Task {task_id} not found")
+
+    # Videos of a batch are processed by their parent task
+    parent_id = task["source_data"].get("parent_task_id")
+    if parent_id:
+        await resume_task(parent_id, background_tasks)
+        return
+
+    job_type = task["source_type"]
+    await task_store.areset_for_resume(task_id)
+    if job_type == "youtube_batch":
+        # Videos that failed or were cancelled with the batch are retried too
+        await reset_batch_for_resume(task_id, task["source_data"].get("child_task_ids") or [])
+    await dispatch_job(background_tasks, job_type, {"task_id": task_id, **task["source_data"]})
+
+
+async def resume_interrupted_tasks() -> List[str]:
+    """
+    Resume tasks left unfinished by a previous process
+
+    Only tasks whose run lease has expired (no live worker) are resumed.
+    """
+    resumed = []
+    for task_id in await task_store.alist_task_ids():
+        task = await task_store.aget_task(task_id)
+        if not task or task["status"] in TERMINAL_STATUSES:
+            continue
+        if task["source_type"] not in JOB_HANDLERS or await is_task_running(task_id):
+            continue
+
+        logger.info(f"Resuming interrupted task {task_id}")
+        await resume_task(task_id)
+        resumed.append(task_id)
+
+    return resumed
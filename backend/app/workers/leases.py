@@ -0,0 +1,71 @@
+"""
+Task run leases
+Guarantees a task is processed by a single worker at a time, across processes
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.task_store import task_store
+
+
+class TaskAlreadyRunning(Exception):
+    """Raised when another worker holds the run lease of a task"""
+
+
+def _lease_name(task_id: str) -> str:
+    return f"task-run:{task_id}"
+
+
+async def is_task_running(task_id: str) -> bool:
+    """True if a live worker currently holds the task's run lease"""
+    return await task_store.ais_leased(_lease_name(task_id))
+
+
+@asynccontextmanager
+async def task_lease(task_id: str) -> AsyncIterator[None]:
+    """
+    Hold the run lease of a task, renewing it in the background
+
+    The lease expires after TASK_LEASE_SECONDS without renewal, so a task whose
+    worker died can be resumed by another process. If a renewal fails (the
+    lease expired and another worker may have taken the task over), the
+    enclosed block is cancelled and TaskAlreadyRunning is raised, so the task
+    is never processed by two workers at once.
+    """
+    name = _lease_name(task_id)
+    owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    ttl = settings.TASK_LEASE_SECONDS
+
+    if not await task_store.aacquire_lease(name, owner, ttl):
+        raise TaskAlreadyRunning(f"Task {task_id} is already running on another worker")
+
+    current = asyncio.current_task()
+    lost = False
+
+    async def renew() -> None:
+        nonlocal lost
+        while True:
+            await asyncio.sleep(max(1, ttl / 3))
+            if not await task_store.aacquire_lease(name, owner, ttl):
+                logger.warning(f"[{task_id}] Lost run lease, stopping")
+                lost = True
+                current.cancel()
+                return
+
+    renewer = asyncio.ensure_future(renew())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if lost:
+            raise TaskAlreadyRunning(f"Task {task_id} lost its run lease to another worker") from None
+        raise
+    finally:
+        renewer.cancel()
+        if not lost:
+            await task_store.arelease_lease(name, owner)
@@ -0,0 +1,122 @@
+"""
+Staged producer/consumer pipeline
+Runs items through a chain of async stages connected by bounded queues
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, List, Optional, Union
+from app.core.logging import logger
+
+
+# Marks the end of the stream for a stage worker
+_END = object()
+
+
+@dataclass
+class Stage:
+    """
+    A single pipeline stage
+
+    The handler receives the item produced by the previous stage and returns
+    the item for the next one. Returning None drops the item.
+    """
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+
+
+class Pipeline:
+    """
+    Chain of stages, each with its own worker pool
+
+    Queues between stages are bounded, so a slow stage blocks its producers
+    instead of letting intermediate results (e.g. images) pile up in memory.
+    """
+
+    def __init__(self, stages: List[Stage], queue_depth: int = 2):
+        if not stages:
+            raise ValueError("Pipeline requires at least one stage")
+        self.stages = stages
+        self.queue_depth = max(1, queue_depth)
+
+    async def _feed(
+        self,
+        items: Union[Iterable[Any], AsyncIterable[Any]],
+        queue: asyncio.Queue,
+        consumers: int
+    ) -> None:
+        """Push source items into the first queue"""
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await queue.put(item)
+        else:
+            for item in items:
+                await queue.put(item)
+
+        for _ in range(consumers):
+            await queue.put(_END)
+
+    async def _work(
+        self,
+        stage: Stage,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue]
+    ) -> None:
+        """Consume items for one stage until the end marker"""
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                return
+
+            try:
+                result = await stage.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Handlers are expected to deal with their own errors;
+                # never let one item stall the whole pipeline
+                logger.error(f"Pipeline stage '{stage.name}' failed: {str(e)}")
+                continue
+
+            if result is not None and outbox is not None:
+                await outbox.put(result)
+
+    async def _run_stage(
+        self,
+        stage: Stage,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        next_consumers: int
+    ) -> None:
+        """Run all workers of a stage, then signal the end to the next stage"""
+        await asyncio.gather(*(
+            self._work(stage, inbox, outbox)
+            for _ in range(max(1, stage.concurrency))
+        ))
+
+        if outbox is not None:
+            for _ in range(next_consumers):
+                await outbox.put(_END)
+
+    async def run(self, items: Union[Iterable[Any], AsyncIterable[Any]]) -> None:
+        """Process all items and wait until every stage has drained"""
+        queues = [asyncio.Queue(maxsize=self.queue_depth) for _ in self.stages]
+        concurrency = [max(1, stage.concurrency) for stage in self.stages]
+
+        tasks = [asyncio.ensure_future(self._feed(items, queues[0], concurrency[0]))]
+        for i, stage in enumerate(self.stages):
+            is_last = i == len(self.stages) - 1
+            tasks.append(asyncio.ensure_future(self._run_stage(
+                stage,
+                queues[i],
+                None if is_last else queues[i + 1],
+                0 if is_last else concurrency[i + 1]
+            )))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
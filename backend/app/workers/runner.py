@@ -0,0 +1,147 @@
+"""
+Standalone job worker
+Consumes the durable job queue so generation capacity scales independently of the web process
+"""
+
+import asyncio
+import os
+import signal
+import socket
+from typing import Optional, Set
+from app.core.config import settings
+from app.core.job_queue import Job, JobQueue, get_job_queue
+from app.core.logging import logger
+from app.services.container import services
+from app.workers.dispatcher import JOB_HANDLERS
+
+
+class Worker:
+    """Leases jobs from the queue and runs up to `concurrency` of them at once"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 2,
+        consumer: Optional[str] = None,
+        heartbeat_interval: Optional[float] = None
+    ):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval or max(1.0, queue.lease_ms / 3000)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Keep the lease alive while the job runs"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.queue.heartbeat(job, self.consumer)
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for job {job.id}: {str(e)}")
+
+    async def _execute(self, job: Job) -> None:
+        """Run one job, then acknowledge it"""
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        try:
+            handler = JOB_HANDLERS.get(job.type)
+            if handler is None:
+                await self.queue.dead_letter(job, f"Unknown job type: {job.type}")
+                return
+
+            logger.info(f"[{self.consumer}] Running {job.type} job {job.id} (attempt {job.attempts})")
+            await handler(**job.payload)
+            await self.queue.ack(job)
+            logger.info(f"[{self.consumer}] Finished {job.type} job {job.id}")
+
+        except asyncio.CancelledError:
+            # Shutting down: leave the job pending so another worker reclaims it
+            logger.warning(f"[{self.consumer}] Job {job.id} interrupted, lease left to expire")
+            raise
+        except Exception as e:
+            logger.error(f"[{self.consumer}] Job {job.id} failed: {str(e)}")
+            if job.attempts >= self.queue.max_attempts:
+                await self.queue.dead_letter(job, str(e))
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
+
+    async def _acquire_slot(self) -> bool:
+        """Wait for a free slot; False once the worker is stopping (no slot is then held)"""
+        if self._stopping.is_set():
+            return False
+
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait({acquire, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+
+        if not self._stopping.is_set():
+            return True
+
+        # Stop requested while waiting: give back the slot if it was acquired anyway
+        acquire.cancel()
+        try:
+            await acquire
+        except asyncio.CancelledError:
+            return False
+        self._slots.release()
+        return False
+
+    async def run(self) -> None:
+        """Claim and run jobs until stopped"""
+        logger.info(f"Worker {self.consumer} started (concurrency={self.concurrency})")
+
+        while await self._acquire_slot():
+            try:
+                job = await self.queue.claim(self.consumer, block_ms=2000)
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Failed to claim job: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+
+            if job is None:
+                self._slots.release()
+                continue
+
+            if self._stopping.is_set():
+                # Claimed while stopping: not started, its lease expires and another worker reclaims it
+                self._slots.release()
+                logger.warning(f"[{self.consumer}] Stopping, job {job.id} left to another worker")
+                break
+
+            task = asyncio.ensure_future(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+        # Interrupt in-flight jobs; their leases expire and another worker resumes them
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info(f"Worker {self.consumer} stopped")
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+async def main() -> None:
+    """Entry point for `python -m app.workers`"""
+    queue = get_job_queue()
+    worker = Worker(queue, concurrency=settings.WORKER_CONCURRENCY)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+
+    await services.startup()
+    try:
+        await worker.run()
+    finally:
+        await queue.close()
+        await services.shutdown()
@@ -4,21 +4,408 @@ Processes YouTube URL extraction and icon generation
 """
 
 import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+from app.core.blocking import run_blocking
+from app.core.candidates import Candidate, extract_candidates
+from app.core.compaction import compact_transcript
+from app.core.config import settings
 from app.core.logging import logger
 from app.core.task_store import task_store
-from app.models.generation import GenerationStatusEnum
-from app.services.youtube_service import YouTubeService
-from app.services.concept_extraction_service import ConceptExtractionService
+from app.core.windows import TranscriptWindow, attach_times, split_windows
+from app.models.generation import TERMINAL_STATUSES, GenerationStatusEnum, ConceptExtraction
+from app.models.image import GeneratedImage
+from app.services.concept_extraction_service import ConceptExtractionService, concept_key
+from app.services.container import get_services
 from app.services.generation_service import GenerationService
 from app.services.background_removal_service import BackgroundRemovalService
 from app.services.supabase_service import SupabaseService
+from app.workers.cancellation import cancellable, raise_if_cancelled
+from app.workers.leases import TaskAlreadyRunning, task_lease
+from app.workers.pipeline import Pipeline, Stage
+
+
+async def _already_finished(task_id: str) -> bool:
+    """
+    True if the task needs no processing: cancelled before it started, or
+    finished by an earlier delivery of its job (redelivered after a crash
+    before the acknowledgement, or dispatched twice)
+    """
+    task = await task_store.aget_task(task_id)
+    if task and task["status"] in TERMINAL_STATUSES:
+        logger.info(f"[{task_id}] Task is already {task['status'].value}, skipping")
+        return True
+    return False
+
+
+def _resolve_parallelism(max_parallel_concepts: Optional[int]) -> int:
+    """Per-task generation concurrency, defaulting to and capped by the global setting"""
+    limit = max(1, settings.MAX_PARALLEL_CONCEPTS)
+    if max_parallel_concepts is None:
+        return limit
+    return max(1, min(max_parallel_concepts, limit))
+
+
+def _icons_checkpoint(results: List[Optional[Tuple[str, Optional[str]]]]) -> Dict[str, dict]:
+    """Serialize completed concepts as {index: {name, icon_id}}"""
+    return {
+        str(idx): {"name": r[0], "icon_id": r[1]}
+        for idx, r in enumerate(results)
+        if r
+    }
+
+
+def _load_icons_checkpoint(checkpoint: dict) -> Dict[int, Tuple[str, Optional[str]]]:
+    """Inverse of _icons_checkpoint"""
+    return {
+        int(idx): (entry["name"], entry.get("icon_id"))
+        for idx, entry in (checkpoint.get("icons") or {}).items()
+    }
+
+
+@dataclass
+class ExtractionInput:
+    """What concept extraction works on for one transcript"""
+    text: str
+    segments: List[dict]
+    candidates: List[Candidate]
+    # Fixed time windows of the segments, None when CONCEPT_WINDOW_SECONDS is 0
+    windows: Optional[List[TranscriptWindow]] = None
+
+
+async def _extraction_input(task_id: str, transcript: List[dict], video_id: Optional[str] = None) -> ExtractionInput:
+    """
+    Text sent to concept extraction, its time windows and the candidate terms found locally
+
+    The text is compacted unless disabled. Token savings and the top
+    candidates with their mention counts are reported in the task metadata.
+    The transcript is added to the candidates background corpus once per
+    `video_id` (resumes and retries of the same video do not count again).
+    """
+    if settings.TRANSCRIPT_COMPACTION:
+        compacted = compact_transcript(transcript, drop_fillers=settings.TRANSCRIPT_DROP_FILLERS)
+        text, segments, stats = compacted.text, compacted.segments, compacted.stats
+        logger.info(
+            f"[{task_id}] Transcript compacted from ~{stats.tokens_before} to ~{stats.tokens_after} tokens "
+            f"(-{stats.token_reduction:.0%})"
+        )
+        metadata = {"transcript_compaction": stats.metrics()}
+    else:
+        text, segments, metadata = " ".join([seg["text"] for seg in transcript]), transcript, {}
+
+    candidates: List[Candidate] = []
+    if settings.CONCEPT_CANDIDATES:
+        candidates = await run_blocking(
+            "candidates",
+            extract_candidates,
+            segments,
+            limit=settings.CONCEPT_CANDIDATES_MAX,
+            learn=True,
+            document_id=video_id
+        )
+        metadata["candidates"] = [c.metrics() for c in candidates[:20]]
+
+    windows = None
+    if settings.CONCEPT_WINDOW_SECONDS > 0:
+        windows = split_windows(segments, settings.CONCEPT_WINDOW_SECONDS)
+        metadata["transcript_windows"] = len(windows)
+
+    if metadata:
+        await task_store.aupdate_task(task_id, metadata=metadata)
+    return ExtractionInput(text=text, segments=segments, candidates=candidates, windows=windows)
+
+
+async def _extract(
+    concept_service: ConceptExtractionService,
+    extraction: ExtractionInput,
+    max_concepts: int
+) -> List[ConceptExtraction]:
+    """Concepts of a whole transcript (per time window when enabled), with their times in the video"""
+    if extraction.windows:
+        concepts = await concept_service.extract_concepts_windowed(
+            extraction.windows,
+            max_concepts=max_concepts,
+            candidates=extraction.candidates
+        )
+    else:
+        concepts = await concept_service.extract_concepts(
+            extraction.text,
+            max_concepts=max_concepts,
+            candidates=extraction.candidates
+        )
+    return attach_times(concepts, extraction.segments)
+
+
+def _concept_dicts(concepts: List[ConceptExtraction]) -> List[dict]:
+    """Concepts in the format stored on the task (frontend format)"""
+    return [
+        {
+            "name": c.name,
+            "category": c.category,
+            "priority": c.priority,
+            "visual_description": c.visual_description,
+            "context": c.context,
+            "start": c.start,
+            "end": c.end
+        }
+        for c in concepts
+    ]
+
+
+async def _stream_concepts(
+    task_id: str,
+    concept_service: ConceptExtractionService,
+    extraction: ExtractionInput,
+    max_concepts: int,
+    known: List[ConceptExtraction]
+) -> AsyncIterator[ConceptExtraction]:
+    """
+    New concepts of a streamed extraction, saved on the task as they arrive
+
+    Concepts already in `known` (streamed by an interrupted run) are skipped.
+    """
+    concepts = list(known)
+    seen = {concept_key(c.name) for c in concepts}
+
+    stream = concept_service.extract_concepts_stream(
+        extraction.text,
+        max_concepts=max_concepts,
+        candidates=extraction.candidates,
+        windows=extraction.windows
+    )
+    try:
+        async for concept in stream:
+            if len(concepts) >= max_concepts:
+                break
+            key = concept_key(concept.name)
+            if key in seen:
+                continue
+
+            concept = attach_times([concept], extraction.segments)[0]
+            seen.add(key)
+            concepts.append(concept)
+            logger.info(f"[{task_id}] Extracted concept {len(concepts)}: {concept.name}")
+            await task_store.aupdate_task(task_id, extracted_concepts=_concept_dicts(concepts))
+            yield concept
+    finally:
+        # Stop the window producers and close the OpenAI streams now, not at garbage collection
+        await stream.aclose()
+
+
+@dataclass
+class ConceptJob:
+    """A concept travelling through the icon pipeline"""
+    index: int
+    concept: ConceptExtraction
+    image: Optional[GeneratedImage] = None
+
+
+class IconPipeline:
+    """
+    Generation -> background removal -> upload pipeline for one task
+
+    Each step runs in its own worker pool with bounded queues in between,
+    so Gemini, Replicate and Supabase are all kept busy at the same time.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        concepts: List[ConceptExtraction],
+        generation_service: GenerationService,
+        bg_removal_service: BackgroundRemovalService,
+        supabase_service: SupabaseService,
+        generation_concurrency: int,
+        checkpointed: Optional[Dict[int, Tuple[str, Optional[str]]]] = None,
+        expected_total: int = 0,
+        concept_service: Optional[ConceptExtractionService] = None,
+        force_regenerate: bool = False
+    ):
+        self.task_id = task_id
+        self.concepts = concepts
+        # Concept count used for progress while concepts are still streaming in
+        self.expected_total = expected_total
+        self.generation_service = generation_service
+        self.bg_removal_service = bg_removal_service
+        self.supabase_service = supabase_service
+        self.generation_concurrency = generation_concurrency
+        # Matches concepts against existing icons (None: always generate)
+        self.concept_service = concept_service
+        # Bypass the image cache of the generation service
+        self.force_regenerate = force_regenerate
+
+        # (concept name, icon ID or None if not stored) per concept, None if generation failed
+        self.results: List[Optional[Tuple[str, Optional[str]]]] = [None] * len(concepts)
+        self.completed = 0
+        self.reused = 0
+
+        # Concepts finished by a previous run of this task are not regenerated
+        for idx, result in (checkpointed or {}).items():
+            if 0 <= idx < len(concepts):
+                self.results[idx] = result
+                self.completed += 1
+
+    @property
+    def total(self) -> int:
+        return max(len(self.concepts), self.expected_total)
+
+    @property
+    def generated_concepts(self) -> List[str]:
+        return [r[0] for r in self.results if r]
+
+    @property
+    def generated_icon_ids(self) -> List[str]:
+        # Keep concept order regardless of completion order
+        return [r[1] for r in self.results if r and r[1]]
+
+    async def _finish(self, job: ConceptJob, result: Optional[Tuple[str, Optional[str]]]) -> None:
+        """Record the outcome of a concept, checkpoint it and report progress"""
+        self.results[job.index] = result
+        self.completed += 1
+        await task_store.aupdate_task(
+            self.task_id,
+            progress=45 + int((self.completed / self.total) * 35),
+            generated_icons=self.generated_icon_ids,
+            checkpoint={"icons": _icons_checkpoint(self.results)} if result else None
+        )
+
+    async def _generate(self, job: ConceptJob) -> Optional[ConceptJob]:
+        """Stage 1: generate image with Gemini"""
+        await raise_if_cancelled(self.task_id)
+        concept = job.concept
+        await task_store.aupdate_task(
+            self.task_id,
+            message=f"Generating icon {job.index + 1}/{self.total}: {concept.name}"
+        )
+
+        try:
+            logger.info(f"[{self.task_id}] Generating icon for: {concept.name}")
+            job.image = await self.generation_service.generate_icon_from_concept(
+                concept=concept.name,
+                category=concept.category,
+                visual_description=concept.visual_description,
+                force_regenerate=self.force_regenerate
+            )
+        except Exception as e:
+            logger.error(f"[{self.task_id}] Error generating icon for {concept.name}: {str(e)}")
+            job.image = None
+
+        if not job.image:
+            # Continue with next concept
+            await self._finish(job, None)
+            return None
+
+        return job
+
+    async def _remove_background(self, job: ConceptJob) -> ConceptJob:
+        """Stage 2: remove background - skip if Replicate not configured"""
+        concept = job.concept
+        if self.bg_removal_service.client:
+            try:
+                logger.info(f"[{self.task_id}] Removing background for: {concept.name}")
+                job.image = await self.bg_removal_service.remove_background(job.image)
+            except Exception as bg_error:
+                logger.warning(f"[{self.task_id}] Background removal failed for {concept.name}: {str(bg_error)}")
+                logger.info(f"[{self.task_id}] Using original image without background removal")
+        else:
+            logger.info(f"[{self.task_id}] Skipping background removal (Replicate not configured)")
+
+        return job
+
+    async def _upload(self, job: ConceptJob) -> None:
+        """Stage 3: upload image to Supabase storage and create the icon record"""
+        await raise_if_cancelled(self.task_id)
+        concept = job.concept
+        logger.info(f"[{self.task_id}] Uploading image to storage: {concept.name}")
+        extension = "jpg" if job.image.mime_type == "image/jpeg" else job.image.mime_type.split("/")[-1]
+        file_name = f"{concept.name.lower().replace(' ', '_')}_{int(time.time())}_{uuid.uuid4().hex[:8]}.{extension}"
+
+        icon_id = None
+        try:
+            image_url = await self.supabase_service.upload_image(
+                file_data=job.image.data,
+                file_name=file_name,
+                content_type=job.image.mime_type
+            )
+
+            # Create icon record in database
+            logger.info(f"[{self.task_id}] Creating icon record: {concept.name}")
+            icon_result = await self.supabase_service.create_icon({
+                "name": concept.name,
+                "category": concept.category,
+                "prompt": concept.visual_description,
+                "image_url": image_url,
+                "tags": [concept.category, concept.priority]
+            })
+
+            icon_id = icon_result.get("id")
+            if icon_id:
+                logger.info(f"[{self.task_id}] Icon created with ID: {icon_id}")
+
+        except Exception as upload_error:
+            logger.error(f"[{self.task_id}] Supabase upload/create failed for {concept.name}: {str(upload_error)}")
+            logger.info(f"[{self.task_id}] Skipping Supabase (not configured), continuing with next concept")
+
+        # Release the image as soon as it is stored
+        job.image = None
+        await self._finish(job, (concept.name, icon_id))
+
+    async def _existing_icons(self, concepts: List[ConceptExtraction]) -> Dict[str, str]:
+        if self.concept_service is None:
+            return {}
+        return await self.concept_service.match_existing_icons(concepts)
+
+    async def _reuse(self, job: ConceptJob, icon_id: str) -> None:
+        """Attach an existing icon to the concept instead of generating one"""
+        logger.info(f"[{self.task_id}] Reusing existing icon {icon_id} for: {job.concept.name}")
+        self.reused += 1
+        await self._finish(job, (job.concept.name, icon_id))
+
+    async def _jobs(self, incoming: Optional[AsyncIterable[ConceptExtraction]]) -> AsyncIterator[ConceptJob]:
+        pending = [idx for idx in range(len(self.concepts)) if self.results[idx] is None]
+        # One batched lookup for the concepts known upfront
+        existing = await self._existing_icons([self.concepts[idx] for idx in pending])
+        for idx in pending:
+            job = ConceptJob(index=idx, concept=self.concepts[idx])
+            icon_id = existing.get(job.concept.name)
+            if icon_id:
+                await self._reuse(job, icon_id)
+            else:
+                yield job
+
+        if incoming is not None:
+            async for concept in incoming:
+                self.concepts.append(concept)
+                self.results.append(None)
+                job = ConceptJob(index=len(self.concepts) - 1, concept=concept)
+                icon_id = (await self._existing_icons([concept])).get(concept.name)
+                if icon_id:
+                    await self._reuse(job, icon_id)
+                else:
+                    yield job
+
+    async def run(self, incoming: Optional[AsyncIterable[ConceptExtraction]] = None) -> None:
+        """Process the pending concepts, then those of `incoming` as they arrive"""
+        pipeline = Pipeline(
+            stages=[
+                Stage("generate", self._generate, self.generation_concurrency),
+                Stage("remove_background", self._remove_background, settings.BG_REMOVAL_CONCURRENCY),
+                Stage("upload", self._upload, settings.UPLOAD_CONCURRENCY),
+            ],
+            queue_depth=settings.PIPELINE_QUEUE_DEPTH
+        )
+        await pipeline.run(self._jobs(incoming))
 
 
 async def process_youtube_generation(
     task_id: str,
     youtube_url: str,
     max_concepts: int = 10,
-    auto_generate: bool = True
+    auto_generate: bool = True,
+    max_parallel_concepts: Optional[int] = None,
+    force_regenerate: bool = False
 ):
     """
     Process YouTube video for concept extraction and icon generation
@@ -28,84 +415,151 @@ async def process_youtube_generation(
         youtube_url: YouTube video URL
         max_concepts: Maximum number of concepts to extract
         auto_generate: Whether to automatically generate icons
+        max_parallel_concepts: Concepts processed concurrently (None = global setting)
+        force_regenerate: Render every icon, bypassing the image cache and existing icons
+
+    Completed stages and concepts are checkpointed in the task store, so running
+    this again for the same task resumes where the previous run stopped.
     """
+    try:
+        async with task_lease(task_id):
+            if await _already_finished(task_id):
+                return
+
+            try:
+                async with cancellable(task_id):
+                    await _run_youtube_generation(
+                        task_id,
+                        youtube_url,
+                        max_concepts,
+                        auto_generate,
+                        max_parallel_concepts,
+                        force_regenerate
+                    )
+            except asyncio.CancelledError:
+                if not await task_store.ais_cancelled(task_id):
+                    # Worker shutdown, not a user cancellation: leave it resumable
+                    raise
+                await _finish_cancelled(task_id)
+    except TaskAlreadyRunning as e:
+        logger.warning(f"[{task_id}] {str(e)}, skipping")
+
+
+async def _finish_cancelled(task_id: str) -> None:
+    """Report what a cancelled task already produced"""
+    task = await task_store.aget_task(task_id) or {}
+    icon_ids = task.get("generated_icons") or []
+    message = f"Cancelled. {len(icon_ids)} icons were already generated."
+    await task_store.aupdate_task(task_id, message=message, generated_icons=icon_ids)
+    logger.info(f"[{task_id}] {message}")
+
+
+async def _run_youtube_generation(
+    task_id: str,
+    youtube_url: str,
+    max_concepts: int,
+    auto_generate: bool,
+    max_parallel_concepts: Optional[int],
+    force_regenerate: bool = False
+):
+    """Body of process_youtube_generation, run while holding the task lease"""
     try:
         logger.info(f"[{task_id}] Starting YouTube processing for {youtube_url}")
 
-        # Initialize services
-        youtube_service = YouTubeService()
-        concept_service = ConceptExtractionService()
-        generation_service = GenerationService()
-        bg_removal_service = BackgroundRemovalService()
-        supabase_service = SupabaseService()
+        # Previous progress of this task, if it is being resumed
+        saved_task = await task_store.aget_task(task_id) or {}
+        checkpoint = saved_task.get("checkpoint") or {}
+
+        # Process-wide services (clients and connection pools are shared)
+        services = get_services()
+        youtube_service = services.youtube
+        concept_service = services.concepts
+        generation_service = services.generation
+        bg_removal_service = services.bg_removal
+        supabase_service = services.supabase
 
         # Step 1: Extract transcript (0-20%)
-        task_store.update_task(
-            task_id,
-            status=GenerationStatusEnum.PROCESSING,
-            progress=5,
-            message="Extracting YouTube transcript..."
-        )
+        transcript = saved_task.get("transcript")
+        if transcript:
+            logger.info(f"[{task_id}] Resuming with checkpointed transcript ({len(transcript)} segments)")
+        else:
+            await task_store.aupdate_task(
+                task_id,
+                status=GenerationStatusEnum.PROCESSING,
+                progress=5,
+                message="Extracting YouTube transcript..."
+            )
 
-        transcript = await youtube_service.get_transcript(youtube_url)
-        if not transcript:
-            raise Exception("Failed to extract transcript from YouTube video")
+            transcript = await youtube_service.get_transcript(youtube_url)
+            if not transcript:
+                raise Exception("Failed to extract transcript from YouTube video")
 
-        logger.info(f"[{task_id}] Extracted {len(transcript)} transcript segments")
+            logger.info(f"[{task_id}] Extracted {len(transcript)} transcript segments")
 
-        # Convert transcript to format for frontend
-        transcript_segments = [
-            {"text": seg["text"], "start": seg["start"], "duration": seg["duration"]}
-            for seg in transcript
-        ]
+            # Convert transcript to format for frontend
+            transcript = [
+                {"text": seg["text"], "start": seg["start"], "duration": seg["duration"]}
+                for seg in transcript
+            ]
 
-        task_store.update_task(
-            task_id,
-            progress=20,
-            message=f"Transcript extracted ({len(transcript)} segments)",
-            transcript=transcript_segments
-        )
+            await task_store.aupdate_task(
+                task_id,
+                progress=20,
+                message=f"Transcript extracted ({len(transcript)} segments)",
+                transcript=transcript
+            )
 
-        # Step 2: Extract concepts with GPT-4 (20-40%)
-        task_store.update_task(
-            task_id,
-            status=GenerationStatusEnum.EXTRACTING_CONCEPTS,
-            progress=25,
-            message="Analyzing transcript with GPT-4..."
-        )
+        await raise_if_cancelled(task_id)
 
-        transcript_text = " ".join([seg["text"] for seg in transcript])
-        concepts = await concept_service.extract_concepts(
-            transcript_text,
-            max_concepts=max_concepts
-        )
+        # Step 2: Extract concepts with GPT-4 (20-40%)
+        saved_concepts = [ConceptExtraction(**c) for c in saved_task.get("extracted_concepts") or []]
+        incoming = None
+        if saved_concepts and not checkpoint.get("concepts_streaming"):
+            concepts = saved_concepts
+            logger.info(f"[{task_id}] Resuming with {len(concepts)} checkpointed concepts")
+        elif auto_generate and settings.CONCEPT_STREAMING:
+            # Concepts are streamed into step 3, overlapping extraction with generation.
+            # Those streamed by an interrupted run come first, keeping checkpoint indices valid
+            concepts = saved_concepts
+            await task_store.aupdate_task(
+                task_id,
+                status=GenerationStatusEnum.EXTRACTING_CONCEPTS,
+                progress=25,
+                message="Analyzing transcript with GPT-4...",
+                checkpoint={"concepts_streaming": True}
+            )
+            extraction = await _extraction_input(task_id, transcript, youtube_service.extract_video_id(youtube_url))
+            incoming = _stream_concepts(task_id, concept_service, extraction, max_concepts, concepts)
+        else:
+            await task_store.aupdate_task(
+                task_id,
+                status=GenerationStatusEnum.EXTRACTING_CONCEPTS,
+                progress=25,
+                message="Analyzing transcript with GPT-4..."
+            )
 
-        if not concepts:
-            raise Exception("No concepts could be extracted from the transcript")
+            extraction = await _extraction_input(task_id, transcript, youtube_service.extract_video_id(youtube_url))
+            if not auto_generate and settings.LOCAL_EXTRACT_ONLY and extraction.candidates:
+                # Extract-only requests can skip GPT-4o entirely
+                concepts = concept_service.extract_concepts_locally(extraction.candidates, max_concepts=max_concepts)
+                concepts = attach_times(concepts, extraction.segments)
+            else:
+                concepts = await _extract(concept_service, extraction, max_concepts)
 
-        logger.info(f"[{task_id}] Extracted {len(concepts)} concepts")
+            if not concepts:
+                raise Exception("No concepts could be extracted from the transcript")
 
-        # Convert concepts to frontend format
-        concept_list = [
-            {
-                "name": c.name,
-                "category": c.category,
-                "priority": c.priority,
-                "visual_description": c.visual_description,
-                "context": c.context
-            }
-            for c in concepts
-        ]
+            logger.info(f"[{task_id}] Extracted {len(concepts)} concepts")
 
-        task_store.update_task(
-            task_id,
-            progress=40,
-            message=f"Extracted {len(concepts)} concepts",
-            extracted_concepts=concept_list
-        )
+            await task_store.aupdate_task(
+                task_id,
+                progress=40,
+                message=f"Extracted {len(concepts)} concepts",
+                extracted_concepts=_concept_dicts(concepts)
+            )
 
         if not auto_generate:
-            task_store.update_task(
+            await task_store.aupdate_task(
                 task_id,
                 status=GenerationStatusEnum.COMPLETED,
                 progress=100,
@@ -113,99 +567,73 @@ async def process_youtube_generation(
             )
             return
 
+        await raise_if_cancelled(task_id)
+
         # Step 3: Generate icons for each concept (40-80%)
-        task_store.update_task(
+        await task_store.aupdate_task(
             task_id,
             status=GenerationStatusEnum.GENERATING_IMAGES,
             progress=45,
             message="Starting icon generation..."
         )
 
-        generated_icon_ids = []
-        generated_concepts = []  # Track successfully generated concepts
-        total_concepts = len(concepts)
+        parallelism = _resolve_parallelism(max_parallel_concepts)
+        if incoming is None:
+            logger.info(f"[{task_id}] Generating {len(concepts)} icons with up to {parallelism} generations in flight")
+        else:
+            logger.info(f"[{task_id}] Generating icons as concepts are extracted, up to {parallelism} generations in flight")
 
-        for idx, concept in enumerate(concepts):
-            try:
-                # Update progress
-                progress = 45 + int((idx / total_concepts) * 35)
-                task_store.update_task(
-                    task_id,
-                    progress=progress,
-                    message=f"Generating icon {idx + 1}/{total_concepts}: {concept.name}",
-                    generated_icons=generated_icon_ids
-                )
-
-                # Generate image with Gemini
-                logger.info(f"[{task_id}] Generating icon for: {concept.name}")
-                image_data = await generation_service.generate_icon_from_concept(
-                    concept=concept.name,
-                    category=concept.category,
-                    visual_description=concept.visual_description
-                )
-
-                if image_data:
-                    # Mark this concept as successfully generated
-                    generated_concepts.append(concept.name)
-                    # Step 4: Remove background (per icon) - skip if Replicate not configured
-                    processed_image = image_data
-                    if bg_removal_service.client:
-                        try:
-                            logger.info(f"[{task_id}] Removing background for: {concept.name}")
-                            processed_image = await bg_removal_service.remove_background(image_data)
-                        except Exception as bg_error:
-                            logger.warning(f"[{task_id}] Background removal failed for {concept.name}: {str(bg_error)}")
-                            logger.info(f"[{task_id}] Using original image without background removal")
-                    else:
-                        logger.info(f"[{task_id}] Skipping background removal (Replicate not configured)")
-
-                    # Step 5: Upload image to Supabase storage
-                    logger.info(f"[{task_id}] Uploading image to storage: {concept.name}")
-                    import time
-                    import uuid
-                    file_name = f"{concept.name.lower().replace(' ', '_')}_{int(time.time())}_{uuid.uuid4().hex[:8]}.png"
-
-                    try:
-                        image_url = await supabase_service.upload_image(
-                            file_data=processed_image,
-                            file_name=file_name
-                        )
-
-                        # Create icon record in database
-                        logger.info(f"[{task_id}] Creating icon record: {concept.name}")
-                        icon_result = await supabase_service.create_icon({
-                            "name": concept.name,
-                            "category": concept.category,
-                            "prompt": concept.visual_description,
-                            "image_url": image_url,
-                            "tags": [concept.category, concept.priority]
-                        })
-
-                        icon_id = icon_result.get("id")
-                        if icon_id:
-                            generated_icon_ids.append(icon_id)
-                            logger.info(f"[{task_id}] Icon created with ID: {icon_id}")
-
-                    except Exception as upload_error:
-                        logger.error(f"[{task_id}] Supabase upload/create failed for {concept.name}: {str(upload_error)}")
-                        logger.info(f"[{task_id}] Skipping Supabase (not configured), continuing with next concept")
-
-            except Exception as e:
-                logger.error(f"[{task_id}] Error generating icon for {concept.name}: {str(e)}")
-                # Continue with next concept
-                continue
+        icon_pipeline = IconPipeline(
+            task_id,
+            concepts,
+            generation_service,
+            bg_removal_service,
+            supabase_service,
+            generation_concurrency=parallelism,
+            checkpointed=_load_icons_checkpoint(checkpoint),
+            expected_total=max_concepts if incoming is not None else 0,
+            # Forced runs render everything again, existing icons included
+            concept_service=None if force_regenerate else concept_service,
+            force_regenerate=force_regenerate
+        )
+        if icon_pipeline.completed:
+            logger.info(f"[{task_id}] Skipping {icon_pipeline.completed} checkpointed concepts")
+        await icon_pipeline.run(incoming)
+
+        if incoming is not None:
+            concepts = icon_pipeline.concepts
+            if not concepts:
+                raise Exception("No concepts could be extracted from the transcript")
+
+            logger.info(f"[{task_id}] Extracted {len(concepts)} concepts")
+            await task_store.aupdate_task(
+                task_id,
+                extracted_concepts=_concept_dicts(concepts),
+                checkpoint={"concepts_streaming": False}
+            )
+
+        generated_concepts = icon_pipeline.generated_concepts  # Track successfully generated concepts
+        generated_icon_ids = icon_pipeline.generated_icon_ids
 
         # Step 6: Complete
         if not generated_concepts:
             raise Exception("Failed to generate any icons")
 
         # Success message depends on whether we have Supabase configured
-        if generated_icon_ids:
+        reused = icon_pipeline.reused
+        if generated_icon_ids and reused == len(generated_icon_ids):
+            message = f"All {reused} icons already existed and were reused!"
+        elif generated_icon_ids and reused:
+            message = (
+                f"Successfully generated and stored {len(generated_icon_ids) - reused} icons "
+                f"and reused {reused} existing icons!"
+            )
+        elif generated_icon_ids:
             message = f"Successfully generated and stored {len(generated_icon_ids)} icons!"
         else:
             message = f"Successfully generated {len(generated_concepts)} icons! (Supabase not configured - icons not stored)"
 
-        task_store.update_task(
+        await task_store.aupdate_task(
             task_id,
             status=GenerationStatusEnum.COMPLETED,
             progress=100,
@@ -213,12 +641,15 @@ async def process_youtube_generation(
             generated_icons=generated_icon_ids
         )
 
-        logger.info(f"[{task_id}] YouTube generation completed. Generated {len(generated_concepts)} icons ({len(generated_icon_ids)} stored).")
+        logger.info(
+            f"[{task_id}] YouTube generation completed. Generated {len(generated_concepts) - reused} icons "
+            f"({len(generated_icon_ids)} stored, {reused} reused)."
+        )
 
     except Exception as e:
         error_msg = f"YouTube generation failed: {str(e)}"
         logger.error(f"[{task_id}] {error_msg}")
-        task_store.update_task(
+        await task_store.aupdate_task(
             task_id,
             status=GenerationStatusEnum.FAILED,
             error=error_msg,
@@ -0,0 +1,161 @@
+"""
+Benchmark: memory allocated per image, base64 round trips vs binary results
+Runs one image through generation, background removal and upload with fake
+Gemini, Replicate and Supabase clients, once with the former base64 hand-offs
+and once with GeneratedImage, and reports tracemalloc peaks (also in image
+copies held at once) and time.
+
+The legacy Replicate fake serializes the data URI into a JSON body, as the
+SDK does; the binary fake streams the file object in 64 KB chunks, as a
+multipart upload does (replicate >= 0.34 uploads file inputs instead of
+inlining them).
+
+Usage (from backend/):
+    python benchmarks/bench_image_allocations.py [--sizes 6,24] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Measure the hand-offs only: no image cache, no single-flight, no rate limits
+os.environ.setdefault("IMAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("SINGLE_FLIGHT_ENABLED", "false")
+os.environ.setdefault("GEMINI_RPM", "0")
+os.environ.setdefault("REPLICATE_RPM", "0")
+
+from app.core.logging import logger  # noqa: E402
+from app.services.background_removal_service import BackgroundRemovalService  # noqa: E402
+from app.services.generation_service import GenerationService  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+class FakeGemini:
+    """genai.Client stand-in returning pre-rendered image bytes"""
+
+    def __init__(self, image: bytes):
+        inline_data = type("InlineData", (), {"data": image, "mime_type": "image/png"})()
+        part = type("Part", (), {"inline_data": inline_data})()
+        self.response = type("Response", (), {"parts": [part]})()
+        self.aio = type("Aio", (), {"models": self})()
+
+    async def generate_content(self, model, contents):
+        return self.response
+
+
+class FakeReplicate:
+    """replicate.Client stand-in: consumes the input like the SDK would, returns a same-size image"""
+
+    def __init__(self, result: bytes):
+        self.result = result
+
+    async def async_run(self, model, input):
+        image = input["image"]
+        if isinstance(image, str):
+            json.dumps({"input": input}).encode("utf-8")
+        else:
+            while image.read(CHUNK):
+                pass
+        return self.result
+
+
+async def fake_upload(file_data: bytes) -> int:
+    """Supabase upload stand-in: the SDK sends the bytes as they are"""
+    return len(file_data)
+
+
+# ===== Former hand-offs, unchanged apart from the fakes =====
+
+async def legacy_generate_icon(client: FakeGemini, prompt: str) -> dict:
+    response = await client.aio.models.generate_content(model="m", contents=[prompt])
+    image_bytes = None
+    for part in response.parts:
+        if part.inline_data is not None:
+            image_bytes = part.inline_data.data
+            break
+    return {"image_data": base64.b64encode(image_bytes).decode('utf-8'), "prompt": prompt}
+
+
+async def legacy_generate_icon_from_concept(client: FakeGemini, prompt: str) -> bytes:
+    result = await legacy_generate_icon(client, prompt)
+    return base64.b64decode(result["image_data"])
+
+
+async def legacy_remove_background(client: FakeReplicate, image_data: bytes) -> bytes:
+    image_b64 = base64.b64encode(image_data).decode('utf-8')
+    data_uri = f"data:image/png;base64,{image_b64}"
+    return await client.async_run("m", input={"image": data_uri, "output_format": "png"})
+
+
+async def legacy_flow(gemini: FakeGemini, replicate: FakeReplicate) -> int:
+    image = await legacy_generate_icon_from_concept(gemini, "prompt")
+    image = await legacy_remove_background(replicate, image)
+    return await fake_upload(image)
+
+
+# ===== Binary results =====
+
+async def binary_flow(generation: GenerationService, bg_removal: BackgroundRemovalService) -> int:
+    image = await generation.generate_icon_from_concept("prompt")
+    image = await bg_removal.remove_background(image)
+    return await fake_upload(image.data)
+
+
+def measure(flow, repeat: int):
+    """(peak traced bytes above the baseline, seconds) of the best of `repeat` runs"""
+    best_peak, best_time = None, None
+    for _ in range(repeat):
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        asyncio.run(flow())
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        best_peak = peak if best_peak is None else min(best_peak, peak)
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    return best_peak, best_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="6,24", help="image sizes in MB (about 2048² and 4096² PNGs)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per flow and size (best is kept)")
+    args = parser.parse_args()
+    logger.remove()
+
+    header = f"{'image MB':>9}  {'legacy peak MB':>15}{'copies':>8}{'ms':>8}  {'binary peak MB':>15}{'copies':>8}{'ms':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for size_mb in [float(s) for s in args.sizes.split(",")]:
+        # Random bytes: PNG data does not compress further, so sizes stay realistic
+        image = os.urandom(int(size_mb * 1024 * 1024))
+        result = os.urandom(len(image))
+        gemini, replicate = FakeGemini(image), FakeReplicate(result)
+
+        generation = GenerationService()
+        generation.client = gemini
+        bg_removal = BackgroundRemovalService()
+        bg_removal.client = replicate
+
+        legacy_peak, legacy_time = measure(lambda: legacy_flow(gemini, replicate), args.repeat)
+        binary_peak, binary_time = measure(lambda: binary_flow(generation, bg_removal), args.repeat)
+
+        # Peak memory in image sizes: how many copies of the image the hand-offs hold at once
+        print(
+            f"{size_mb:>9.1f}  {legacy_peak / 2**20:>15.1f}{legacy_peak / len(image):>8.1f}{legacy_time * 1000:>8.1f}"
+            f"  {binary_peak / 2**20:>15.1f}{binary_peak / len(image):>8.2f}{binary_time * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: tolerant JSON decoder vs the previous repair cascade
+Runs both on recorded GPT-4o concept extraction responses
+(fixtures/concept_responses.jsonl) and reports recovered concepts and time.
+Neither side writes debug files (the former cascade wrote two per response
+to the temp directory; those writes are left out of the copy below).
+
+Usage (from backend/):
+    python benchmarks/bench_json_decoding.py [--repeat 200]
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Compare decoding only: no debug captures written by either side
+os.environ["JSON_DEBUG_SINK"] = ""
+
+from app.core import tolerant_json  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "concept_responses.jsonl")
+
+
+def legacy_repair_json(content: str) -> str:
+    """The former ConceptExtractionService._repair_json, without its debug file writes"""
+    french_patterns = [
+        (r"d'(\w)", r"de \1"), (r"D'(\w)", r"De \1"),
+        (r"l'(\w)", r"le \1"), (r"L'(\w)", r"Le \1"),
+        (r"s'(\w)", r"se \1"), (r"S'(\w)", r"Se \1"),
+        (r"n'(\w)", r"ne \1"), (r"N'(\w)", r"Ne \1"),
+        (r"c'(\w)", r"ce \1"), (r"C'(\w)", r"Ce \1"),
+        (r"m'(\w)", r"me \1"), (r"M'(\w)", r"Me \1"),
+        (r"t'(\w)", r"te \1"), (r"T'(\w)", r"Te \1"),
+        (r"qu'(\w)", r"que \1"), (r"Qu'(\w)", r"Que \1"),
+    ]
+
+    for pattern, replacement in french_patterns:
+        content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
+
+    return content
+
+
+def legacy_decode(content: str):
+    """The former parsing cascade of _extract_from_text (logging removed)"""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        if content.startswith("```"):
+            content = content.split("```")[1]
+            if content.startswith("json"):
+                content = content[4:]
+            content = content.strip()
+
+        content = legacy_repair_json(content)
+
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError as e2:
+            try:
+                return ast.literal_eval(content)
+            except Exception:
+                match = re.search(r'"concepts"\s*:\s*\[(.*)\]', content, re.DOTALL)
+                if match:
+                    return json.loads('{"concepts": [' + match.group(1) + ']}')
+                raise Exception(f"Invalid JSON even after repairs: {str(e2)}")
+
+
+def tolerant_decode(content: str):
+    return tolerant_json.decode(content, label="benchmark").value
+
+
+def count_concepts(data) -> int:
+    """Complete concepts in a decoded response"""
+    if isinstance(data, dict):
+        data = data.get("concepts", data.get("items", [data]))
+    if not isinstance(data, list):
+        return 0
+    keys = {"name", "category", "priority", "visual_description"}
+    return sum(1 for item in data if isinstance(item, dict) and keys.issubset(item))
+
+
+def contexts_intact(data, original) -> bool:
+    """Whether decoded text fields still match the source wording (no rewritten apostrophes)"""
+    if isinstance(data, dict):
+        data = data.get("concepts", [])
+    return all("'" in (item.get("context") or "") for item in data if isinstance(item, dict)) if "'" in original else True
+
+
+def run(decoder, content: str, repeat: int):
+    try:
+        data = decoder(content)
+    except Exception:
+        return None, 0.0
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decoder(content)
+    return data, (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="decodes per response and decoder")
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    header = f"{'case':<18}{'expected':>9}  {'legacy':>7}{'µs':>9}{'text ok':>9}  {'tolerant':>9}{'µs':>9}{'text ok':>9}"
+    print(header)
+    print("-" * len(header))
+
+    totals = {"legacy": [0, 0.0], "tolerant": [0, 0.0]}
+    expected_total = 0
+    for case in cases:
+        content = case["content"]
+        row = f"{case['case']:<18}{case['expected_concepts']:>9}  "
+        expected_total += case["expected_concepts"]
+        for name, decoder, width in (("legacy", legacy_decode, 7), ("tolerant", tolerant_decode, 9)):
+            data, seconds = run(decoder, content, args.repeat)
+            found = count_concepts(data) if data is not None else 0
+            intact = "yes" if data is not None and contexts_intact(data, content) else "no"
+            totals[name][0] += found
+            totals[name][1] += seconds
+            row += f"{found if data is not None else 'fail':>{width}}{seconds * 1e6:>9.0f}{intact:>9}  "
+        print(row)
+
+    print("-" * len(header))
+    print(
+        f"{'total':<18}{expected_total:>9}  "
+        f"{totals['legacy'][0]:>7}{totals['legacy'][1] * 1e6:>9.0f}{'':>9}  "
+        f"{totals['tolerant'][0]:>9}{totals['tolerant'][1] * 1e6:>9.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
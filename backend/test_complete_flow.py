@@ -31,31 +31,29 @@ async def test_full_flow():
                 style="finary-glass-3d"
             )
             
-            if not result or "image_data" not in result:
+            if not result or not result.data:
                 print(f"  ❌ Échec génération pour {concept}")
                 continue
             
-            print(f"  ✅ Image générée ({len(result['image_data'])} chars base64)")
+            print(f"  ✅ Image générée ({result.nbytes} octets, {result.mime_type})")
             
-            # 2. Décoder base64 → bytes
-            import base64
-            image_bytes = base64.b64decode(result["image_data"])
-            
-            # 3. Supprimer l'arrière-plan
+            # 2. Supprimer l'arrière-plan (l'image reste en octets)
             print(f"  🔄 Suppression de l'arrière-plan...")
-            clean_image = await background_removal_service.remove_background(image_bytes)
+            clean_image = await background_removal_service.remove_background(result)
             
             if not clean_image:
                 print(f"  ⚠️  Pas de nettoyage d'arrière-plan, utilisation de l'image originale")
-                clean_image = image_bytes
+                clean_image = result
             else:
                 print(f"  ✅ Arrière-plan supprimé")
             
-            # 4. Upload vers Supabase
+            # 3. Upload vers Supabase
             print(f"  🔄 Upload vers Supabase...")
-            image_url = await supabase_service.upload_icon_image(
-                image_data=clean_image,
-                icon_name=concept
+            extension = clean_image.mime_type.split("/")[-1]
+            image_url = await supabase_service.upload_image(
+                file_data=clean_image.data,
+                file_name=f"{concept.replace(' ', '_')}.{extension}",
+                content_type=clean_image.mime_type
             )
             
             if not image_url:
@@ -64,17 +62,17 @@ async def test_full_flow():
             
             print(f"  ✅ Upload réussi: {image_url[:80]}...")
             
-            # 5. Créer l'entrée dans la base de données
+            # 4. Créer l'entrée dans la base de données
             print(f"  🔄 Création entrée BDD...")
             icon_data = {
                 "name": concept,
                 "category": "crypto" if concept in ["bitcoin", "ethereum"] else "finance",
-                "prompt": result["prompt"],
-                "animation_prompt": result.get("animation_prompt", ""),
+                "prompt": result.prompt,
+                "animation_prompt": result.animation_prompt or "",
                 "image_url": image_url,
                 "metadata": {
                     "style": "finary-glass-3d",
-                    "size": result.get("size", "2048x2048"),
+                    "size": result.size or "2048x2048",
                     "model": "gemini-3-pro-image-preview"
                 }
             }
@@ -0,0 +1,61 @@
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+from app.core import cache as cache_module
+from app.core.cache import Cache, DiskCache, MemoryCache, RedisCache, build_cache
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_cache_interface_is_abstract():
+    with pytest.raises(TypeError):
+        Cache("x", 60, 10)
+
+
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache("test", 60, max_entries=2)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+
+async def test_memory_cache_expires_entries():
+    cache = MemoryCache("test", 60, max_entries=10)
+    await cache.set("a", 1, ttl=-1)
+    assert await cache.get("a") is None
+    assert cache.metrics()["misses"] == 1
+
+
+async def test_disk_cache_round_trip_and_eviction(tmp_path):
+    cache = DiskCache("test", 60, max_entries=1, directory=str(tmp_path))
+    await cache.set("a", {"x": [1, 2]})
+    assert await cache.get("a") == {"x": [1, 2]}
+
+    await cache.set("b", 2)
+    assert len(list((tmp_path / "test").glob("*.json"))) == 1
+    await cache.delete("b")
+    assert await cache.get("b") is None
+
+
+async def test_redis_cache_round_trip():
+    cache = RedisCache("test", 60, 10, redis_client=fake_aioredis.FakeRedis(decode_responses=True))
+    await cache.set("a", {"x": 1})
+    assert await cache.get("a") == {"x": 1}
+    await cache.delete("a")
+    assert await cache.get("a") is None
+    assert cache.backend == "redis"
+
+
+async def test_auto_backend_uses_memory_when_redis_is_unreachable(monkeypatch):
+    monkeypatch.setattr(cache_module.settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+    cache_module._redis_reachable.cache_clear()
+    try:
+        cache = build_cache("test-auto", 60, 10, backend="auto")
+    finally:
+        cache_module._redis_reachable.cache_clear()
+    assert isinstance(cache, MemoryCache)
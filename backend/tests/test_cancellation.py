@@ -0,0 +1,101 @@
+import asyncio
+import json
+import uuid
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core.task_store import RedisTaskStore, task_store
+from app.models.generation import GenerationStatusEnum
+from app.workers import cancellation
+from app.workers.cancellation import cancel_running, cancellable, raise_if_cancelled
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def redis_store():
+    store = RedisTaskStore()
+    store._redis_client = fakeredis.FakeRedis(decode_responses=True)
+    store._use_redis = True
+    yield store
+    store.executor.shutdown()
+
+
+def _task_id():
+    task_id = f"test-{uuid.uuid4().hex[:8]}"
+    task_store.create_task(task_id, "youtube", {})
+    return task_id
+
+
+async def test_cancel_flag_survives_a_stale_task_write(redis_store):
+    redis_store.create_task("t", "youtube", {})
+    redis_store.update_task("t", status=GenerationStatusEnum.PROCESSING, progress=10)
+    stale = redis_store._redis_client.get("task:t")
+
+    await redis_store.acancel_task("t")
+    # A worker that read the task before the cancel writes it back
+    redis_store._redis_client.set("task:t", stale)
+
+    assert await redis_store.ais_cancelled("t")
+    assert (await redis_store.aget_task("t"))["status"] == GenerationStatusEnum.CANCELLED
+    await redis_store.aupdate_task("t", progress=50)
+    assert json.loads(redis_store._redis_client.get("task:t"))["status"] == "cancelled"
+
+
+async def test_resume_clears_the_cancel_flag(redis_store):
+    redis_store.create_task("t", "youtube", {})
+    await redis_store.acancel_task("t")
+    await redis_store.areset_for_resume("t")
+
+    assert not await redis_store.ais_cancelled("t")
+    assert (await redis_store.aget_task("t"))["status"] == GenerationStatusEnum.PENDING
+
+
+async def test_raise_if_cancelled():
+    task_id = _task_id()
+    await raise_if_cancelled(task_id)
+
+    await task_store.acancel_task(task_id)
+    with pytest.raises(asyncio.CancelledError):
+        await raise_if_cancelled(task_id)
+
+
+async def test_cancellable_stops_on_the_flag_set_elsewhere(monkeypatch):
+    monkeypatch.setattr(cancellation.settings, "CANCEL_POLL_SECONDS", 0.01)
+    task_id = _task_id()
+    reached_end = False
+
+    async def work():
+        nonlocal reached_end
+        async with cancellable(task_id):
+            await asyncio.sleep(5)
+            reached_end = True
+
+    running = asyncio.ensure_future(work())
+    await asyncio.sleep(0.02)
+    await task_store.acancel_task(task_id)
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(running, 1)
+    assert not reached_end
+    assert task_id not in cancellation._running
+
+
+async def test_cancel_running_interrupts_in_process_task_immediately():
+    task_id = _task_id()
+    started = asyncio.Event()
+
+    async def work():
+        async with cancellable(task_id):
+            started.set()
+            await asyncio.sleep(5)
+
+    running = asyncio.ensure_future(work())
+    await started.wait()
+
+    assert cancel_running(task_id)
+    with pytest.raises(asyncio.CancelledError):
+        await running
+    assert not cancel_running(task_id)
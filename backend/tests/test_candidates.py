@@ -0,0 +1,57 @@
+import json
+
+from app.core.candidates import BackgroundCorpus, extract_candidates
+
+SEGMENTS = [
+    {"text": "L'épargne salariale rapporte peu.", "start": 0.0},
+    {"text": "Mais l'épargne salariale reste liquide.", "start": 60.0},
+    {"text": "Parlons du bitcoin.", "start": 120.0},
+    {"text": "Cette épargne salariale est garantie.", "start": 180.0},
+    {"text": "Le bitcoin est volatil, le bitcoin monte.", "start": 240.0},
+]
+
+
+def test_candidates_count_mentions_and_prefer_phrases(tmp_path):
+    candidates = extract_candidates(SEGMENTS, corpus=BackgroundCorpus(str(tmp_path / "c.json")))
+    by_term = {c.term: c for c in candidates}
+
+    assert by_term["épargne salariale"].mentions == 3
+    assert "salariale" not in by_term
+    assert by_term["bitcoin"].mentions == 3
+    assert (by_term["bitcoin"].first_seen, by_term["bitcoin"].last_seen) == (120.0, 240.0)
+    assert by_term["bitcoin"].priority == "high"
+    assert [c.score for c in candidates] == sorted((c.score for c in candidates), reverse=True)
+
+
+def test_corpus_lowers_common_terms(tmp_path):
+    corpus = BackgroundCorpus(str(tmp_path / "c.json"))
+    for i in range(5):
+        corpus.add(["bitcoin"], f"other-{i}")
+
+    candidates = extract_candidates(SEGMENTS, corpus=corpus)
+    terms = [c.term for c in candidates]
+    # Said three times here, but in every other video: below words said once
+    assert terms.index("bitcoin") > terms.index("volatil")
+
+
+def test_corpus_counts_each_document_once_and_saves_on_flush(tmp_path):
+    path = tmp_path / "c.json"
+    corpus = BackgroundCorpus(str(path), save_interval=3600)
+
+    assert corpus.add(["a", "b"], "video-1")
+    corpus.add(["a"], "video-0")
+    assert not corpus.add(["a", "b"], "video-1")
+    assert (corpus.documents, corpus.df["a"]) == (2, 2)
+    assert json.loads(path.read_text())["documents"] == 1
+
+    corpus.flush()
+    reloaded = BackgroundCorpus(str(path))
+    reloaded.idf(["a"])
+    assert (reloaded.documents, reloaded.df, reloaded.seen) == (2, {"a": 2, "b": 1}, {"video-0", "video-1"})
+
+
+def test_learning_happens_once_per_video(tmp_path):
+    corpus = BackgroundCorpus(str(tmp_path / "c.json"))
+    extract_candidates(SEGMENTS, corpus=corpus, learn=True, document_id="v1")
+    extract_candidates(SEGMENTS, corpus=corpus, learn=True, document_id="v1")
+    assert corpus.documents == 1
@@ -0,0 +1,42 @@
+from app.core.compaction import compact_transcript
+
+
+def _segments(*texts):
+    return [{"text": text, "start": i * 2.0, "duration": 2.0} for i, text in enumerate(texts)]
+
+
+def test_rolling_caption_overlap_is_removed():
+    compacted = compact_transcript(_segments(
+        "aujourd'hui on parle",
+        "aujourd'hui on parle de la bourse",
+        "de la bourse et des ETF",
+    ))
+
+    assert compacted.text == "aujourd'hui on parle de la bourse et des ETF"
+    assert compacted.stats.overlap_words_removed == 6
+    assert [s["text"] for s in compacted.segments] == ["aujourd'hui on parle", "de la bourse", "et des ETF"]
+    assert [s["start"] for s in compacted.segments] == [0.0, 2.0, 4.0]
+
+
+def test_markers_and_fillers_are_dropped():
+    compacted = compact_transcript(_segments("[Musique] euh le bitcoin", ">> hum (rires) monte ♪"))
+
+    assert compacted.text == "le bitcoin monte"
+    assert compacted.stats.markers_removed == 4
+    assert compacted.stats.fillers_removed == 2
+    assert compacted.stats.token_reduction > 0
+
+
+def test_fillers_can_be_kept():
+    assert compact_transcript(_segments("euh le bitcoin"), drop_fillers=False).text == "euh le bitcoin"
+
+
+def test_single_repeated_word_is_not_an_overlap():
+    compacted = compact_transcript(_segments("le prix de", "de l'or"))
+    assert compacted.text == "le prix de de l'or"
+
+
+def test_repeated_line_is_dropped_with_its_segment():
+    compacted = compact_transcript(_segments("la bourse monte", "la bourse monte", "fortement"))
+    assert compacted.text == "la bourse monte fortement"
+    assert len(compacted.segments) == 2
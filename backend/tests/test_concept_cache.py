@@ -0,0 +1,145 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from app.core.cache import MemoryCache
+from app.core.candidates import BackgroundCorpus, extract_candidates
+from app.core.rate_limiter import rate_limiter
+from app.core.windows import split_windows
+from app.models.generation import ConceptPriority
+from app.services.concept_extraction_service import ConceptExtractionService
+
+pytestmark = pytest.mark.asyncio
+
+CONCEPT = {"name": "Bitcoin", "category": "devises", "priority": "high", "visual_description": "a coin"}
+
+# Three 60 s windows
+LINES = [
+    "Le bitcoin monte encore.", "Le bitcoin reste volatil.", "On achète du bitcoin.",
+    "Le bitcoin baisse un peu.", "Le portefeuille grossit.", "Le bitcoin rebondit.",
+    "L'inflation grimpe vite.", "L'inflation ronge l'épargne.", "La banque centrale agit.",
+    "L'inflation ralentit.", "Les taux montent.", "L'inflation recule.",
+    "Les actions montent.", "Le marché des actions.", "Les actions européennes.",
+    "Un indice boursier.", "Les actions américaines.", "Les dividendes des actions.",
+]
+
+
+def _segments(lines):
+    return [{"text": text, "start": i * 10.0, "duration": 10.0} for i, text in enumerate(lines)]
+
+
+class FakeCompletions:
+    """Chat completions returning one concept, recording every prompt"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def create(self, messages, stream=False, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        content = json.dumps({"concepts": [CONCEPT]})
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+        return chunks()
+
+
+def _replying(service, concepts):
+    """create() returning `concepts`, recording prompts like FakeCompletions"""
+    async def create(messages, stream=False, **kwargs):
+        service.prompts.append(messages[-1]["content"])
+        content = json.dumps({"concepts": concepts})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    return create
+
+
+@pytest_asyncio.fixture
+async def service(monkeypatch):
+    async def no_wait(name, tokens=1):
+        return 0.0
+
+    monkeypatch.setattr(rate_limiter, "acquire", no_wait)
+    service = ConceptExtractionService()
+    service.cache = MemoryCache("test-concepts", 60, 100)
+    completions = FakeCompletions()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    service.prompts = completions.prompts
+    return service
+
+
+async def test_rerun_with_learning_corpus_hits_the_cache(service, tmp_path):
+    corpus = BackgroundCorpus(str(tmp_path / "corpus.json"))
+    # Learning the video moves "bitcoin" below "montent" unless it is scored after learning
+    corpus.add(["bitcoin"], "older-video-1")
+    corpus.add(["bitcoin"], "older-video-2")
+    segments = _segments(LINES)
+    text = " ".join(s["text"] for s in segments)
+
+    for _ in range(2):
+        candidates = extract_candidates(segments, corpus=corpus, limit=5, learn=True, document_id="video")
+        await service.extract_concepts(text, candidates=candidates)
+
+    assert len(service.prompts) == 1
+    assert corpus.documents == 3
+
+
+async def test_editing_one_window_reprocesses_only_that_window(service, tmp_path):
+    corpus = BackgroundCorpus(str(tmp_path / "corpus.json"))
+
+    async def run(lines):
+        segments = _segments(lines)
+        candidates = extract_candidates(segments, corpus=corpus)
+        return await service.extract_concepts_windowed(split_windows(segments, 60), candidates=candidates)
+
+    await run(LINES)
+    assert len(service.prompts) == 3
+
+    edited = list(LINES)
+    edited[8] = "Ethereum et Ethereum face à l'inflation."
+    await run(edited)
+
+    assert len(service.prompts) == 4
+    assert "Ethereum" in service.prompts[-1]
+
+
+async def test_window_prompt_lists_only_its_own_terms(service, tmp_path):
+    segments = _segments(LINES)
+    candidates = extract_candidates(segments, corpus=BackgroundCorpus(str(tmp_path / "corpus.json")))
+
+    concepts = await service.extract_concepts_windowed(split_windows(segments, 60), candidates=candidates)
+
+    first = next(p for p in service.prompts if "Le bitcoin monte" in p)
+    section = first.split("CANDIDATE TERMS", 1)[1]
+    assert "bitcoin: 5 mentions" in section
+    assert "inflation" not in section.casefold()
+    assert [c.name for c in concepts] == ["Bitcoin"]
+
+
+async def test_cache_hit_skips_openai_and_applies_the_priority_filter_on_read(service):
+    text = " ".join(LINES)
+    low = dict(CONCEPT, name="Dividende", priority="low")
+    service.client.chat.completions.create = _replying(service, [CONCEPT, low])
+
+    high_only = await service.extract_concepts(text, min_priority=ConceptPriority.HIGH)
+    everything = await service.extract_concepts(text, min_priority=ConceptPriority.LOW)
+
+    assert len(service.prompts) == 1
+    assert [c.name for c in high_only] == ["Bitcoin"]
+    assert [c.name for c in everything] == ["Bitcoin", "Dividende"]
+
+
+async def test_cache_keys_change_with_prompt_and_parameters(service):
+    key = service._cache_key("text", 30)
+
+    assert service._cache_key("text", 30) == key
+    assert service._cache_key("text", 20) != key
+    assert service._cache_key("other text", 30) != key
+    assert service._window_cache_key("text") != service._window_cache_key("other text")
+
+    service.SYSTEM_PROMPT += " Be concise."
+    service._prompt_version = None
+    assert service._cache_key("text", 30) != key
+
@@ -0,0 +1,57 @@
+import pytest
+
+from app.core.concept_normalizer import canonical_key, cluster_names, merge_similar_concepts, stem
+from app.models.generation import ConceptExtraction
+
+
+def _concept(name, priority="low", context=None, start=None, end=None):
+    return ConceptExtraction(
+        name=name, category="finance", priority=priority, visual_description="v",
+        context=context, start=start, end=end
+    )
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("actions", "action"),
+    ("chevaux", "cheval"),
+    ("bureaux", "bureau"),
+    ("taux", "taux"),
+    ("bonus", "bonus"),
+    ("cac40", "cac40"),
+])
+def test_stem(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize("names", [
+    ["Crypto-monnaies", "cryptomonnaie", "Cryptocurrency", "crypto"],
+    ["Les comptes d'épargne", "compte epargne", "Compte d'Épargne"],
+    ["BTC", "Bitcoin", "bitcoins"],
+])
+def test_canonical_key_ignores_case_accents_plurals_and_aliases(names):
+    assert len({canonical_key(name) for name in names}) == 1
+
+
+def test_cluster_names_joins_similar_keys_but_not_other_numbers():
+    labels = cluster_names(["Épargne salariale", "epargnes salariales", "Épargne salarial", "CAC 40", "CAC 60", "Or"], 0.7)
+
+    assert labels[0] == labels[1] == labels[2]
+    assert len({labels[0], labels[3], labels[4], labels[5]}) == 4
+
+
+def test_cluster_names_threshold_one_keeps_exact_keys_only():
+    labels = cluster_names(["Inflation", "inflations", "Inflasion"], 1.0)
+    assert labels[0] == labels[1] != labels[2]
+
+
+def test_merge_keeps_best_priority_contexts_and_time_span():
+    merged = merge_similar_concepts([
+        _concept("Épargne", context="a", start=10, end=20),
+        _concept("Bitcoin"),
+        _concept("epargnes", priority="high", context="b | a", start=5, end=12),
+    ])
+
+    assert [c.name for c in merged] == ["epargnes", "Bitcoin"]
+    assert merged[0].priority == "high"
+    assert merged[0].context == "a | b"
+    assert (merged[0].start, merged[0].end) == (5, 20)
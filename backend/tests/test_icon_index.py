@@ -0,0 +1,130 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from app.core.minhash import MinHasher, MinHashLSH, estimate_similarity
+from app.models.generation import ConceptExtraction
+from app.services.icon_index import TEMPLATE_SAMPLE, IconIndex
+
+pytestmark = pytest.mark.asyncio
+
+# Shape of the generation prompt stored with every icon
+TEMPLATE = (
+    "3D {concept}, minimalist geometric sculptural form, translucent crystal glass material, "
+    "semi-transparent blue glass with inner light showing through, smooth satin surface finish, "
+    "warm amber-peach internal glow visible through the glass from behind, solid pure black background, "
+    "single floating isolated object centered in frame, no reflection, clean UI icon aesthetic, octane render"
+)
+
+
+def _word(rng):
+    return "".join(rng.choice("abcdefghijklmnoprstuv") for _ in range(rng.randint(5, 10)))
+
+
+def _icons(count):
+    rng = random.Random(7)
+    icons = []
+    for i in range(count):
+        name = f"{_word(rng)} {_word(rng)}"
+        icons.append({
+            "id": f"icon-{i}",
+            "name": name,
+            "category": "objets",
+            "tags": [],
+            "prompt": TEMPLATE.format(concept=name),
+            "created_at": f"2024-{i:06d}",
+        })
+    return icons
+
+
+class FakeSource:
+    """list_icon_names of SupabaseService over a list of rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def list_icon_names(self, offset=0, limit=1000, since=None):
+        rows = [r for r in self.rows if not since or r["created_at"] > since]
+        return rows[offset:offset + limit]
+
+
+def _concept(name, prompt, category="objets"):
+    return ConceptExtraction(name=name, category=category, priority="high", visual_description=prompt)
+
+
+async def test_template_prompts_do_not_make_every_lookup_slow():
+    icons = _icons(5000)
+    index = IconIndex()
+    await index.load(FakeSource(icons))
+
+    misses = [_concept(f"unknown concept {i}", TEMPLATE.format(concept=f"thing {i}")) for i in range(50)]
+    started = time.perf_counter()
+    assert await index.amatch_concepts(misses) == {}
+    assert (time.perf_counter() - started) / len(misses) < 0.01
+
+    assert "minimalist geometric" in index._template
+    assert len(index.prompts) == len(icons)
+
+
+async def test_lookup_finds_near_duplicates_and_same_category_prompts():
+    icons = _icons(TEMPLATE_SAMPLE * 2) + [{
+        "id": "car",
+        "name": "Voiture électrique",
+        "category": "vehicules",
+        "prompt": TEMPLATE.format(concept="electric car plugged into a charging station"),
+        "created_at": "2025",
+    }]
+    index = IconIndex()
+    await index.load(FakeSource(icons))
+
+    assert index.lookup("Voitures electriques") == "car"
+    prompt = TEMPLATE.format(concept="electric car plugged into a charging station")
+    assert index.lookup("Voiture électrique rapide", prompt=prompt, category="vehicules") == "car"
+    assert index.lookup("Voiture électrique rapide", prompt=prompt, category="devises") is None
+    assert index.lookup("Bouclier", prompt=TEMPLATE.format(concept="shield")) is None
+
+
+async def test_template_is_kept_across_restarts(tmp_path):
+    path = str(tmp_path / "icons.npz")
+    icons = _icons(TEMPLATE_SAMPLE * 2)
+    index = IconIndex(path=path)
+    await index.load(FakeSource(icons))
+
+    restarted = IconIndex(path=path)
+    await restarted.load(FakeSource(icons))
+
+    assert restarted._template == index._template
+    assert restarted.lookup(icons[3]["name"] + "s") == "icon-3"
+
+
+async def test_icons_added_before_the_template_is_fixed_are_rehashed():
+    index = IconIndex()
+    for icon in _icons(TEMPLATE_SAMPLE + 5):
+        index.add(icon)
+
+    assert index._template
+    assert len(index.prompts) == TEMPLATE_SAMPLE + 5
+    assert not index._sample
+
+
+async def test_lsh_scores_candidates_and_caps_them():
+    hasher = MinHasher(64)
+    rng = np.random.RandomState(0)
+    base = [f"s{i}" for i in range(40)]
+    lsh = MinHashLSH(64, 16, max_candidates=10)
+    for i in range(100):
+        # Every entry shares most shingles with the query
+        lsh.add(f"e{i}", hasher.signature(base[:35] + [f"x{i}-{j}" for j in range(rng.randint(1, 6))]))
+    lsh.compact()
+    lsh.add("pending", hasher.signature(base))
+
+    query = hasher.signature(base)
+    matches = lsh.query(query, threshold=0.5)
+
+    assert len(matches) <= 10
+    assert matches[0] == (100, 1.0)
+    for row, similarity in matches:
+        assert similarity == estimate_similarity(query, lsh.signature_of(row))
+    assert [s for _, s in matches] == sorted((s for _, s in matches), reverse=True)
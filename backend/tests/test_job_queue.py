@@ -0,0 +1,159 @@
+"""
+Job queue and worker tests, on fakeredis instead of a Redis server
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fakeredis import aioredis as fake_aioredis
+
+from app.core.job_queue import Job, JobQueue
+from app.workers import runner
+from app.workers.runner import Worker
+
+pytestmark = pytest.mark.asyncio
+
+LEASE_MS = 50
+
+
+@pytest_asyncio.fixture
+async def queue():
+    client = fake_aioredis.FakeRedis(decode_responses=True)
+    queue = JobQueue(client, stream="jobs:test", group="test-workers", lease_ms=LEASE_MS, max_attempts=2)
+    yield queue
+    await queue.close()
+
+
+async def _pending(queue: JobQueue) -> int:
+    return (await queue.redis.xpending(queue.stream, queue.group))["pending"]
+
+
+async def test_claim_returns_enqueued_job(queue):
+    job_id = await queue.enqueue("youtube", {"task_id": "t1"})
+
+    job = await queue.claim("worker-a", block_ms=10)
+
+    assert job == Job(id=job_id, type="youtube", payload={"task_id": "t1"}, attempts=1)
+    assert await queue.claim("worker-b", block_ms=10) is None
+    assert await _pending(queue) == 1
+
+
+async def test_ack_removes_job(queue):
+    await queue.enqueue("youtube", {"task_id": "t1"})
+    job = await queue.claim("worker-a", block_ms=10)
+
+    await queue.ack(job)
+
+    assert await _pending(queue) == 0
+    assert await queue.redis.xlen(queue.stream) == 0
+
+
+async def test_expired_lease_is_reclaimed(queue):
+    job_id = await queue.enqueue("youtube", {"task_id": "t1"})
+    await queue.claim("worker-a", block_ms=10)
+
+    # worker-a stops heartbeating
+    await asyncio.sleep(LEASE_MS * 2 / 1000)
+    job = await queue.claim("worker-b", block_ms=10)
+
+    assert job is not None and job.id == job_id
+    assert job.attempts == 2
+
+
+async def test_heartbeat_keeps_lease(queue):
+    await queue.enqueue("youtube", {"task_id": "t1"})
+    job = await queue.claim("worker-a", block_ms=10)
+
+    for _ in range(3):
+        await asyncio.sleep(LEASE_MS / 2 / 1000)
+        await queue.heartbeat(job, "worker-a")
+
+    assert await queue.claim("worker-b", block_ms=10) is None
+
+
+async def test_job_reclaimed_too_often_is_dead_lettered(queue):
+    await queue.enqueue("youtube", {"task_id": "t1"})
+    await queue.claim("worker-a", block_ms=10)
+    for consumer in ("worker-b", "worker-c"):
+        await asyncio.sleep(LEASE_MS * 2 / 1000)
+        await queue.claim(consumer, block_ms=10)
+
+    assert await _pending(queue) == 0
+    dead = await queue.redis.xrange(queue.dead_letter_stream)
+    assert len(dead) == 1
+    assert dead[0][1]["reason"] == "Lease expired too many times"
+
+
+async def test_dead_letter_moves_job(queue):
+    await queue.enqueue("youtube", {"task_id": "t1"})
+    job = await queue.claim("worker-a", block_ms=10)
+
+    await queue.dead_letter(job, "boom")
+
+    assert await _pending(queue) == 0
+    dead = await queue.redis.xrange(queue.dead_letter_stream)
+    assert [(fields["type"], fields["reason"]) for _, fields in dead] == [("youtube", "boom")]
+
+
+async def test_worker_runs_and_acks_jobs(queue, monkeypatch):
+    done = []
+
+    async def handler(task_id):
+        done.append(task_id)
+
+    monkeypatch.setitem(runner.JOB_HANDLERS, "youtube", handler)
+    for task_id in ("t1", "t2"):
+        await queue.enqueue("youtube", {"task_id": task_id})
+
+    worker = Worker(queue, concurrency=2, consumer="worker-a")
+    run = asyncio.ensure_future(worker.run())
+    while len(done) < 2:
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(run, timeout=5)
+
+    assert sorted(done) == ["t1", "t2"]
+    assert await _pending(queue) == 0
+
+
+async def test_failing_job_is_dead_lettered_after_max_attempts(queue, monkeypatch):
+    async def handler(task_id):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setitem(runner.JOB_HANDLERS, "youtube", handler)
+    await queue.enqueue("youtube", {"task_id": "t1"})
+
+    worker = Worker(queue, concurrency=1, consumer="worker-a")
+    run = asyncio.ensure_future(worker.run())
+    while not await queue.redis.xlen(queue.dead_letter_stream):
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(run, timeout=5)
+
+    dead = await queue.redis.xrange(queue.dead_letter_stream)
+    assert dead[0][1]["reason"] == "provider down"
+    assert await _pending(queue) == 0
+
+
+async def test_worker_stops_while_all_slots_are_busy(queue, monkeypatch):
+    started = asyncio.Event()
+
+    async def handler(task_id):
+        started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setitem(runner.JOB_HANDLERS, "youtube", handler)
+    await queue.enqueue("youtube", {"task_id": "t1"})
+    waiting_id = await queue.enqueue("youtube", {"task_id": "t2"})
+
+    worker = Worker(queue, concurrency=1, consumer="worker-a")
+    run = asyncio.ensure_future(worker.run())
+    await asyncio.wait_for(started.wait(), timeout=5)
+    worker.stop()
+    await asyncio.wait_for(run, timeout=1)
+
+    # The interrupted job stays pending for another worker; the waiting one was never claimed
+    assert await _pending(queue) == 1
+    job = await queue.claim("worker-b", block_ms=10)
+    assert job is not None and job.id == waiting_id and job.attempts == 1
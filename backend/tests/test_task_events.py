@@ -0,0 +1,92 @@
+import asyncio
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core.task_store import RedisTaskStore
+from app.models.generation import GenerationStatusEnum
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def store():
+    store = RedisTaskStore()
+    store._redis_client = None
+    store._use_redis = False
+    yield store
+    store.executor.shutdown()
+
+
+@pytest_asyncio.fixture
+async def redis_store():
+    store = RedisTaskStore()
+    store._redis_client = fakeredis.FakeRedis(decode_responses=True)
+    store._use_redis = True
+    yield store
+    store.executor.shutdown()
+
+
+def _progress(store, task_id, *values):
+    for value in values:
+        store.update_task(task_id, progress=value, message=f"step {value}")
+
+
+async def test_history_replays_events_after_the_cursor(store):
+    store.create_task("t", "youtube", {})
+    _progress(store, "t", 10, 20, 30)
+    events = store.events.history("t")
+
+    assert [e["data"]["progress"] for e in events] == [10, 20, 30]
+    assert [e["data"]["progress"] for e in store.events.history("t", events[0]["id"])] == [20, 30]
+    assert store.events.last_event_id("t") == events[-1]["id"]
+
+
+async def test_subscribe_replays_then_streams_without_duplicates(store):
+    store.create_task("t", "youtube", {})
+    _progress(store, "t", 10, 20)
+    cursor = store.events.history("t")[0]["id"]
+
+    received = []
+
+    async def watch():
+        async for event in store.events.subscribe("t", cursor, keepalive=1):
+            received.append(event["data"].get("progress"))
+            if event["type"] == "status":
+                return
+
+    watcher = asyncio.ensure_future(watch())
+    await asyncio.sleep(0.01)
+    _progress(store, "t", 30)
+    store.update_task("t", status=GenerationStatusEnum.COMPLETED, progress=100)
+    await asyncio.wait_for(watcher, 1)
+
+    assert received == [20, 30, 100]
+    assert "t" not in store.events._subscribers
+
+
+async def test_finished_task_events_expire_but_ids_keep_increasing(store):
+    store.events.FINISHED_TTL = 0
+    store.create_task("a", "youtube", {})
+    _progress(store, "a", 10)
+    store.update_task("a", status=GenerationStatusEnum.FAILED, error="boom")
+    last_a = store.events.last_event_id("a")
+
+    store.create_task("b", "youtube", {})
+    _progress(store, "b", 10)
+
+    assert store.events.history("a") == []
+    assert store.events.last_event_id("a") == "0-0"
+    first_b = store.events.history("b")[0]["id"]
+    assert int(first_b.split("-")[0]) > int(last_a.split("-")[0])
+
+
+async def test_redis_stream_history_and_cursor(redis_store):
+    redis_store.create_task("t", "youtube", {})
+    _progress(redis_store, "t", 10, 20)
+    events = await redis_store.events.ahistory("t")
+
+    assert [e["type"] for e in events] == ["progress", "progress"]
+    assert await redis_store.events.alast_event_id("t") == events[-1]["id"]
+    assert [e["data"]["progress"] for e in await redis_store.events.ahistory("t", events[0]["id"])] == [20]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.core import tolerant_json
+from app.core.json_stream import JsonArrayStream
+from app.services.concept_extraction_service import concept_extraction_service
+
+CONCEPT = {"name": "Inflation", "category": "finance", "priority": "high", "visual_description": "a rising chart"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": -}', {"a": None}),
+    ('{"a": 1, "b": - 2}', {"a": 1, "b": 2}),
+    ('{"concepts": [-\n {"name": "x"}]}', {"concepts": [{"name": "x"}]}),
+    ('[é, 1]', [None, 1]),
+    ("[" + "- " * 3000 + "1]", [1]),
+])
+def test_stray_characters_are_skipped(text, expected):
+    decoded = tolerant_json.decode(text)
+    assert decoded.value == expected
+    assert "stray character" in decoded.repairs
+
+
+def test_valid_json_needs_no_repair():
+    decoded = tolerant_json.decode('{"a": [1, 2.5, "x"]}')
+    assert decoded.value == {"a": [1, 2.5, "x"]}
+    assert not decoded.repaired
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ("{'a': 'it\\'s', \"b\": True,}", {"a": "it's", "b": True}),
+    ('{"quote": "he said "hi" loudly", "n": 1}', {"quote": 'he said "hi" loudly', "n": 1}),
+    ('[{"a": 1}, {"a": 2}, {"a"', [{"a": 1}, {"a": 2}]),
+])
+def test_common_llm_mistakes_are_repaired(text, expected):
+    assert tolerant_json.decode(text).value == expected
+
+
+def test_text_without_json_raises():
+    with pytest.raises(tolerant_json.TolerantDecodeError):
+        tolerant_json.decode("no json here")
+
+
+def test_parse_concepts_recovers_from_stray_dash():
+    content = '{"concepts": [-\n ' + json.dumps(CONCEPT) + "]}"
+    concepts = concept_extraction_service._parse_concepts(content)
+    assert [c.name for c in concepts] == ["Inflation"]
+
+
+def test_array_stream_yields_objects_as_they_close():
+    stream = JsonArrayStream()
+    head = '{"concepts": [-\n ' + json.dumps(CONCEPT)
+    tail = ", " + json.dumps(dict(CONCEPT, name="Taux")) + "]}"
+
+    first = stream.feed(head)
+    rest = stream.feed(tail)
+
+    assert [item["name"] for item in first + rest] == ["Inflation", "Taux"]
+    assert first and first[0]["name"] == "Inflation"
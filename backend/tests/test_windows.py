@@ -0,0 +1,45 @@
+import pytest
+
+from app.core.windows import attach_times, split_windows
+from app.models.generation import ConceptExtraction
+
+
+def _segments(*items):
+    return [{"text": text, "start": start, "duration": 5.0} for start, text in items]
+
+
+def _concept(name, start=None):
+    return ConceptExtraction(name=name, category="finance", priority="high", visual_description="v", start=start)
+
+
+def test_windows_follow_fixed_boundaries_and_skip_silence():
+    windows = split_windows(_segments((0, "a"), (50, "b"), (70, "c"), (130, "  "), (200, "d"), (230, "e")), 60)
+
+    assert [w.text for w in windows] == ["a b", "c", "d e"]
+    assert [(w.start, w.end) for w in windows] == [(0, 55), (70, 75), (200, 235)]
+    assert [w.index for w in windows] == [0, 1, 2]
+
+
+def test_short_last_window_joins_the_previous_one():
+    windows = split_windows(_segments((0, "a"), (30, "b"), (60, "c"), (65, "d")), 60)
+    assert [w.text for w in windows] == ["a b c d"]
+
+
+def test_editing_a_window_leaves_the_others_unchanged():
+    before = split_windows(_segments((0, "a"), (60, "b"), (120, "c"), (150, "d")), 60)
+    after = split_windows(_segments((0, "a"), (60, "b changed"), (70, "more"), (120, "c"), (150, "d")), 60)
+
+    assert [w.text for w in before][::2] == [w.text for w in after][::2]
+    assert before[1].text != after[1].text
+
+
+def test_split_windows_rejects_non_positive_length():
+    with pytest.raises(ValueError):
+        split_windows([], 0)
+
+
+def test_attach_times_matches_plurals_and_aliases():
+    segments = _segments((10, "On parle des actions."), (40, "Le BTC monte."), (90, "Encore une action."))
+    located = attach_times([_concept("Action"), _concept("Bitcoin"), _concept("Or"), _concept("ETF", start=1.0)], segments, (0.0, 120.0))
+
+    assert [(c.start, c.end) for c in located] == [(10, 95), (40, 45), (0.0, 120.0), (1.0, None)]
@@ -8,7 +8,9 @@ import type {
   IconList,
   GenerateConceptRequest,
   GenerateYouTubeRequest,
+  GenerateYouTubeBatchRequest,
   GenerateResponse,
+  GenerateBatchResponse,
   GenerationTask,
 } from '@/types/icon';
 
@@ -93,15 +95,104 @@ class APIClient {
     return this.client.post('/api/generate/youtube', request);
   }
 
+  async generateFromYouTubeBatch(request: GenerateYouTubeBatchRequest): Promise<GenerateBatchResponse> {
+    return this.client.post('/api/generate/youtube/batch', request);
+  }
+
   async getGenerationStatus(taskId: string): Promise<GenerationTask> {
     return this.client.get(`/api/generate/status/${taskId}`);
   }
 
-  // Poll generation status until complete
+  async cancelGeneration(taskId: string): Promise<GenerationTask> {
+    return this.client.delete(`/api/generate/${taskId}`);
+  }
+
+  // Follow generation status until complete (Server-Sent Events, polling fallback)
   async pollGenerationStatus(
     taskId: string,
     onProgress?: (task: GenerationTask) => void,
     interval: number = 2000
+  ): Promise<GenerationTask> {
+    if (typeof window === 'undefined' || typeof EventSource === 'undefined') {
+      return this.pollStatusLoop(taskId, onProgress, interval);
+    }
+
+    return new Promise((resolve, reject) => {
+      const baseURL = this.client.defaults.baseURL;
+      const source = new EventSource(`${baseURL}/api/generate/stream/${taskId}`);
+      let task = { task_id: taskId } as GenerationTask;
+      let done = false;
+
+      const emit = () => onProgress?.(task);
+
+      const finish = async () => {
+        done = true;
+        source.close();
+        try {
+          // Fetch the full final state once (includes transcript)
+          const finalTask = await this.getGenerationStatus(taskId);
+          onProgress?.(finalTask);
+          if (finalTask.status === 'completed') {
+            resolve(finalTask);
+          } else if (finalTask.status === 'cancelled') {
+            reject(new Error(finalTask.message || 'Generation cancelled'));
+          } else {
+            reject(new Error(finalTask.error || 'Generation failed'));
+          }
+        } catch (error) {
+          reject(error);
+        }
+      };
+
+      const isOver = () => ['completed', 'failed', 'cancelled'].includes(task.status);
+
+      const merge = (event: MessageEvent) => {
+        task = { ...task, ...JSON.parse(event.data) };
+        emit();
+        if (isOver()) finish();
+      };
+
+      source.addEventListener('snapshot', merge);
+      source.addEventListener('status', merge);
+      source.addEventListener('progress', merge);
+      source.addEventListener('transcript', () => {
+        // The stream only announces it: fetch the segments once
+        this.getGenerationStatus(taskId)
+          .then((full) => {
+            task = { ...task, transcript: full.transcript };
+            emit();
+          })
+          .catch(() => undefined);
+      });
+      source.addEventListener('concepts', (event) => {
+        task = { ...task, extracted_concepts: JSON.parse((event as MessageEvent).data).concepts };
+        emit();
+      });
+      source.addEventListener('icon', (event) => {
+        const { icon_id } = JSON.parse((event as MessageEvent).data);
+        const icons = task.generated_icons || [];
+        if (!icons.includes(icon_id)) {
+          task = { ...task, generated_icons: [...icons, icon_id] };
+          emit();
+        }
+      });
+
+      // EventSource reconnects by itself (with Last-Event-ID); only fall back
+      // to polling when the stream is definitively closed
+      source.onerror = () => {
+        if (!done && source.readyState === EventSource.CLOSED) {
+          done = true;
+          this.pollStatusLoop(taskId, onProgress, interval).then(resolve, reject);
+        }
+      };
+    });
+  }
+
+  // Poll generation status until complete
+  private pollStatusLoop(
+    taskId: string,
+    onProgress?: (task: GenerationTask) => void,
+    interval: number = 2000
   ): Promise<GenerationTask> {
     return new Promise((resolve, reject) => {
       const poll = async () => {
@@ -116,6 +207,8 @@ class APIClient {
             resolve(task);
           } else if (task.status === 'failed') {
             reject(new Error(task.error || 'Generation failed'));
+          } else if (task.status === 'cancelled') {
+            reject(new Error(task.message || 'Generation cancelled'));
           } else {
             setTimeout(poll, interval);
           }
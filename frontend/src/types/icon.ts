@@ -49,6 +49,7 @@ export enum GenerationStatus {
   UPLOADING = "uploading",
   COMPLETED = "completed",
   FAILED = "failed",
+  CANCELLED = "cancelled",
 }
 
 export enum ConceptPriority {
@@ -63,6 +64,8 @@ export interface ConceptExtraction {
   priority: ConceptPriority;
   visual_description: string;
   context?: string;
+  start?: number | null;
+  end?: number | null;
 }
 
 export interface TranscriptSegment {
@@ -84,6 +87,8 @@ export interface GenerationTask {
   generated_icons?: string[];
   transcript?: TranscriptSegment[];
   transcript_text?: string;
+  parent_task_id?: string;
+  child_task_ids?: string[];
   metadata?: Record<string, any>;
 }
 
@@ -103,6 +108,14 @@ export interface GenerateYouTubeRequest {
   auto_generate?: boolean;
 }
 
+export interface GenerateYouTubeBatchRequest {
+  youtube_urls?: string[];
+  playlist_id?: string;
+  max_concepts_per_video?: number;
+  max_total_concepts?: number;
+  auto_generate?: boolean;
+}
+
 export interface GenerateResponse {
   task_id: string;
   status: GenerationStatus;
@@ -110,6 +123,10 @@ export interface GenerateResponse {
   estimated_time_seconds?: number;
 }
 
+export interface GenerateBatchResponse extends GenerateResponse {
+  child_task_ids: string[];
+}
+
 export const CATEGORY_LABELS: Record<IconCategory, string> = {
   [IconCategory.FINANCE_INVESTISSEMENT]: "Finance & Investissement",
   [IconCategory.IMMOBILIER]: "Immobilier",